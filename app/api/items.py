@@ -1,11 +1,20 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
 from pathlib import Path
+import json
+import os
 import re
 from app.config.settings import get_settings
 from app.config.logger import setup_logger
-from app.services.scraper_service import scrape_and_analyze
+from app.services.scraper_service import restore_result_file, scrape_and_analyze, stream_search_events
+from app.services.file_manager import run_file_io
+from app.services.result_index import get_result_index
+from app.services.result_writers import RESULT_WRITERS, result_filename
+from app.services.file_transfer import (
+    RangeNotSatisfiableError, accepts_gzip, gzip_chunks, http_date,
+    is_not_modified, iter_file, make_etag, open_file_async, parse_range
+)
 from app.models.exceptions import ScraperError, DataValidationError
 from typing import Optional, Dict, Any
 
@@ -15,11 +24,14 @@ logger = setup_logger(__name__)
 
 class SearchRequest(BaseModel):
     keyword: str
+    incremental: bool = False  # 前回の結果との差分だけを取得する（商品データベースが必要）
 
 class SearchResponse(BaseModel):
     analysis: Optional[Dict[str, Any]] = None
     error: Optional[str] = None
     filename: Optional[str] = None
+    pages: Optional[int] = None  # スクレイピングしたページ数
+    new_items: Optional[int] = None  # 差分取得で新しく見つかった商品数
 
 @router.post("/search", response_model=SearchResponse)
 async def search_items(request: SearchRequest):
@@ -28,7 +40,7 @@ async def search_items(request: SearchRequest):
         if not request.keyword:
             raise HTTPException(status_code=400, detail="キーワードがありません")
             
-        result = await scrape_and_analyze(request.keyword)
+        result = await scrape_and_analyze(request.keyword, incremental=request.incremental)
         return JSONResponse(
             status_code=200,
             content=result
@@ -43,8 +55,155 @@ async def search_items(request: SearchRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"予期せぬエラーが発生しました: {str(e)}")
 
+def format_sse(event: str, data: Any) -> str:
+    """イベントをServer-Sent Events形式に変換する関数"""
+    if event == "keepalive":
+        return ": keepalive\n\n"
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def format_ndjson(event: str, data: Any) -> str:
+    """イベントをNDJSONの1行に変換する関数"""
+    return json.dumps({"event": event, "data": data}, ensure_ascii=False) + "\n"
+
+@router.get("/search/stream")
+async def stream_search(keyword: str, max_pages: Optional[int] = None, accept: Optional[str] = Header(None)):
+    """商品を検索し、取得したページの商品と途中の価格分析を順に送るエンドポイント
+
+    Server-Sent Events（text/event-stream）で送る。Acceptヘッダーに
+    application/x-ndjsonを指定した場合は1行に1イベントのNDJSONで送る。
+    エラーが発生した場合は`error`イベントを送って終了する。
+    """
+    if not keyword:
+        raise HTTPException(status_code=400, detail="キーワードがありません")
+
+    if accept and "application/x-ndjson" in accept:
+        media_type, formatter = "application/x-ndjson", format_ndjson
+    else:
+        media_type, formatter = "text/event-stream", format_sse
+
+    async def event_stream():
+        try:
+            async for event in stream_search_events(keyword, max_pages, settings.stream_keepalive_seconds):
+                yield formatter(event["event"], event["data"])
+        except (ScraperError, DataValidationError) as e:
+            yield formatter("error", {"error": str(e)})
+        except Exception as e:
+            logger.error(f"検索結果の送信中にエラーが発生しました: {str(e)}")
+            yield formatter("error", {"error": f"予期せぬエラーが発生しました: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type=media_type,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def send_result_file(request: Request, filename: str, media_type: str, compressible: bool = True,
+                           restore_from: Optional[str] = None):
+    """結果ファイルをストリーミングで返す関数
+
+    ETag・Last-Modifiedによる条件付きリクエスト（304）、単一範囲のRangeリクエスト（206）、
+    Accept-Encodingに応じたgzip圧縮に対応する。Rangeリクエストの場合は圧縮しない。
+    ファイルが削除されていても、`restore_from`（CSVのファイル名）の検索結果が商品データベースにあれば作り直して返す。
+    """
+    file_path = Path(settings.results_dir) / filename
+
+    # レスポンスを返し始めてからファイルが無いと分かっても404にできないため、先にファイルを開いておく
+    # 索引に残っていてもファイルが削除されている場合があるので、開けなければ索引から取り除く
+    f = await open_file_async(file_path)
+    if f is None:
+        index = get_result_index()
+        if index.remove(filename) is not None:
+            logger.warning(f"索引にあるファイルが削除されていたため索引から取り除きました: {filename}")
+        if restore_from and await restore_result_file(restore_from):
+            logger.info(f"商品データベースから結果ファイルを作り直しました: {restore_from}")
+            f = await open_file_async(file_path)
+    if f is None:
+        logger.error(f"ファイルが見つかりません: {filename}")
+        raise HTTPException(
+            status_code=404,
+            detail=f"ファイルが見つかりません: {filename}"
+        )
+
+    try:
+        return await _stream_open_file(request, f, filename, media_type, compressible)
+    except BaseException:
+        # StreamingResponseに渡す前に終わった場合はここでファイルを閉じる
+        if not f.closed:
+            await run_file_io(f.close)
+        raise
+
+async def _stream_open_file(request: Request, f, filename: str, media_type: str, compressible: bool) -> Response:
+    """開いた結果ファイルからレスポンスを組み立てる関数
+
+    ストリーミングしない応答（304・416）の場合はファイルを閉じる。
+    """
+    file_stat = await run_file_io(os.fstat, f.fileno())
+    file_size, mtime = file_stat.st_size, file_stat.st_mtime
+
+    # Rangeリクエストでなければ、クライアントが対応している場合にgzip圧縮して送る
+    range_header = request.headers.get("range")
+    use_gzip = (
+        compressible and settings.download_gzip and not range_header
+        and file_size >= settings.download_gzip_min_bytes
+        and accepts_gzip(request.headers.get("accept-encoding"))
+    )
+    etag = make_etag(file_size, mtime)
+    if use_gzip:
+        # 圧縮後の内容は元のファイルと異なるため、ETagを区別する
+        etag = f'{etag[:-1]}-gzip"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(mtime),
+        "Accept-Ranges": "bytes",
+        "Vary": "Accept-Encoding",
+        "Content-Disposition": f"attachment; filename*=UTF-8''{filename}",
+        "Access-Control-Expose-Headers": "Content-Disposition, Content-Range, ETag"
+    }
+
+    if is_not_modified(etag, mtime, request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+        await run_file_io(f.close)
+        return Response(status_code=304, headers=headers)
+
+    # If-Rangeが現在のファイルと一致しない場合は範囲指定を無視してファイル全体を返す
+    if_range = request.headers.get("if-range")
+    if range_header and if_range and if_range.strip() not in (etag, headers["Last-Modified"]):
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, file_size)
+    except RangeNotSatisfiableError:
+        await run_file_io(f.close)
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{file_size}"})
+
+    chunk_size = max(1, settings.download_chunk_size)
+    if byte_range is not None:
+        start, end = byte_range
+        length = end - start + 1
+        headers["Content-Range"] = f"bytes {start}-{end}/{file_size}"
+        headers["Content-Length"] = str(length)
+        return StreamingResponse(
+            iter_file(f, start, length, chunk_size),
+            status_code=206,
+            media_type=media_type,
+            headers=headers
+        )
+
+    if use_gzip:
+        headers["Content-Encoding"] = "gzip"
+        return StreamingResponse(
+            gzip_chunks(iter_file(f, chunk_size=chunk_size)),
+            media_type=media_type,
+            headers=headers
+        )
+
+    headers["Content-Length"] = str(file_size)
+    return StreamingResponse(
+        iter_file(f, chunk_size=chunk_size),
+        media_type=media_type,
+        headers=headers
+    )
+
 @router.get("/download/{filename}")
-async def download_csv(filename: str):
+async def download_csv(filename: str, request: Request):
     """CSVファイルをダウンロードするエンドポイント"""
     try:
         # ファイル名の検証
@@ -53,32 +212,8 @@ async def download_csv(filename: str):
                 status_code=400,
                 detail="無効なファイル名です"
             )
-            
-        file_path = Path(settings.results_dir) / filename
-        
-        # ファイルの存在確認
-        if not file_path.exists():
-            logger.error(f"ファイルが見つかりません: {filename}")
-            raise HTTPException(
-                status_code=404,
-                detail=f"ファイルが見つかりません: {filename}"
-            )
-            
-        # ファイルサイズの確認（10MB制限）
-        if file_path.stat().st_size > 10 * 1024 * 1024:
-            raise HTTPException(
-                status_code=413,
-                detail="ファイルサイズが大きすぎます"
-            )
-            
-        return FileResponse(
-            path=str(file_path),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{filename}",
-                "Access-Control-Expose-Headers": "Content-Disposition"
-            }
-        )
+
+        return await send_result_file(request, filename, "text/csv", restore_from=filename)
     except HTTPException:
         raise
     except Exception as e:
@@ -86,4 +221,33 @@ async def download_csv(filename: str):
         raise HTTPException(
             status_code=500,
             detail=f"ファイルのダウンロード中にエラーが発生しました: {str(e)}"
-        ) 
+        )
+
+def negotiate_format(format: Optional[str], accept: Optional[str]) -> str:
+    """クエリ指定またはAcceptヘッダーから結果ファイルの形式を決める関数（指定が無い場合はcsv）"""
+    if format:
+        if format not in RESULT_WRITERS:
+            raise HTTPException(status_code=400, detail=f"未対応の形式です: {format}")
+        return format
+    if accept:
+        media_types = [part.split(";")[0].strip() for part in accept.split(",")]
+        for media_type in media_types:
+            for name, writer in RESULT_WRITERS.items():
+                if media_type == writer.media_type:
+                    return name
+    return "csv"
+
+@router.get("/results/{result_id}")
+async def download_result(result_id: str, request: Request, format: Optional[str] = None, accept: Optional[str] = Header(None)):
+    """結果ファイルを指定された形式でダウンロードするエンドポイント
+
+    形式はクエリパラメータ`format`（csv, csv.gz, ndjson, parquet）またはAcceptヘッダーで指定する。
+    """
+    if not re.match(r'^[\w\-]+$', result_id):
+        raise HTTPException(status_code=400, detail="無効な結果IDです")
+    format_name = negotiate_format(format, accept)
+    writer = RESULT_WRITERS[format_name]
+    return await send_result_file(
+        request, result_filename(result_id, format_name), writer.media_type, compressible=not writer.compressed,
+        restore_from=result_filename(result_id, "csv")
+    )
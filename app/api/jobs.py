@@ -0,0 +1,55 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import JSONResponse
+from app.api.items import SearchRequest, SearchResponse
+from app.config.logger import setup_logger
+from app.models.job import JobStatus
+from app.models.exceptions import JobManagerNotStartedError, JobNotFoundError, JobQueueFullError
+from app.services.job_manager import get_job_manager
+
+router = APIRouter()
+logger = setup_logger(__name__)
+
+@router.post("/jobs", status_code=202)
+async def submit_job(request: SearchRequest):
+    """検索ジョブを登録し、ジョブIDをすぐに返すエンドポイント"""
+    if not request.keyword:
+        raise HTTPException(status_code=400, detail="キーワードがありません")
+    try:
+        job = get_job_manager().submit(request.keyword)
+    except (JobManagerNotStartedError, JobQueueFullError) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return JSONResponse(status_code=202, content=job.to_status())
+
+@router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """ジョブの状態と進捗を返すエンドポイント"""
+    try:
+        job = get_job_manager().get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return job.to_status()
+
+@router.get("/jobs/{job_id}/result", response_model=SearchResponse)
+async def get_job_result(job_id: str):
+    """完了したジョブの検索結果を返すエンドポイント"""
+    try:
+        job = get_job_manager().get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    if job.status == JobStatus.SUCCEEDED:
+        return JSONResponse(status_code=200, content=job.result)
+    if job.status == JobStatus.FAILED:
+        return JSONResponse(status_code=200, content={"analysis": None, "error": job.error, "filename": None})
+    if job.status == JobStatus.CANCELLED:
+        raise HTTPException(status_code=410, detail="ジョブはキャンセルされました")
+    raise HTTPException(status_code=409, detail="ジョブはまだ完了していません")
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """ジョブをキャンセルするエンドポイント"""
+    try:
+        job = get_job_manager().cancel(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return job.to_status()
@@ -0,0 +1,43 @@
+import time
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.services.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """メトリクスをPrometheusのテキスト形式で返すエンドポイント"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+class MetricsMiddleware:
+    """APIごとのリクエスト数とレスポンスを返し終えるまでの時間を記録するミドルウェア
+
+    ストリーミングのレスポンスを妨げないよう、ASGIのメッセージを受け渡すだけにしている。
+    ラベルにはURLではなくルートのパス（`/api/v1/jobs/{job_id}`など）を使う。
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # ルートはルーティング後にscopeへ設定される（一致しない場合はunmatched）
+            route = getattr(scope.get("route"), "path", "unmatched")
+            method = scope["method"]
+            HTTP_REQUESTS.inc(method=method, route=route, status=status["code"])
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=method, route=route)
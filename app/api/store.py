@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException
+from app.config.logger import setup_logger
+from app.models.exceptions import StoredResultNotFoundError
+from app.services.scraper_service import get_stored_item, get_stored_result
+
+router = APIRouter()
+logger = setup_logger(__name__)
+
+@router.get("/items")
+async def get_items(keyword: str):
+    """商品データベースからキーワードの前回の検索結果と価格分析を返すエンドポイント（スクレイピングしない）"""
+    if not keyword:
+        raise HTTPException(status_code=400, detail="キーワードがありません")
+    try:
+        return await get_stored_result(keyword)
+    except StoredResultNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/items/{item_id}")
+async def get_item(item_id: str):
+    """商品の現在の情報と価格履歴を返すエンドポイント"""
+    try:
+        return await get_stored_item(item_id)
+    except StoredResultNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
@@ -0,0 +1,80 @@
+from typing import Optional
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from app.config.logger import setup_logger
+from app.models.exceptions import DataValidationError, StoredResultNotFoundError, WatchlistNotFoundError
+from app.services.scraper_service import get_stored_result
+from app.services.watchlist_scheduler import get_watchlist_scheduler
+
+router = APIRouter()
+logger = setup_logger(__name__)
+
+class WatchlistRequest(BaseModel):
+    keyword: str
+    interval_seconds: Optional[int] = None  # 省略時はWATCHLIST_DEFAULT_INTERVAL
+    jitter_seconds: Optional[int] = None  # 省略時はWATCHLIST_DEFAULT_JITTER
+    max_pages: Optional[int] = None
+    incremental: bool = True
+    enabled: bool = True
+
+@router.get("/watchlist")
+async def list_watchlist():
+    """ウォッチリストのキーワードと実行状況を返すエンドポイント"""
+    return {"watchlist": [entry.to_status() for entry in get_watchlist_scheduler().list()]}
+
+@router.post("/watchlist", status_code=201)
+async def upsert_watchlist(request: WatchlistRequest):
+    """キーワードをウォッチリストに登録（登録済みの場合は更新）するエンドポイント"""
+    try:
+        entry = await get_watchlist_scheduler().upsert(
+            request.keyword, request.interval_seconds, request.jitter_seconds,
+            request.max_pages, request.incremental, request.enabled
+        )
+    except DataValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return entry.to_status()
+
+@router.get("/watchlist/{keyword}")
+async def get_watchlist_entry(keyword: str):
+    """キーワードの登録内容と実行状況を返すエンドポイント"""
+    try:
+        return get_watchlist_scheduler().get(keyword).to_status()
+    except WatchlistNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.delete("/watchlist/{keyword}")
+async def delete_watchlist_entry(keyword: str):
+    """キーワードをウォッチリストから削除するエンドポイント"""
+    try:
+        return (await get_watchlist_scheduler().remove(keyword)).to_status()
+    except WatchlistNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/watchlist/{keyword}/run", status_code=202)
+async def run_watchlist_entry(keyword: str):
+    """次の実行予定を待たずにキーワードを検索するエンドポイント"""
+    try:
+        return get_watchlist_scheduler().trigger(keyword).to_status()
+    except WatchlistNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/watchlist/{keyword}/result")
+async def get_watchlist_result(keyword: str):
+    """キーワードの最新の定期検索の結果を返すエンドポイント
+
+    再起動後などで実行結果が無い場合は、商品データベースに保存された前回の検索結果を返す。
+    """
+    try:
+        entry = get_watchlist_scheduler().get(keyword)
+    except WatchlistNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if entry.last_result is not None:
+        return {
+            "keyword": entry.keyword,
+            "scraped_at": entry.last_finished_at.isoformat(),
+            **entry.last_result
+        }
+    try:
+        return await get_stored_result(keyword)
+    except StoredResultNotFoundError:
+        raise HTTPException(status_code=404, detail=f"検索結果がまだありません: {keyword}")
@@ -23,18 +23,78 @@ class Settings(BaseSettings):
     item_name_selector: str = "span[data-testid='thumbnail-item-name']"
     item_price_selector: str = "span[class*='number__']"
     next_button_selector: str = "div[data-testid='pagination-next-button']"
+    # 検索URLに付ける並び順の指定（例: &sort=created_time&order=desc。空の場合はメルカリの標準の並び順）
+    search_sort_params: str = os.getenv("SEARCH_SORT_PARAMS", "")
+    # 差分取得で使う並び順（新着順）
+    incremental_sort_params: str = os.getenv("INCREMENTAL_SORT_PARAMS", "&sort=created_time&order=desc")
+    # 差分取得で前回の結果から統合する商品の期限（秒。この期間に見つかっていない商品は売れたとみなす。0は無制限）
+    incremental_merge_max_age: int = int(os.getenv("INCREMENTAL_MERGE_MAX_AGE", "86400"))
+    # 商品ページへのリンク（href属性から商品IDを取り出す。空の場合は取得しない）
+    item_link_selector: str = "a[data-testid='thumbnail-link']"
+    # 2ページ目以降のURL（page_indexは0始まり）
+    page_url_template: str = "https://jp.mercari.com/search?keyword={keyword}&page_token=v1%3A{page_index}"
+    # 商品名・価格以外に取得する項目（項目名: 商品セル内のセレクタ）
+    item_extra_selectors: dict = {}
+
+    # 商品情報の抽出方法
+    # evaluate: 1回のpage.evaluateで全商品を取得 / element: 商品ごとに要素を取得
+    extraction_mode: str = os.getenv("EXTRACTION_MODE", "evaluate")
     
     # ブラウザの設定
     user_agent: str = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
     
     # 結果を保存するディレクトリ
     results_dir: str = "results"
+    # 結果ファイルへの書き込み設定
+    csv_flush_rows: int = int(os.getenv("CSV_FLUSH_ROWS", "1000"))  # この行数がたまったら書き込む
+    result_retention_seconds: int = int(os.getenv("RESULT_RETENTION_SECONDS", "3600"))  # 結果ファイルを保持する時間
+    result_retention_max_bytes: int = int(os.getenv("RESULT_RETENTION_MAX_BYTES", "0"))  # 合計サイズの上限（0は無制限）
+    retention_sweep_interval: int = int(os.getenv("RETENTION_SWEEP_INTERVAL", "60"))  # 古いファイルを削除する間隔（秒）
+    file_io_workers: int = int(os.getenv("FILE_IO_WORKERS", "4"))  # ファイル操作用のスレッド数
+    csv_flush_on_page: bool = os.getenv("CSV_FLUSH_ON_PAGE", "false").lower() == "true"  # ページごとに書き込む
+    # ダウンロードの設定（読み込むチャンクのサイズ / gzip圧縮して送るか / 圧縮する最小サイズ）
+    download_chunk_size: int = int(os.getenv("DOWNLOAD_CHUNK_SIZE", "65536"))
+    download_gzip: bool = os.getenv("DOWNLOAD_GZIP", "true").lower() == "true"
+    download_gzip_min_bytes: int = int(os.getenv("DOWNLOAD_GZIP_MIN_BYTES", "1024"))
+    # ストリーミング検索でイベントが無いときに接続維持用のコメントを送る間隔（秒）
+    stream_keepalive_seconds: float = float(os.getenv("STREAM_KEEPALIVE_SECONDS", "15"))
+    # 結果ファイルの出力形式（カンマ区切り: csv, csv.gz, ndjson, parquet。csvは常に出力）
+    result_formats: list[str] = [f.strip() for f in os.getenv("RESULT_FORMATS", "csv").split(",") if f.strip()]
 
     # ブラウザの設定
+    # 起動プロファイル（headless / headed-debug / minimal / auto: headless）
+    browser_profile: str = os.getenv("BROWSER_PROFILE", "auto")
+    # 起動プロファイルに追加するChromiumの起動オプション（カンマ区切り）
+    browser_extra_args: list[str] = [a for a in os.getenv("BROWSER_EXTRA_ARGS", "").split(",") if a]
     viewport: dict = {'width': 1920, 'height': 1080}
     locale: str = 'ja-JP'
     timezone_id: str = 'Asia/Tokyo'
 
+    # リソースのブロック設定（商品名と価格のテキストだけを読むため、画像・フォント・計測用のリクエストを止める）
+    block_resources: bool = os.getenv("BLOCK_RESOURCES", "true").lower() == "true"
+    # 読み込みを許可するリソースの種類（商品一覧の描画に必要なものだけ）
+    allowed_resource_types: list[str] = os.getenv(
+        "ALLOWED_RESOURCE_TYPES",
+        "document,script,xhr,fetch,stylesheet,websocket,eventsource,manifest,other"
+    ).split(",")
+    # 種類にかかわらず許可するURLのパターン（fnmatch形式）
+    allowed_url_patterns: list[str] = [p for p in os.getenv("ALLOWED_URL_PATTERNS", "").split(",") if p]
+    # 種類にかかわらずブロックするURLのパターン（計測・広告）
+    blocked_url_patterns: list[str] = [
+        "*google-analytics.com*",
+        "*googletagmanager.com*",
+        "*doubleclick.net*",
+        "*googlesyndication.com*",
+        "*connect.facebook.net*",
+        "*analytics.tiktok.com*",
+        "*bat.bing.com*",
+        "*criteo.*",
+        "*amplitude.com*",
+        "*sentry.io*"
+    ]
+    # ブロックしたリクエストの推定サイズ（削減量の集計用、バイト）
+    blocked_resource_size_estimates: dict = {"image": 30000, "media": 300000, "font": 40000, "default": 5000}
+
     # クッキー設定
     cookie_name: str = os.getenv("COOKIE_NAME", "mercari_accept_cookie")
     cookie_value: str = os.getenv("COOKIE_VALUE", "1")
@@ -49,6 +109,72 @@ class Settings(BaseSettings):
     # スクロールの設定
     scroll_points: list[float] = [1/8, 1/4, 3/8, 1/2, 5/8, 3/4, 7/8, 1]
     wait_time_between_scrolls: int = 2000
+    # スクロール方法
+    # adaptive: 商品数が増えなくなるまでスクロール / fixed: 決まった位置ごとに一定時間待機
+    scroll_mode: str = os.getenv("SCROLL_MODE", "adaptive")
+    scroll_step_wait: int = 300  # 1画面分スクロールした後に商品の追加を待つ最大時間
+    scroll_settle_time: int = 1500  # 最下部で商品が増えなければ読み込み完了とみなす時間
+    scroll_max_time: int = 20000  # スクロール全体の上限時間
+
+    # ページネーション方法
+    # click: 次ページボタンをクリック / url: ページURLを組み立てて複数ページを並列取得
+    pagination_mode: str = os.getenv("PAGINATION_MODE", "click")
+    max_concurrent_pages_per_host: int = int(os.getenv("MAX_CONCURRENT_PAGES_PER_HOST", "3"))
+    # スクレイピングの各段階（ページ取得 → 商品情報への変換 → 保存）の間のキューに保持するページ数
+    pipeline_queue_size: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "2"))
+
+    # ページの取得方法
+    # browser: Playwrightで取得 / http: HTMLを直接取得して解析 / auto: httpで取得し、読み取れなければbrowserに切り替え
+    fetch_backend: str = os.getenv("FETCH_BACKEND", "browser")
+    http_fast_path_timeout: float = float(os.getenv("HTTP_FAST_PATH_TIMEOUT", "15"))  # 秒
+    http_fast_path_max_connections: int = int(os.getenv("HTTP_FAST_PATH_MAX_CONNECTIONS", "10"))
+    http_fast_path_http2: bool = os.getenv("HTTP_FAST_PATH_HTTP2", "true").lower() == "true"  # h2（httpx[http2]）が必要
+    # 商品名と価格を読み取れた商品セルがこの割合未満の場合は、HTMLでの取得に失敗したとみなす
+    http_fast_path_min_valid_ratio: float = float(os.getenv("HTTP_FAST_PATH_MIN_VALID_RATIO", "0.8"))
+
+    # 次ページへ遷移する前の待機時間（adaptiveモードで唯一の意図的な待機）
+    politeness_delay: int = int(os.getenv("POLITENESS_DELAY", "1000"))
+
+    # 商品データベースの設定（商品IDごとの商品情報と価格履歴をSQLiteに保存する）
+    item_store_enabled: bool = os.getenv("ITEM_STORE_ENABLED", "true").lower() == "true"
+    item_store_path: str = os.getenv("ITEM_STORE_PATH", "data/items.db")
+
+    # メトリクスの設定（/metricsでPrometheusのテキスト形式を返す）
+    metrics_enabled: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+    # 価格分析の設定
+    # auto: 件数に応じて選択 / python: 純粋なPython / vectorized: NumPy・pandasによる列指向の計算
+    analysis_engine: str = os.getenv("ANALYSIS_ENGINE", "auto")
+    vectorized_analysis_threshold: int = 5000  # autoの場合にvectorizedを使う件数
+    analysis_percentiles: list[int] = [10, 25, 75, 90]
+    analysis_histogram_bins: int = 10
+
+    # ブラウザプールの設定
+    browser_pool_enabled: bool = os.getenv("BROWSER_POOL_ENABLED", "true").lower() == "true"
+    browser_pool_size: int = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+    browser_pool_max_contexts: int = int(os.getenv("BROWSER_POOL_MAX_CONTEXTS", "2"))
+    browser_pool_max_uses: int = int(os.getenv("BROWSER_POOL_MAX_USES", "50"))
+    browser_pool_acquire_timeout: float = 60.0
+
+    # 検索結果キャッシュの設定
+    result_cache_enabled: bool = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+    result_cache_ttl: int = int(os.getenv("RESULT_CACHE_TTL", "600"))  # 秒
+    result_cache_max_entries: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "256"))
+    result_cache_dir: str = os.getenv("RESULT_CACHE_DIR", "")  # 空の場合はメモリのみ
+
+    # 検索ジョブの設定
+    job_max_concurrency: int = int(os.getenv("JOB_MAX_CONCURRENCY", "2"))
+    job_queue_size: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    job_retention_seconds: int = 3600  # 完了したジョブを保持する時間
+
+    # 定期検索（ウォッチリスト）の設定
+    watchlist_enabled: bool = os.getenv("WATCHLIST_ENABLED", "true").lower() == "true"
+    watchlist_path: str = os.getenv("WATCHLIST_PATH", "data/watchlist.json")
+    watchlist_max_concurrency: int = int(os.getenv("WATCHLIST_MAX_CONCURRENCY", "2"))  # 同時に実行するバッチ数
+    watchlist_batch_size: int = int(os.getenv("WATCHLIST_BATCH_SIZE", "5"))  # 1つのコンテキストで続けて検索する数
+    watchlist_default_interval: int = int(os.getenv("WATCHLIST_DEFAULT_INTERVAL", "3600"))  # 秒
+    watchlist_default_jitter: int = int(os.getenv("WATCHLIST_DEFAULT_JITTER", "60"))  # 秒
+    watchlist_min_interval: int = int(os.getenv("WATCHLIST_MIN_INTERVAL", "60"))  # 秒
 
     model_config = {
         "extra": "allow",
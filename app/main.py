@@ -1,8 +1,19 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request, HTTPException
 from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.items import router as items_router
+from app.api.jobs import router as jobs_router
+from app.api.metrics import MetricsMiddleware, router as metrics_router
+from app.api.store import router as store_router
+from app.api.watchlist import router as watchlist_router
 from app.config.settings import get_settings
+from app.services.browser_pool import start_browser_pool, stop_browser_pool
+from app.services.http_fetcher import close_http_client
+from app.services.item_store import close_item_store
+from app.services.job_manager import start_job_manager, stop_job_manager
+from app.services.watchlist_scheduler import start_watchlist_scheduler, stop_watchlist_scheduler
+from app.services.file_manager import shutdown_file_executor, start_retention_sweeper, stop_retention_sweeper
 import logging
 
 # 設定を取得
@@ -14,10 +25,37 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+logger = logging.getLogger(__name__)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """アプリの起動時と終了時に共有リソースを管理する"""
+    if settings.browser_pool_enabled:
+        try:
+            await start_browser_pool(settings)
+        except Exception as e:
+            # プールが使えなくてもリクエストごとの起動で動作を継続する
+            logger.error(f"ブラウザプールの起動に失敗しました: {e}")
+    await start_job_manager()
+    await start_retention_sweeper()
+    if settings.watchlist_enabled:
+        await start_watchlist_scheduler()
+    try:
+        yield
+    finally:
+        await stop_watchlist_scheduler()
+        await stop_retention_sweeper()
+        await stop_job_manager()
+        await stop_browser_pool()
+        await close_http_client()
+        close_item_store()
+        shutdown_file_executor()
+
 app = FastAPI(
     title="Mercari Scraper API",
     description="メルカリの商品をスクレイピングするAPI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS設定
@@ -29,8 +67,17 @@ app.add_middleware(
     allow_headers=settings.cors_headers,
 )
 
+# メトリクスの記録
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # ルーターの登録
 app.include_router(items_router, prefix="/api/v1", tags=["items"])
+app.include_router(jobs_router, prefix="/api/v1", tags=["jobs"])
+app.include_router(store_router, prefix="/api/v1", tags=["store"])
+app.include_router(watchlist_router, prefix="/api/v1", tags=["watchlist"])
+if settings.metrics_enabled:
+    app.include_router(metrics_router, tags=["metrics"])
 
 @app.get("/")
 async def root():
@@ -5,3 +5,27 @@ class ScraperError(Exception):
 class DataValidationError(ScraperError):
     """データ検証エラー"""
     pass
+
+class JobNotFoundError(ScraperError):
+    """指定されたジョブが存在しないエラー"""
+    pass
+
+class JobQueueFullError(ScraperError):
+    """ジョブキューが満杯で受け付けられないエラー"""
+    pass
+
+class JobManagerNotStartedError(ScraperError):
+    """ジョブワーカーが起動していないため受け付けられないエラー"""
+    pass
+
+class FastPathError(ScraperError):
+    """ブラウザを使わない取得で結果を得られなかったエラー"""
+    pass
+
+class StoredResultNotFoundError(ScraperError):
+    """商品データベースに指定された商品・検索結果が存在しないエラー"""
+    pass
+
+class WatchlistNotFoundError(ScraperError):
+    """指定されたキーワードがウォッチリストに存在しないエラー"""
+    pass
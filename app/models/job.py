@@ -0,0 +1,43 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Any, Optional
+
+class JobStatus(str, Enum):
+    """検索ジョブの状態"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    @property
+    def is_finished(self) -> bool:
+        return self in (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+@dataclass
+class SearchJob:
+    id: str
+    keyword: str
+    status: JobStatus = JobStatus.QUEUED
+    pages_done: int = 0
+    items_so_far: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime = field(default_factory=datetime.now)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    def to_status(self) -> Dict[str, Any]:
+        """状態確認用の辞書に変換する"""
+        return {
+            "job_id": self.id,
+            "keyword": self.keyword,
+            "status": self.status.value,
+            "pages_done": self.pages_done,
+            "items_so_far": self.items_so_far,
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None
+        }
@@ -1,5 +1,19 @@
+import heapq
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+def parse_price(price: str) -> Optional[int]:
+    """価格の文字列を数値に変換する（不正な形式の場合はNone）"""
+    try:
+        # 価格が数値とカンマのみで構成されているか確認
+        price_without_comma = price.replace(',', '').strip()
+        if not price_without_comma.isdigit():
+            return None  # 数値とカンマ以外の文字が含まれている場合はスキップ
+
+        # カンマを除去して数値に変換
+        return int(price_without_comma)
+    except (ValueError, AttributeError):
+        return None  # 不正な価格形式はスキップ
 
 @dataclass
 class PriceAnalysis:
@@ -8,6 +22,10 @@ class PriceAnalysis:
     average: float
     median: float
     total: int
+    # 以下は列指向の分析エンジンでのみ算出される（それ以外はNoneのままJSONに出力する）
+    std: Optional[float] = None
+    percentiles: Optional[Dict[str, float]] = None
+    histogram: Optional[List[Dict[str, Any]]] = None
 
     @classmethod
     def from_items(cls, items: List[Dict[str, Any]]) -> 'PriceAnalysis':
@@ -20,18 +38,11 @@ class PriceAnalysis:
         valid_prices = []
         
         for item in items:
-            try:
-                # 価格が数値とカンマのみで構成されているか確認
-                price_without_comma = item['price'].replace(',', '').strip()
-                if not price_without_comma.isdigit():
-                    continue  # 数値とカンマ以外の文字が含まれている場合はスキップ
-                    
-                # カンマを除去して数値に変換
-                price = int(price_without_comma)
-                valid_items.append(item)
-                valid_prices.append(price)
-            except (ValueError, AttributeError):
-                continue  # 不正な価格形式はスキップ
+            price = parse_price(item['price'])
+            if price is None:
+                continue
+            valid_items.append(item)
+            valid_prices.append(price)
                 
         if not valid_prices:
             return None
@@ -64,4 +75,84 @@ class PriceAnalysis:
             average=average_price,
             median=median_price,
             total=len(sorted_items)
-        ) 
+        )
+
+class IncrementalPriceAnalyzer:
+    """商品を追加するたびに価格分析を更新するクラス
+
+    最低・最高価格の商品、価格の合計と件数を保持し、中央値は2つのヒープで管理する。
+    商品そのものは保持しないため、ページごとに追加しても必要なメモリは価格の数値分のみ。
+    いつ`snapshot`を呼んでも、それまでに追加した商品で`PriceAnalysis.from_items`を実行した結果と一致する。
+    """
+
+    def __init__(self):
+        self._lower: List[int] = []  # 小さい側の半分（符号を反転した最大ヒープ）
+        self._upper: List[int] = []  # 大きい側の半分（最小ヒープ）
+        self._lowest: Optional[tuple] = None
+        self._highest: Optional[tuple] = None
+        self.count = 0
+        self.total = 0
+
+    def add(self, item: Dict[str, Any]) -> bool:
+        """商品を1件追加する（価格が不正な場合は追加せずFalseを返す）"""
+        price = parse_price(item.get('price'))
+        if price is None:
+            return False
+
+        summary = {'name': item['name'], 'price': item['price']}
+        # 同じ価格の場合、最低価格は最初の商品、最高価格は最後の商品を採用する（from_itemsの安定ソートと同じ）
+        if self._lowest is None or price < self._lowest[0]:
+            self._lowest = (price, summary)
+        if self._highest is None or price >= self._highest[0]:
+            self._highest = (price, summary)
+
+        if not self._lower or price <= -self._lower[0]:
+            heapq.heappush(self._lower, -price)
+        else:
+            heapq.heappush(self._upper, price)
+        # 小さい側の件数が大きい側と同じか1件多い状態を保つ
+        if len(self._lower) > len(self._upper) + 1:
+            heapq.heappush(self._upper, -heapq.heappop(self._lower))
+        elif len(self._upper) > len(self._lower):
+            heapq.heappush(self._lower, -heapq.heappop(self._upper))
+
+        self.count += 1
+        self.total += price
+        return True
+
+    def add_items(self, items: List[Dict[str, Any]]) -> int:
+        """複数の商品を追加し、追加できた件数を返す"""
+        return sum(1 for item in items if self.add(item))
+
+    def prices(self) -> List[int]:
+        """追加した有効な価格を返す（順不同）"""
+        return [-price for price in self._lower] + self._upper
+
+    @property
+    def median(self) -> Optional[float]:
+        if not self.count:
+            return None
+        if self.count % 2 == 0:
+            return (-self._lower[0] + self._upper[0]) / 2
+        return -self._lower[0]
+
+    def snapshot(self) -> Optional[PriceAnalysis]:
+        """現時点の分析結果を返す（有効な商品が無い場合はNone）"""
+        if not self.count:
+            return None
+        lowest_item = self._lowest[1]
+        highest_item = self._highest[1]
+        return PriceAnalysis(
+            lowest={
+                'name': lowest_item['name'],
+                'price': f"¥{lowest_item['price']}"
+            },
+            highest={
+                'name': highest_item['name'],
+                'price': f"¥{highest_item['price']}"
+            },
+            average=self.total / self.count,
+            median=self.median,
+            total=self.count
+        )
+
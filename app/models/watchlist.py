@@ -0,0 +1,48 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+@dataclass
+class WatchlistEntry:
+    """定期的に検索するキーワードと、その実行状況"""
+    keyword: str
+    interval_seconds: int
+    jitter_seconds: int = 0
+    max_pages: Optional[int] = None
+    incremental: bool = True
+    enabled: bool = True
+    # 以下は実行状況（ファイルには保存しない）
+    next_run_at: Optional[datetime] = None
+    running: bool = False
+    runs: int = 0
+    skipped_runs: int = 0
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_result: Optional[Dict[str, Any]] = None
+
+    def to_config(self) -> Dict[str, Any]:
+        """保存用の設定だけの辞書に変換する"""
+        return {
+            "keyword": self.keyword,
+            "interval_seconds": self.interval_seconds,
+            "jitter_seconds": self.jitter_seconds,
+            "max_pages": self.max_pages,
+            "incremental": self.incremental,
+            "enabled": self.enabled
+        }
+
+    def to_status(self) -> Dict[str, Any]:
+        """状態確認用の辞書に変換する"""
+        return {
+            **self.to_config(),
+            "running": self.running,
+            "runs": self.runs,
+            "skipped_runs": self.skipped_runs,
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "last_started_at": self.last_started_at.isoformat() if self.last_started_at else None,
+            "last_finished_at": self.last_finished_at.isoformat() if self.last_finished_at else None
+        }
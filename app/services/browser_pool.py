@@ -0,0 +1,343 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+from playwright.async_api import async_playwright
+from app.config.settings import Settings, get_settings
+from app.config.logger import setup_logger
+from app.models.exceptions import ScraperError
+from .resource_blocking import install_resource_blocking
+from .metrics import POOL_CONTEXTS_CAPACITY, POOL_CONTEXTS_IN_USE, STAGE_DURATION, observe_stage
+
+logger = setup_logger(__name__)
+
+def build_cookies(settings: Settings) -> List[dict]:
+    """コンテキストに設定するクッキーを作成する関数"""
+    return [
+        {
+            'name': settings.cookie_name,
+            'value': settings.cookie_value,
+            'domain': settings.cookie_domain,
+            'path': settings.cookie_path
+        }
+    ]
+
+@dataclass
+class LaunchProfile:
+    """ブラウザの起動方法の組み合わせ"""
+    name: str
+    headless: bool
+    args: List[str] = field(default_factory=list)
+    viewport: Optional[Dict[str, int]] = None  # Noneの場合は設定のviewportを使用
+    slow_mo: float = 0
+
+# 余計なプロセス・描画・バックグラウンド通信を止めるChromiumの起動オプション
+MINIMAL_CHROMIUM_ARGS = [
+    "--disable-gpu",
+    "--disable-extensions",
+    "--disable-dev-shm-usage",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--disable-features=Translate,MediaRouter,OptimizationHints",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+    "--blink-settings=imagesEnabled=false",
+    "--mute-audio",
+    "--no-first-run",
+]
+
+LAUNCH_PROFILES = {
+    # 画面なしで起動（サーバー向け）
+    "headless": LaunchProfile(name="headless", headless=True),
+    # 画面を表示し、操作を遅らせて確認しやすくする（開発・デバッグ向け）
+    "headed-debug": LaunchProfile(name="headed-debug", headless=False, slow_mo=100),
+    # 画面なし・小さい画面サイズ・GPUや拡張機能などを無効化（負荷を最小にする）
+    "minimal": LaunchProfile(
+        name="minimal",
+        headless=True,
+        args=MINIMAL_CHROMIUM_ARGS,
+        viewport={'width': 1280, 'height': 800}
+    ),
+}
+
+def get_launch_profile(settings: Settings) -> LaunchProfile:
+    """設定された起動プロファイルを返す関数
+
+    autoの場合は画面の有無にかかわらずheadlessを使う。
+    画面の表示と操作の遅延（slow_mo）は、headed-debugを明示的に指定した場合だけ有効になる。
+    """
+    name = settings.browser_profile
+    if name == "auto":
+        name = "headless"
+    profile = LAUNCH_PROFILES.get(name)
+    if profile is None:
+        raise ScraperError(f"未対応の起動プロファイルです: {name}")
+    return profile
+
+async def launch_browser(playwright, settings: Settings):
+    """起動プロファイルに従ってChromiumを起動する関数"""
+    profile = get_launch_profile(settings)
+    with observe_stage("browser_launch"):
+        return await playwright.chromium.launch(
+            headless=profile.headless,
+            args=profile.args + list(settings.browser_extra_args),
+            slow_mo=profile.slow_mo
+        )
+
+async def new_context(browser, settings: Settings):
+    """ブラウザに設定済みのコンテキストを作成する関数"""
+    context = await browser.new_context(
+        user_agent=settings.user_agent,
+        viewport=get_launch_profile(settings).viewport or settings.viewport,
+        locale=settings.locale,
+        timezone_id=settings.timezone_id
+    )
+    await context.add_cookies(build_cookies(settings))
+    await install_resource_blocking(context, settings)
+    return context
+
+class PooledBrowser:
+    """プール内のブラウザ1つ分の状態"""
+
+    def __init__(self, browser):
+        self.browser = browser
+        self.uses = 0
+        self.active = 0
+        self.idle_contexts = []
+        self.restarting = False
+        self.generation = 0  # 再起動のたびに増やし、古いブラウザのコンテキストを見分ける
+
+    def is_healthy(self) -> bool:
+        """ブラウザが接続中かどうかを確認する"""
+        try:
+            return self.browser.is_connected()
+        except Exception:
+            return False
+
+class BrowserPool:
+    """起動済みブラウザを使い回すプール
+
+    固定数のブラウザを起動しておき、リクエストごとにコンテキストを貸し出す。
+    返却されたコンテキストはページを閉じてクッキーを初期化したうえで再利用し、
+    規定回数使われたブラウザは貸出がなくなった時点で再起動する。
+    """
+
+    def __init__(self, settings: Settings = None):
+        self.settings = settings or get_settings()
+        self.size = max(1, self.settings.browser_pool_size)
+        self.max_contexts = max(1, self.settings.browser_pool_max_contexts)
+        self.max_uses = self.settings.browser_pool_max_uses
+        self._playwright = None
+        self._browsers: List[PooledBrowser] = []
+        self._semaphore = asyncio.Semaphore(self.size * self.max_contexts)
+        self._available = asyncio.Condition()
+        self._started = False
+
+    @property
+    def capacity(self) -> int:
+        """同時に貸し出せるコンテキストの上限"""
+        return self.size * self.max_contexts
+
+    @property
+    def in_use(self) -> int:
+        """貸出中のコンテキスト数"""
+        return sum(slot.active for slot in self._browsers)
+
+    async def _launch(self):
+        return await launch_browser(self._playwright, self.settings)
+
+    async def start(self):
+        """Playwrightを起動し、ブラウザを事前に立ち上げる"""
+        if self._started:
+            return
+        self._playwright = await async_playwright().start()
+        try:
+            for _ in range(self.size):
+                self._browsers.append(PooledBrowser(await self._launch()))
+        except Exception:
+            await self.stop()
+            raise
+        self._started = True
+        logger.info(f"ブラウザプールを起動しました（{self.size}台、{get_launch_profile(self.settings).name}）")
+
+    async def stop(self):
+        """すべてのブラウザとPlaywrightを停止する"""
+        for slot in self._browsers:
+            try:
+                await slot.browser.close()
+            except Exception as e:
+                logger.warning(f"ブラウザの終了に失敗しました: {e}")
+        self._browsers = []
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+        self._started = False
+
+    async def _restart(self, slot: PooledBrowser):
+        """ブラウザを再起動する
+
+        起動には時間がかかるため、ロックを持たずに実行する（呼び出し側でslot.restartingをTrueにしておく）。
+        再起動中のブラウザには貸し出さず、他のブラウザからの貸出は止めない。
+        """
+        try:
+            try:
+                await slot.browser.close()
+            except Exception:
+                pass
+            browser = await self._launch()
+        except BaseException:
+            async with self._available:
+                slot.restarting = False
+                self._available.notify_all()
+            raise
+        async with self._available:
+            slot.browser = browser
+            slot.generation += 1
+            slot.uses = 0
+            slot.idle_contexts = []
+            slot.restarting = False
+            self._available.notify_all()
+        logger.info("ブラウザを再起動しました")
+
+    def _retiring(self, slot: PooledBrowser) -> bool:
+        return self.max_uses > 0 and slot.uses >= self.max_uses
+
+    def _pick_slot(self) -> Optional[PooledBrowser]:
+        """貸し出すブラウザを選ぶ（空きが無い場合はNone）"""
+        candidates = [slot for slot in self._browsers if not slot.restarting and slot.active < self.max_contexts]
+        if not candidates:
+            return None
+        # 再起動待ちのブラウザはできるだけ避ける
+        preferred = [slot for slot in candidates if not self._retiring(slot)] or candidates
+        return min(preferred, key=lambda s: s.active)
+
+    async def _checkout(self):
+        """貸し出すブラウザとコンテキストを選ぶ"""
+        async with self._available:
+            # 空いているブラウザが再起動中の場合は、再起動が終わるまで待つ
+            slot = await self._available.wait_for(self._pick_slot)
+            restart = not slot.is_healthy() or (self._retiring(slot) and slot.active == 0)
+            if restart:
+                slot.restarting = True
+                slot.idle_contexts = []
+            slot.active += 1
+
+        if restart:
+            try:
+                await self._restart(slot)
+            except BaseException:
+                async with self._available:
+                    slot.active -= 1
+                    self._available.notify_all()
+                raise
+
+        async with self._available:
+            context = slot.idle_contexts.pop() if slot.idle_contexts else None
+            slot.uses += 1
+            generation = slot.generation
+
+        if context is None:
+            try:
+                context = await new_context(slot.browser, self.settings)
+            except BaseException:
+                async with self._available:
+                    slot.active -= 1
+                    self._available.notify_all()
+                raise
+        return slot, context, generation
+
+    async def _checkin(self, slot: PooledBrowser, context, generation: int, reusable: bool):
+        """コンテキストを返却する"""
+        # 貸出中にブラウザが再起動された場合、そのコンテキストは古いブラウザのもの
+        reusable = reusable and slot.generation == generation and slot.is_healthy()
+        if reusable:
+            try:
+                for page in context.pages:
+                    await page.close()
+                await context.clear_cookies()
+                await context.add_cookies(build_cookies(self.settings))
+            except Exception:
+                reusable = False
+        if not reusable:
+            try:
+                await context.close()
+            except Exception:
+                pass
+
+        async with self._available:
+            slot.active -= 1
+            restart = self._retiring(slot) and slot.active == 0 and not slot.restarting
+            if restart:
+                slot.restarting = True
+                slot.idle_contexts = []
+            elif reusable and slot.generation == generation:
+                slot.idle_contexts.append(context)
+            self._available.notify_all()
+
+        if restart:
+            try:
+                await self._restart(slot)
+            except Exception as e:
+                logger.error(f"ブラウザの再起動に失敗しました: {e}")
+
+    @asynccontextmanager
+    async def acquire(self):
+        """コンテキストを借りる
+
+        Yields:
+            BrowserContext: 貸し出されたブラウザコンテキスト
+
+        Raises:
+            ScraperError: プールが起動していない、または貸出待ちがタイムアウトした場合
+        """
+        if not self._started:
+            raise ScraperError("ブラウザプールが起動していません")
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.settings.browser_pool_acquire_timeout)
+        except asyncio.TimeoutError:
+            raise ScraperError("ブラウザプールの空き待ちがタイムアウトしました")
+
+        try:
+            slot, context, generation = await self._checkout()
+            STAGE_DURATION.observe(time.perf_counter() - started, stage="context_acquire")
+            reusable = True
+            try:
+                yield context
+            except BaseException:
+                reusable = False
+                raise
+            finally:
+                await self._checkin(slot, context, generation, reusable)
+        finally:
+            self._semaphore.release()
+
+_pool: Optional[BrowserPool] = None
+
+POOL_CONTEXTS_IN_USE.set_function(lambda: _pool.in_use if _pool else 0)
+POOL_CONTEXTS_CAPACITY.set_function(lambda: _pool.capacity if _pool else 0)
+
+def get_browser_pool() -> Optional[BrowserPool]:
+    """起動中のブラウザプールを返す（未起動の場合はNone）"""
+    return _pool
+
+async def start_browser_pool(settings: Settings = None) -> BrowserPool:
+    """ブラウザプールを起動してアプリ全体で共有する"""
+    global _pool
+    if _pool is None:
+        pool = BrowserPool(settings)
+        await pool.start()
+        _pool = pool
+    return _pool
+
+async def stop_browser_pool():
+    """共有ブラウザプールを停止する"""
+    global _pool
+    if _pool is not None:
+        pool, _pool = _pool, None
+        await pool.stop()
+        logger.info("ブラウザプールを停止しました")
@@ -1,10 +1,48 @@
 from pathlib import Path
 from datetime import datetime, timedelta
+import asyncio
 import csv
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Optional
 from .price_analysis import format_price_analysis
+from .result_index import get_result_index
+from .result_writers import RESULT_WRITERS, TEMP_SUFFIX, header_rows, result_filename
+from .metrics import observe_stage
+from app.config.settings import Settings, get_settings
 from app.config.logger import setup_logger
 
 logger = setup_logger(__name__)
+
+# ファイル操作専用のスレッドプール（イベントループを止めないために使用）
+_executor: Optional[ThreadPoolExecutor] = None
+
+def get_file_executor() -> ThreadPoolExecutor:
+    """ファイル操作用のスレッドプールを返す関数"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, get_settings().file_io_workers),
+            thread_name_prefix="file-io"
+        )
+    return _executor
+
+def shutdown_file_executor():
+    """ファイル操作用のスレッドプールを停止する関数"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+        _executor = None
+
+async def run_file_io(func, *args, **kwargs):
+    """同期のファイル操作をファイル操作用のスレッドプールで実行する関数"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_file_executor(), partial(func, *args, **kwargs))
+
 def setup_results_dir():
     """結果を保存するディレクトリをセットアップする関数"""
     root_dir = Path(__file__).parent.parent.parent
@@ -12,27 +50,133 @@ def setup_results_dir():
     results_dir.mkdir(exist_ok=True)
     return results_dir
 
+# ULIDで使用するCrockfordのBase32
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+
+def new_ulid() -> str:
+    """時刻順に並ぶ一意なID（ULID）を作成する関数
+
+    先頭48ビットがミリ秒単位の時刻、残り80ビットが乱数の26文字。
+    """
+    value = (int(time.time() * 1000) << 80) | int.from_bytes(os.urandom(10), 'big')
+    chars = []
+    for _ in range(26):
+        value, index = divmod(value, 32)
+        chars.append(_ULID_ALPHABET[index])
+    return "".join(reversed(chars))
+
+def keyword_slug(keyword, max_length=32) -> str:
+    """キーワードからファイル名に使える英数字のスラッグを作成する関数"""
+    slug = re.sub(r'[^a-z0-9]+', '-', unicodedata.normalize('NFKC', keyword).lower()).strip('-')
+    return slug[:max_length].rstrip('-')
+
+def generate_result_filename(keyword, extension=".csv") -> str:
+    """検索ごとに重複しない、作成順に並ぶ結果ファイル名を作成する関数"""
+    slug = keyword_slug(keyword)
+    return f"{new_ulid()}_{slug}{extension}" if slug else f"{new_ulid()}{extension}"
+
 def cleanup_files():
-    """古いファイルをクリーンアップ"""
+    """古いファイルをクリーンアップ
+
+    ディレクトリ全体を走査するため、通常はバックグラウンドの`sweep_results`を使用する。
+    """
     results_dir = setup_results_dir()
     now = datetime.now()
+    retention = timedelta(seconds=get_settings().result_retention_seconds)
         
-    # 古いファイルを検索（1時間以上経過）
+    # 古いファイルを検索（保持期間以上経過）
     old_files = [
-        file for file in results_dir.glob("*.csv")
-        if datetime.fromtimestamp(file.stat().st_mtime) < now - timedelta(hours=1)
+        file for file in iter_result_files(results_dir)
+        if datetime.fromtimestamp(file.stat().st_mtime) < now - retention
     ]
         
     # ファイルを削除
     for file in old_files:
         try:
             file.unlink()
+            get_result_index().remove(file.name)
             logger.info(f"ファイルを削除しました: {file}")
         except Exception as e:
             logger.error(f"ファイル削除エラー: {e}")
 
-def save_to_file(data, keyword, filename, is_first_page=False, is_last_page=False, analysis=None):
-    """データをCSVファイルに保存する関数"""
+def iter_result_files(results_dir):
+    """結果ディレクトリ内の、対応する形式の結果ファイルを返す関数"""
+    extensions = tuple(writer.extension for writer in RESULT_WRITERS.values())
+    return [file for file in results_dir.iterdir() if file.name.endswith(extensions)]
+
+def enabled_result_formats(settings: Settings = None):
+    """設定された出力形式のうち、使用できる形式を返す関数（csvは常に含める）"""
+    settings = settings or get_settings()
+    formats = ["csv"]
+    for name in settings.result_formats:
+        writer = RESULT_WRITERS.get(name)
+        if writer is None:
+            logger.warning(f"未対応の出力形式のため無視します: {name}")
+        elif not writer.is_available():
+            logger.warning(f"必要なライブラリが無いため出力形式を無視します: {name}")
+        elif name not in formats:
+            formats.append(name)
+    return formats
+
+def record_result_file(filepath, keyword=None):
+    """書き込んだ結果ファイルの情報を索引に登録する関数"""
+    try:
+        file_stat = os.stat(filepath)
+    except FileNotFoundError:
+        return
+    get_result_index().record(Path(filepath).name, file_stat.st_size, file_stat.st_mtime, keyword)
+
+def read_keyword(filepath):
+    """結果ファイルの先頭行から検索キーワードを読み取る関数"""
+    try:
+        with open(filepath, 'r', encoding='utf-8', newline='') as f:
+            first_row = next(csv.reader(f), [])
+    except (OSError, UnicodeDecodeError):
+        return None
+    if len(first_row) == 2 and first_row[0] == '検索キーワード':
+        return first_row[1]
+    return None
+
+def load_result_index():
+    """起動時に結果ディレクトリを一度だけ走査して索引を作成する関数"""
+    index = get_result_index()
+    results_dir = setup_results_dir()
+    for file in iter_result_files(results_dir):
+        keyword = read_keyword(file) if file.suffix == ".csv" else None
+        record_result_file(file, keyword)
+
+    # 前回の終了時に書きかけだった一時ファイルを削除する
+    for file in results_dir.glob(f"*{TEMP_SUFFIX}"):
+        try:
+            file.unlink()
+        except OSError as e:
+            logger.error(f"ファイル削除エラー: {e}")
+    index.loaded = True
+    logger.info(f"結果ファイルの索引を作成しました（{len(index)}件）")
+
+def sweep_results():
+    """索引をもとに保持期限を過ぎたファイルと容量上限を超えた古いファイルを削除する関数"""
+    settings = get_settings()
+    results_dir = setup_results_dir()
+    expired = get_result_index().pop_expired(
+        settings.result_retention_seconds,
+        settings.result_retention_max_bytes
+    )
+    for entry in expired:
+        try:
+            (results_dir / entry.name).unlink()
+            logger.info(f"ファイルを削除しました: {entry.name}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"ファイル削除エラー: {e}")
+    return len(expired)
+
+def append_items(data, keyword, filename, is_first_page=False):
+    """商品情報の行をCSVファイルに追記する関数
+
+    初回ページの場合はファイルを新規作成し、ヘッダー情報を書き込む。
+    """
     if not data:
         logger.warning("⚠️ 保存するデータがありません")
         return
@@ -48,23 +192,237 @@ def save_to_file(data, keyword, filename, is_first_page=False, is_last_page=Fals
         
         if is_first_page:
             # ヘッダー情報を追加（初回のみ）
-            writer.writerow(['検索キーワード', keyword])
-            writer.writerow(['取得開始日時', datetime.now().strftime('%Y-%m-%d %H:%M:%S')])
-            writer.writerow([])  # 空行
-            writer.writerow(['商品名', '価格'])
+            writer.writerows(header_rows(keyword))
         
         # 商品情報を書き込み
         for item in data:
             writer.writerow([item['name'], item['price']])
-        
-        # 最後のページの場合、全商品の価格分析を追加
-        if is_last_page and analysis:
-            # 分析結果をCSVに追記
-            analysis_rows = format_price_analysis(analysis)
-            for row in analysis_rows:
-                writer.writerow(row)
+    record_result_file(filepath, keyword)
                 
     if is_first_page:
         logger.info(f"結果ファイルを作成しました: {filepath}")
     logger.info(f"ページ {filename} の商品情報を保存しました（{len(data)}件）")
 
+def write_analysis(filename, analysis):
+    """全商品の価格分析をCSVファイルの末尾に書き込む関数（商品行は書き込まない）"""
+    results_dir = setup_results_dir()
+    filepath = results_dir / filename
+    
+    with open(filepath, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        for row in format_price_analysis(analysis):
+            writer.writerow(row)
+    record_result_file(filepath)
+    logger.info(f"価格分析を保存しました: {filepath}")
+
+def save_to_file(data, keyword, filename, is_first_page=False, is_last_page=False, analysis=None):
+    """データをCSVファイルに保存する関数
+
+    商品行の追記と、最後のページの場合は価格分析の書き込みをまとめて行う。
+    スクレイピング後に分析だけを書き込む場合は`write_analysis`を使用する。
+    """
+    if not data:
+        logger.warning("⚠️ 保存するデータがありません")
+        return
+
+    append_items(data, keyword, filename, is_first_page=is_first_page)
+        
+    # 最後のページの場合、全商品の価格分析を追加
+    if is_last_page and analysis:
+        write_analysis(filename, analysis)
+
+_sweeper_task: Optional[asyncio.Task] = None
+
+def is_sweeper_running() -> bool:
+    """バックグラウンドの削除処理が動作中かどうかを返す関数"""
+    return _sweeper_task is not None and not _sweeper_task.done()
+
+async def _sweep_periodically(interval):
+    while True:
+        try:
+            await run_file_io(sweep_results)
+        except Exception as e:
+            logger.error(f"古いファイルの削除中にエラーが発生しました: {e}")
+        await asyncio.sleep(interval)
+
+async def start_retention_sweeper():
+    """索引を作成し、古いファイルを定期的に削除するタスクを開始する関数"""
+    global _sweeper_task
+    if is_sweeper_running():
+        return
+    await run_file_io(load_result_index)
+    _sweeper_task = asyncio.create_task(_sweep_periodically(max(1, get_settings().retention_sweep_interval)))
+
+async def stop_retention_sweeper():
+    """古いファイルを削除するタスクを停止する関数"""
+    global _sweeper_task
+    if _sweeper_task is not None:
+        _sweeper_task.cancel()
+        await asyncio.gather(_sweeper_task, return_exceptions=True)
+        _sweeper_task = None
+
+async def setup_results_dir_async():
+    """`setup_results_dir`の非同期版"""
+    return await run_file_io(setup_results_dir)
+
+async def cleanup_files_async():
+    """`cleanup_files`の非同期版"""
+    await run_file_io(cleanup_files)
+
+async def append_items_async(data, keyword, filename, is_first_page=False):
+    """`append_items`の非同期版"""
+    await run_file_io(append_items, data, keyword, filename, is_first_page=is_first_page)
+
+async def write_analysis_async(filename, analysis):
+    """`write_analysis`の非同期版"""
+    await run_file_io(write_analysis, filename, analysis)
+
+async def save_to_file_async(data, keyword, filename, is_first_page=False, is_last_page=False, analysis=None):
+    """`save_to_file`の非同期版"""
+    await run_file_io(
+        save_to_file, data, keyword, filename,
+        is_first_page=is_first_page, is_last_page=is_last_page, analysis=analysis
+    )
+
+def stat_file(path) -> Optional[os.stat_result]:
+    """ファイルの情報を返す関数（存在しない場合はNone）"""
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+async def stat_file_async(path) -> Optional[os.stat_result]:
+    """`stat_file`の非同期版"""
+    return await run_file_io(stat_file, path)
+
+class CsvWriterSession:
+    """1回のスクレイピングの間、結果ファイルを開いたまま書き込むセッション
+
+    行はメモリにためておき、設定された行数に達したとき（または設定によりページの区切りごと）に
+    まとめて書き込む。ファイル操作はファイル操作用のスレッドプールで実行し、
+    終了時に一度だけfsyncしてから閉じる。最初の商品が追加されるまでファイルは作成しない。
+
+    書き込み中は一時ファイル（`<filename>.part`）に書き、閉じるときに本来のファイル名へ
+    リネームして公開するため、ダウンロード側から書きかけのファイルが見えることはない。
+    例外で終了した場合は一時ファイルを削除する。
+
+    CSVに加えて、設定`result_formats`で指定された形式のファイルも同じ名前（拡張子違い）で書き込む。
+    """
+
+    def __init__(self, filename, keyword, settings: Settings = None):
+        self.filename = filename
+        self.keyword = keyword
+        self.settings = settings or get_settings()
+        self.formats = enabled_result_formats(self.settings)
+        self.filepath = None
+        self.temp_path = None
+        self.filepaths = {}  # 出力形式ごとの結果ファイルのパス
+        self.rows_buffered = 0  # 追加された行数（書き込み前の行も含む）
+        self._writers = []
+        self._buffer = []
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            await self.close()
+        else:
+            await self.abort()
+
+    def _open(self):
+        results_dir = setup_results_dir()
+        self._writers = [
+            RESULT_WRITERS[name](results_dir / result_filename(self.filename, name), self.keyword)
+            for name in self.formats
+        ]
+        for writer in self._writers:
+            writer.open()
+        self.filepaths = {writer.format_name: writer.path for writer in self._writers}
+        self.filepath = self._writers[0].path
+        self.temp_path = self._writers[0].temp_path
+        logger.info(f"結果ファイルの書き込みを開始しました: {self.temp_path}")
+
+    def _write(self, items, sync=False):
+        with observe_stage("csv_write"):
+            if not self._writers:
+                self._open()
+            for writer in self._writers:
+                writer.write_items(items)
+                writer.flush(sync)
+
+    def _write_analysis(self, analysis):
+        if not self._writers:
+            self._open()
+        for writer in self._writers:
+            writer.write_analysis(analysis)
+            writer.flush()
+
+    def _publish(self):
+        writers, self._writers = self._writers, []
+        with observe_stage("file_publish"):
+            # 1つの形式でも確定に失敗した場合は、どの形式も公開しない
+            try:
+                for writer in writers:
+                    writer.finish()
+            except Exception:
+                self._writers = writers
+                self._discard()
+                raise
+            for writer in writers:
+                writer.publish()
+                record_result_file(writer.path, self.keyword)
+
+    def _discard(self):
+        writers, self._writers = self._writers, []
+        for writer in writers:
+            try:
+                writer.discard()
+            except Exception as e:
+                logger.error(f"一時ファイルの削除に失敗しました: {writer.temp_path}: {e}")
+
+    async def append_items(self, items):
+        """商品情報の行を追加する"""
+        if not items:
+            logger.warning("⚠️ 保存するデータがありません")
+            return
+        self._buffer.extend(items)
+        self.rows_buffered += len(items)
+        if len(self._buffer) >= self.settings.csv_flush_rows:
+            await self.flush()
+
+    async def end_page(self):
+        """ページの区切りを通知する"""
+        if self.settings.csv_flush_on_page:
+            await self.flush()
+
+    async def write_analysis(self, analysis):
+        """全商品の価格分析をファイル末尾に書き込む（分析を持たない形式では何もしない）"""
+        await self.flush()
+        async with self._lock:
+            await run_file_io(self._write_analysis, analysis)
+        logger.info(f"価格分析を保存しました: {self.filepath}")
+
+    async def flush(self, sync=False):
+        """ためている行をファイルに書き込む"""
+        async with self._lock:
+            items, self._buffer = self._buffer, []
+            if items or (sync and self._writers):
+                await run_file_io(self._write, items, sync)
+
+    async def close(self):
+        """残りの行を書き込み、fsyncしてファイルを閉じ、本来のファイル名で公開する"""
+        await self.flush(sync=True)
+        async with self._lock:
+            if self._writers:
+                await run_file_io(self._publish)
+                logger.info(f"{self.filename} の商品情報を保存しました（{self.rows_buffered}件）")
+
+    async def abort(self):
+        """書き込みを中止して一時ファイルを削除する"""
+        self._buffer = []
+        async with self._lock:
+            if self._writers:
+                await run_file_io(self._discard)
+                logger.info(f"{self.filename} の書き込みを中止しました")
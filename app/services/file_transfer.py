@@ -0,0 +1,115 @@
+import zlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import AsyncIterator, BinaryIO, Optional, Tuple
+from .file_manager import run_file_io
+
+class RangeNotSatisfiableError(ValueError):
+    """Rangeヘッダーの範囲がファイルの外にある場合の例外"""
+
+def make_etag(size: int, mtime: float) -> str:
+    """ファイルサイズと更新日時からETagを作成する関数"""
+    return f'"{int(mtime * 1_000_000):x}-{size:x}"'
+
+def http_date(mtime: float) -> str:
+    """UNIX時間をHTTPの日時形式（Last-Modified）に変換する関数"""
+    return formatdate(mtime, usegmt=True)
+
+def _strip_weak(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+def is_not_modified(etag: str, mtime: float, if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    """条件付きリクエストに対して304を返せるかどうかを判定する関数
+
+    If-None-Matchがある場合はそちらを優先し、If-Modified-Sinceは無視する。
+    """
+    if if_none_match:
+        tags = [_strip_weak(tag.strip()) for tag in if_none_match.split(",")]
+        return "*" in tags or _strip_weak(etag) in tags
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTPの日時は秒単位のため、更新日時の端数を切り捨てて比較する
+        return datetime.fromtimestamp(int(mtime), timezone.utc) <= since
+    return False
+
+def parse_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Rangeヘッダーを解析して(開始位置, 終了位置)を返す関数（終了位置を含む）
+
+    単一のバイト範囲のみ対応し、複数範囲や解釈できない指定の場合はNone（ファイル全体）を返す。
+
+    Raises:
+        RangeNotSatisfiableError: 範囲がファイルの外にある場合
+    """
+    if not range_header or not range_header.startswith("bytes="):
+        return None
+    spec = range_header[len("bytes="):].strip()
+    if "," in spec or "-" not in spec:
+        return None
+    first, last = (part.strip() for part in spec.split("-", 1))
+    try:
+        if not first:
+            # 末尾からのバイト数の指定（bytes=-500）
+            length = int(last)
+            if length <= 0:
+                raise RangeNotSatisfiableError(range_header)
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = int(last) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiableError(range_header)
+    if start > end:
+        return None
+    return start, min(end, size - 1)
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Accept-Encodingヘッダーでgzipが受け入れられているかどうかを判定する関数"""
+    if not accept_encoding:
+        return False
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if coding.strip().lower() in ("gzip", "*"):
+            return params.replace(" ", "") not in ("q=0", "q=0.0", "q=0.00", "q=0.000")
+    return False
+
+async def open_file_async(path) -> Optional[BinaryIO]:
+    """ファイルをバイナリ読み込み用に開く（存在しない場合はNone）"""
+    try:
+        return await run_file_io(open, path, 'rb')
+    except FileNotFoundError:
+        return None
+
+async def iter_file(f: BinaryIO, start: int = 0, length: Optional[int] = None, chunk_size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """開いたファイルの指定範囲を一定サイズずつ読み込む非同期ジェネレーター
+
+    読み込みはファイル操作用のスレッドプールで行い、読み終えたらファイルを閉じる。
+    """
+    try:
+        if start:
+            await run_file_io(f.seek, start)
+        remaining = length
+        while remaining is None or remaining > 0:
+            size = chunk_size if remaining is None else min(chunk_size, remaining)
+            chunk = await run_file_io(f.read, size)
+            if not chunk:
+                break
+            if remaining is not None:
+                remaining -= len(chunk)
+            yield chunk
+    finally:
+        await run_file_io(f.close)
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """バイト列のチャンクをgzip形式に圧縮しながら返す非同期ジェネレーター"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        data = await run_file_io(compressor.compress, chunk)
+        if data:
+            yield data
+    yield compressor.flush()
@@ -0,0 +1,115 @@
+import importlib.util
+from typing import Dict, List, Optional, Tuple
+import httpx
+from selectolax.lexbor import LexborHTMLParser, SelectolaxError
+from app.config.settings import Settings, get_settings
+from app.config.logger import setup_logger
+from app.models.exceptions import FastPathError
+from app.models.price_stats import parse_price
+from .browser_pool import build_cookies
+
+logger = setup_logger(__name__)
+
+# テキストとして扱わない要素
+SKIP_TEXT_TAGS = ["script", "style", "template", "noscript"]
+
+def http2_available() -> bool:
+    """HTTP/2に必要なライブラリ（h2）がインストールされているかどうか"""
+    return importlib.util.find_spec("h2") is not None
+
+def create_http_client(settings: Settings) -> httpx.AsyncClient:
+    """ブラウザと同じユーザーエージェント・クッキーを設定したHTTPクライアントを作成する関数"""
+    cookies = httpx.Cookies()
+    for cookie in build_cookies(settings):
+        cookies.set(cookie['name'], cookie['value'], domain=cookie['domain'], path=cookie['path'])
+
+    http2 = settings.http_fast_path_http2 and http2_available()
+    if settings.http_fast_path_http2 and not http2:
+        logger.warning("h2がインストールされていないため、HTTP/1.1で接続します")
+    return httpx.AsyncClient(
+        http2=http2,
+        headers={
+            "User-Agent": settings.user_agent,
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+            "Accept-Language": settings.locale + ",ja;q=0.9",
+        },
+        cookies=cookies,
+        timeout=settings.http_fast_path_timeout,
+        limits=httpx.Limits(
+            max_connections=settings.http_fast_path_max_connections,
+            max_keepalive_connections=settings.http_fast_path_max_connections,
+        ),
+        follow_redirects=True
+    )
+
+# アプリ全体で共有するHTTPクライアント（接続を使い回すため）
+_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client(settings: Settings = None) -> httpx.AsyncClient:
+    """共有のHTTPクライアントを返す関数（初回の呼び出しで作成する）"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client(settings or get_settings())
+    return _client
+
+async def close_http_client():
+    """共有のHTTPクライアントを閉じる関数"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+async def fetch_html(client: httpx.AsyncClient, url: str) -> str:
+    """ページのHTMLを取得する関数
+
+    Raises:
+        FastPathError: 通信エラー、200以外の応答、HTML以外の応答の場合
+    """
+    try:
+        response = await client.get(url)
+    except httpx.HTTPError as e:
+        raise FastPathError(f"HTTPでの取得に失敗しました: {e}")
+    if response.status_code != 200:
+        raise FastPathError(f"HTTPステータスが不正です: {response.status_code}")
+    if "html" not in response.headers.get("content-type", ""):
+        raise FastPathError(f"HTML以外の応答です: {response.headers.get('content-type')}")
+    return response.text
+
+def extract_rows_from_html(html: str, fields: Dict[str, str], cell_selector: str, next_selector: str,
+                           links: Optional[Dict[str, str]] = None) -> Tuple[List[Dict[str, Optional[str]]], bool]:
+    """HTMLから商品セルごとの各項目のテキスト・リンク先と次ページの有無を取り出す関数
+
+    ブラウザでの一括取得（EXTRACT_ITEMS_SCRIPT）と同じ形式の行を返す。テキストの空白は1つにまとめる。
+
+    Raises:
+        FastPathError: セレクタを解釈できない場合
+    """
+    tree = LexborHTMLParser(html)
+    tree.strip_tags(SKIP_TEXT_TAGS)
+    rows = []
+    try:
+        for cell in tree.css(cell_selector):
+            row = {}
+            for key, selector in fields.items():
+                element = cell.css_first(selector)
+                row[key] = " ".join(element.text(deep=True).split()) if element is not None else None
+            for key, selector in (links or {}).items():
+                element = cell.css_first(selector)
+                row[key] = element.attributes.get("href") if element is not None else None
+            rows.append(row)
+        has_next = tree.css_first(next_selector) is not None
+    except SelectolaxError as e:
+        raise FastPathError(f"セレクタを解釈できません: {e}")
+    return rows, has_next
+
+def validate_rows(rows: List[Dict[str, Optional[str]]], settings: Settings):
+    """取り出した行が商品一覧として妥当かどうかを確認する関数
+
+    Raises:
+        FastPathError: 商品セルが無い、または商品名と価格を読み取れる行の割合が設定値未満の場合
+    """
+    if not rows:
+        raise FastPathError("HTMLに商品セルがありません")
+    valid = sum(1 for row in rows if row.get('name') and parse_price(row.get('price')) is not None)
+    if valid / len(rows) < settings.http_fast_path_min_valid_ratio:
+        raise FastPathError(f"商品情報を読み取れた割合が低すぎます（{valid}/{len(rows)}件）")
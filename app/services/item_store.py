@@ -0,0 +1,367 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+from app.config.settings import Settings, get_settings
+from app.config.logger import setup_logger
+from app.models.price_stats import parse_price
+from .pipeline import PageSink, ScrapedPage
+
+logger = setup_logger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    item_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    price INTEGER,
+    price_text TEXT NOT NULL,
+    first_seen_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS price_history (
+    item_id TEXT NOT NULL,
+    price INTEGER,
+    price_text TEXT NOT NULL,
+    observed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_item ON price_history (item_id, observed_at);
+CREATE TABLE IF NOT EXISTS item_keywords (
+    keyword TEXT NOT NULL,
+    item_id TEXT NOT NULL,
+    first_seen_at REAL NOT NULL,
+    last_seen_at REAL NOT NULL,
+    PRIMARY KEY (keyword, item_id)
+);
+CREATE INDEX IF NOT EXISTS idx_item_keywords_last_seen ON item_keywords (keyword, last_seen_at);
+CREATE TABLE IF NOT EXISTS scrapes (
+    scrape_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    keyword TEXT NOT NULL,
+    filename TEXT,
+    started_at REAL NOT NULL,
+    finished_at REAL,
+    item_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_scrapes_keyword ON scrapes (keyword, started_at);
+CREATE INDEX IF NOT EXISTS idx_scrapes_filename ON scrapes (filename);
+CREATE TABLE IF NOT EXISTS scrape_items (
+    scrape_id INTEGER NOT NULL,
+    item_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (scrape_id, item_id)
+);
+"""
+
+# SQLiteの1文で使えるパラメータ数の上限を超えないよう、IN句はこの件数ずつに分ける
+_IN_CHUNK = 500
+
+def _chunks(values: List[str], size: int = _IN_CHUNK) -> Iterable[List[str]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def format_timestamp(value: Optional[float]) -> Optional[str]:
+    """UNIX時刻をISO形式の文字列に変換する関数"""
+    return datetime.fromtimestamp(value).isoformat(timespec="seconds") if value is not None else None
+
+@dataclass
+class UpsertResult:
+    """1ページ分の保存結果"""
+    stored: int = 0  # 保存した商品数（商品IDが無い商品と重複を除く）
+    new_items: int = 0  # 初めて見つかった商品数
+    price_changes: int = 0  # 前回から価格が変わった商品数
+
+class ItemStore:
+    """商品を商品IDごとに保存するSQLiteのデータベース
+
+    商品名と現在の価格に加えて、価格が変わるたびに価格履歴を記録する。
+    どのキーワードの検索で見つかったか、検索ごとにどの商品が含まれていたかも記録し、
+    スクレイピングをやり直さずに前回の結果を取り出せるようにする。
+
+    SQLiteへの書き込みは1つに限られるため、操作はすべて専用のスレッド1つで順に実行する。
+    読み込みと書き込みが互いを待たないよう、WALモードで開く。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="item-store")
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            # WALモードではNORMALでもデータベースが壊れることはない（電源断で直前のコミットが失われる場合のみ）
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def run(self, func, *args, **kwargs):
+        """同期の操作を専用のスレッドで実行する"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def close(self):
+        """データベースを閉じてスレッドを停止する"""
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # 以下の同期メソッドは`run`を通して専用のスレッドから呼び出す
+
+    def start_scrape(self, keyword: str, filename: Optional[str] = None) -> int:
+        """検索の開始を記録し、検索IDを返す"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO scrapes (keyword, filename, started_at) VALUES (?, ?, ?)",
+                    (keyword, filename, time.time())
+                )
+            return cursor.lastrowid
+
+    def finish_scrape(self, scrape_id: int, filename: Optional[str] = None):
+        """検索の終了を記録する"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "UPDATE scrapes SET finished_at = ?, filename = COALESCE(?, filename), "
+                    "item_count = (SELECT COUNT(*) FROM scrape_items WHERE scrape_id = ?) WHERE scrape_id = ?",
+                    (time.time(), filename, scrape_id, scrape_id)
+                )
+
+    def upsert_items(self, scrape_id: int, keyword: str, items: List[Dict[str, Any]],
+                     observed_at: Optional[float] = None) -> UpsertResult:
+        """1ページ分の商品をまとめて保存する（1回のトランザクション）
+
+        商品IDの無い商品は保存しない。同じ検索で既に保存した商品は、検索内の並び順を変えずに価格だけ更新する。
+        """
+        observed_at = observed_at or time.time()
+        records: Dict[str, Dict[str, Any]] = {}
+        for item in items:
+            item_id = item.get('item_id')
+            if item_id:
+                records[item_id] = item
+        result = UpsertResult(stored=len(records))
+        if not records:
+            return result
+
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                item_ids = list(records)
+                current: Dict[str, Optional[str]] = {}
+                for chunk in _chunks(item_ids):
+                    placeholders = ",".join("?" * len(chunk))
+                    for row in conn.execute(
+                        f"SELECT item_id, price_text FROM items WHERE item_id IN ({placeholders})", chunk
+                    ):
+                        current[row["item_id"]] = row["price_text"]
+
+                history = []
+                for item_id, item in records.items():
+                    if item_id not in current:
+                        result.new_items += 1
+                    elif current[item_id] == item['price']:
+                        continue
+                    else:
+                        result.price_changes += 1
+                    history.append((item_id, parse_price(item['price']), item['price'], observed_at))
+
+                conn.executemany(
+                    "INSERT INTO items (item_id, name, price, price_text, first_seen_at, last_seen_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (item_id) DO UPDATE SET name = excluded.name, price = excluded.price, "
+                    "price_text = excluded.price_text, last_seen_at = excluded.last_seen_at",
+                    [
+                        (item_id, item['name'], parse_price(item['price']), item['price'], observed_at, observed_at)
+                        for item_id, item in records.items()
+                    ]
+                )
+                conn.executemany(
+                    "INSERT INTO price_history (item_id, price, price_text, observed_at) VALUES (?, ?, ?, ?)",
+                    history
+                )
+                conn.executemany(
+                    "INSERT INTO item_keywords (keyword, item_id, first_seen_at, last_seen_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (keyword, item_id) DO UPDATE SET last_seen_at = excluded.last_seen_at",
+                    [(keyword, item_id, observed_at, observed_at) for item_id in item_ids]
+                )
+                position = conn.execute(
+                    "SELECT COALESCE(MAX(position), -1) + 1 FROM scrape_items WHERE scrape_id = ?", (scrape_id,)
+                ).fetchone()[0]
+                conn.executemany(
+                    "INSERT OR IGNORE INTO scrape_items (scrape_id, item_id, position) VALUES (?, ?, ?)",
+                    [(scrape_id, item_id, position + offset) for offset, item_id in enumerate(item_ids)]
+                )
+        return result
+
+    def extend_scrape(self, scrape_id: int, from_scrape_id: int, min_last_seen_at: Optional[float] = None) -> int:
+        """別の検索に含まれていた商品を、この検索の末尾に同じ順で追加する（既に含まれる商品は除く）
+
+        `min_last_seen_at`（UNIX時刻）を指定した場合は、それより後に見つかっていない商品
+        （売れた・削除された可能性のある商品）を追加しない。
+
+        Returns:
+            int: 追加した商品数
+        """
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                offset = conn.execute(
+                    "SELECT COALESCE(MAX(position), -1) + 1 FROM scrape_items WHERE scrape_id = ?", (scrape_id,)
+                ).fetchone()[0]
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO scrape_items (scrape_id, item_id, position) "
+                    "SELECT ?, s.item_id, s.position + ? FROM scrape_items s JOIN items i ON i.item_id = s.item_id "
+                    "WHERE s.scrape_id = ? AND i.last_seen_at >= ? ORDER BY s.position",
+                    (scrape_id, offset, from_scrape_id, min_last_seen_at if min_last_seen_at is not None else 0)
+                )
+            return cursor.rowcount
+
+    def known_item_ids(self, keyword: str, item_ids: List[str]) -> Set[str]:
+        """指定した商品IDのうち、キーワードの検索で見つかったことがあるものを返す"""
+        known = set()
+        with self._lock:
+            conn = self._connect()
+            for chunk in _chunks(list(item_ids)):
+                placeholders = ",".join("?" * len(chunk))
+                known.update(
+                    row[0] for row in conn.execute(
+                        f"SELECT item_id FROM item_keywords WHERE keyword = ? AND item_id IN ({placeholders})",
+                        [keyword, *chunk]
+                    )
+                )
+        return known
+
+    def get_scrape(self, scrape_id: int) -> Optional[Dict[str, Any]]:
+        """検索の情報を返す（無い場合はNone）"""
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM scrapes WHERE scrape_id = ?", (scrape_id,)).fetchone()
+        return dict(row) if row else None
+
+    def latest_scrape(self, keyword: str) -> Optional[Dict[str, Any]]:
+        """キーワードの最後に終了した検索の情報を返す（無い場合はNone）"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM scrapes WHERE keyword = ? AND finished_at IS NOT NULL "
+                "ORDER BY started_at DESC, scrape_id DESC LIMIT 1",
+                (keyword,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_scrape_by_filename(self, filename: str) -> Optional[Dict[str, Any]]:
+        """結果ファイル名から終了した検索の情報を返す（無い場合はNone）"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT * FROM scrapes WHERE filename = ? AND finished_at IS NOT NULL "
+                "ORDER BY scrape_id DESC LIMIT 1",
+                (filename,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def scrape_items(self, scrape_id: int, as_of: Optional[float] = None) -> List[Dict[str, Any]]:
+        """検索に含まれていた商品を検索時の順に返す
+
+        価格は現在の価格。`as_of`（UNIX時刻）を指定した場合は、価格履歴からその時点の価格を返す。
+        """
+        with self._lock:
+            if as_of is None:
+                rows = self._connect().execute(
+                    "SELECT i.item_id, i.name, i.price_text FROM scrape_items s "
+                    "JOIN items i ON i.item_id = s.item_id WHERE s.scrape_id = ? ORDER BY s.position",
+                    (scrape_id,)
+                ).fetchall()
+            else:
+                rows = self._connect().execute(
+                    "SELECT i.item_id, i.name, COALESCE(("
+                    "SELECT h.price_text FROM price_history h WHERE h.item_id = s.item_id AND h.observed_at <= ? "
+                    "ORDER BY h.observed_at DESC LIMIT 1"
+                    "), i.price_text) AS price_text FROM scrape_items s "
+                    "JOIN items i ON i.item_id = s.item_id WHERE s.scrape_id = ? ORDER BY s.position",
+                    (as_of, scrape_id)
+                ).fetchall()
+        return [{'name': row["name"], 'price': row["price_text"], 'item_id': row["item_id"]} for row in rows]
+
+    def price_history(self, item_id: str) -> List[Dict[str, Any]]:
+        """商品の価格履歴を古い順に返す"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT price, price_text, observed_at FROM price_history WHERE item_id = ? ORDER BY observed_at",
+                (item_id,)
+            ).fetchall()
+        return [
+            {'price': row["price"], 'price_text': row["price_text"], 'observed_at': format_timestamp(row["observed_at"])}
+            for row in rows
+        ]
+
+    def get_item(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """商品の現在の情報を返す（無い場合はNone）"""
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM items WHERE item_id = ?", (item_id,)).fetchone()
+        if row is None:
+            return None
+        return {
+            'item_id': row["item_id"],
+            'name': row["name"],
+            'price': row["price_text"],
+            'first_seen_at': format_timestamp(row["first_seen_at"]),
+            'last_seen_at': format_timestamp(row["last_seen_at"])
+        }
+
+class ItemStoreSink(PageSink):
+    """ページごとの商品をデータベースに保存する出力先"""
+
+    def __init__(self, store: ItemStore, scrape_id: int, keyword: str):
+        self.store = store
+        self.scrape_id = scrape_id
+        self.keyword = keyword
+        self.result = UpsertResult()
+        self.failed = False
+
+    async def on_page(self, page: ScrapedPage):
+        if self.failed:
+            return
+        try:
+            result = await self.store.run(self.store.upsert_items, self.scrape_id, self.keyword, page.items)
+        except Exception as e:
+            # データベースの問題でスクレイピング自体を止めないよう、以降のページは保存しない
+            logger.error(f"商品データベースへの保存に失敗しました（ページ {page.number}）: {e}")
+            self.failed = True
+            return
+        self.result.stored += result.stored
+        self.result.new_items += result.new_items
+        self.result.price_changes += result.price_changes
+        if result.stored < len(page.items):
+            logger.warning(f"商品IDが無い商品は保存しません（ページ {page.number}: {len(page.items) - result.stored}件）")
+
+# アプリ全体で共有するデータベース
+_store: Optional[ItemStore] = None
+
+def get_item_store(settings: Settings = None) -> Optional[ItemStore]:
+    """共有のデータベースを返す関数（設定で無効な場合はNone）"""
+    global _store
+    settings = settings or get_settings()
+    if not settings.item_store_enabled:
+        return None
+    if _store is None:
+        _store = ItemStore(settings.item_store_path)
+    return _store
+
+def close_item_store():
+    """共有のデータベースを閉じる関数"""
+    global _store
+    if _store is not None:
+        store, _store = _store, None
+        store.close()
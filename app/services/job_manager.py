@@ -0,0 +1,154 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from app.config.settings import Settings, get_settings
+from app.config.logger import setup_logger
+from app.models.job import JobStatus, SearchJob
+from app.models.exceptions import JobManagerNotStartedError, JobNotFoundError, JobQueueFullError
+from app.services.scraper_service import scrape_and_analyze
+
+logger = setup_logger(__name__)
+
+class JobManager:
+    """検索ジョブをキューに積み、決まった数のワーカーで実行する"""
+
+    def __init__(self, settings: Settings = None, runner=None):
+        self.settings = settings or get_settings()
+        self.runner = runner or scrape_and_analyze
+        self._jobs: Dict[str, SearchJob] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """ワーカーを起動する"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=max(1, self.settings.job_queue_size))
+        for _ in range(max(1, self.settings.job_max_concurrency)):
+            self._workers.append(asyncio.create_task(self._worker()))
+        logger.info(f"ジョブワーカーを起動しました（{len(self._workers)}件）")
+
+    async def stop(self):
+        """実行中のジョブとワーカーを停止する"""
+        for task in list(self._tasks.values()) + self._workers:
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), *self._workers, return_exceptions=True)
+        self._workers = []
+        self._tasks = {}
+
+    def submit(self, keyword: str) -> SearchJob:
+        """検索ジョブを登録する
+
+        Raises:
+            JobManagerNotStartedError: ワーカーが起動していない場合
+            JobQueueFullError: キューが満杯の場合
+        """
+        if self._queue is None:
+            raise JobManagerNotStartedError("ジョブワーカーが起動していません")
+        self._prune()
+        job = SearchJob(id=uuid.uuid4().hex, keyword=keyword)
+        try:
+            self._queue.put_nowait(job.id)
+        except asyncio.QueueFull:
+            raise JobQueueFullError("実行待ちのジョブが多すぎます")
+        self._jobs[job.id] = job
+        logger.info(f"ジョブを登録しました: {job.id}（{keyword}）")
+        return job
+
+    def get(self, job_id: str) -> SearchJob:
+        """ジョブを取得する
+
+        Raises:
+            JobNotFoundError: ジョブが存在しない場合
+        """
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(f"ジョブが見つかりません: {job_id}")
+        return job
+
+    def cancel(self, job_id: str) -> SearchJob:
+        """ジョブをキャンセルする（完了済みのジョブはそのまま返す）"""
+        job = self.get(job_id)
+        if job.status.is_finished:
+            return job
+        task = self._tasks.get(job_id)
+        if task:
+            task.cancel()
+        self._finish(job, JobStatus.CANCELLED)
+        logger.info(f"ジョブをキャンセルしました: {job_id}")
+        return job
+
+    def _finish(self, job: SearchJob, status: JobStatus, result=None, error: str = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.finished_at = datetime.now()
+
+    def _prune(self):
+        """保持期間を過ぎた完了済みジョブを削除する"""
+        expires = datetime.now() - timedelta(seconds=self.settings.job_retention_seconds)
+        for job_id, job in list(self._jobs.items()):
+            if job.status.is_finished and job.finished_at < expires:
+                del self._jobs[job_id]
+
+    def _progress_callback(self, job: SearchJob):
+        def on_page(page_number: int, page_results):
+            job.pages_done = page_number
+            job.items_so_far += len(page_results)
+        return on_page
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != JobStatus.QUEUED:
+                    continue
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: SearchJob):
+        job.status = JobStatus.RUNNING
+        job.started_at = datetime.now()
+        task = asyncio.create_task(self.runner(job.keyword, progress_callback=self._progress_callback(job)))
+        self._tasks[job.id] = task
+        try:
+            result = await task
+            if not job.status.is_finished:
+                # キャッシュされた結果を返した場合は進捗が通知されないため、結果から件数を埋める
+                job.pages_done = max(job.pages_done, result.get("pages") or 0)
+                job.items_so_far = max(job.items_so_far, (result.get("analysis") or {}).get("total_items") or 0)
+                self._finish(job, JobStatus.SUCCEEDED, result=result)
+        except asyncio.CancelledError:
+            if not task.cancelled():
+                # ワーカー自体が停止された場合
+                task.cancel()
+                raise
+            if not job.status.is_finished:
+                self._finish(job, JobStatus.CANCELLED)
+        except Exception as e:
+            logger.error(f"ジョブの実行中にエラーが発生しました: {job.id}: {e}")
+            self._finish(job, JobStatus.FAILED, error=str(e))
+        finally:
+            self._tasks.pop(job.id, None)
+
+_manager: Optional[JobManager] = None
+
+def get_job_manager() -> JobManager:
+    """アプリ全体で共有するジョブマネージャーを返す"""
+    global _manager
+    if _manager is None:
+        _manager = JobManager()
+    return _manager
+
+async def start_job_manager():
+    """共有ジョブマネージャーのワーカーを起動する"""
+    await get_job_manager().start()
+
+async def stop_job_manager():
+    """共有ジョブマネージャーを停止する"""
+    if _manager is not None:
+        await _manager.stop()
@@ -0,0 +1,236 @@
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+# 処理時間（秒）のヒストグラムの区切り
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+Sample = Tuple[str, Dict[str, str], float]  # (名前, ラベル, 値)
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+class MetricsRegistry:
+    """メトリクスを登録し、Prometheusのテキスト形式で出力する"""
+
+    def __init__(self):
+        self._metrics: Dict[str, "Metric"] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: "Metric"):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"メトリクスが重複しています: {metric.name}")
+            self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional["Metric"]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """すべてのメトリクスをPrometheusのテキスト形式（0.0.4）で返す"""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# アプリ全体で共有するレジストリ
+_registry = MetricsRegistry()
+
+def get_metrics_registry() -> MetricsRegistry:
+    """アプリ全体のレジストリを返す関数"""
+    return _registry
+
+class Metric:
+    """ラベルごとの値を持つメトリクスの基底クラス
+
+    値の更新は複数のスレッド（ファイル操作用のスレッドプールなど）から呼ばれるため、ロックで保護する。
+    """
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional[MetricsRegistry] = _registry):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        self._function: Optional[Callable[[], float]] = None
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}のラベルは{self.labelnames}です: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function: Callable[[], float]):
+        """出力時に値を取得する関数を設定する（ラベルの無いメトリクスのみ）"""
+        self._function = function
+
+    def samples(self) -> Iterator[Sample]:
+        if self._function is not None:
+            yield self.name, {}, self._function()
+            return
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+class Counter(Metric):
+    """増加のみする値"""
+    type_name = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+class _InProgress:
+    def __init__(self, gauge: "Gauge", key: Tuple[str, ...]):
+        self.gauge = gauge
+        self.key = key
+
+    def __enter__(self):
+        self.gauge._add(self.key, 1)
+
+    def __exit__(self, exc_type, exc, tb):
+        self.gauge._add(self.key, -1)
+
+class Gauge(Metric):
+    """増減する値"""
+    type_name = "gauge"
+
+    def _add(self, key: Tuple[str, ...], amount: float):
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def inc(self, amount: float = 1, **labels):
+        self._add(self._key(labels), amount)
+
+    def dec(self, amount: float = 1, **labels):
+        self._add(self._key(labels), -amount)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        if self._function is not None:
+            return self._function()
+        return self._values.get(self._key(labels), 0)
+
+    def track_inprogress(self, **labels) -> _InProgress:
+        """`with`の間だけ値を1増やす"""
+        return _InProgress(self, self._key(labels))
+
+class _Timer:
+    def __init__(self, histogram: "Histogram", key: Tuple[str, ...]):
+        self.histogram = histogram
+        self.key = key
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram._observe(self.key, time.perf_counter() - self.started)
+
+class Histogram(Metric):
+    """値の分布（区切りごとの件数・合計・件数）"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DURATION_BUCKETS, registry: Optional[MetricsRegistry] = _registry):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def _observe(self, key: Tuple[str, ...], value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 区切りごとの件数（最後は+Inf）・合計・件数
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def observe(self, value: float, **labels):
+        self._observe(self._key(labels), value)
+
+    def time(self, **labels) -> _Timer:
+        """`with`の間の経過時間（秒）を記録する（例外で終了した場合も記録する）"""
+        return _Timer(self, self._key(labels))
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+        for key, (counts, total, count) in values:
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+# スクレイピングの各段階の処理時間
+# browser_launch / context_acquire / navigation / wait_items / scroll / extraction / http_fetch /
+# html_parse / parse_items / csv_write / file_publish / analysis
+STAGE_DURATION = Histogram(
+    "scraper_stage_duration_seconds", "スクレイピングの各段階の処理時間（秒）", ["stage"]
+)
+SEARCHES_IN_FLIGHT = Gauge("scraper_searches_in_flight", "実行中のスクレイピングの数")
+SEARCHES_TOTAL = Counter("scraper_searches_total", "終了したスクレイピングの数", ["outcome"])
+SEARCH_DURATION = Histogram("scraper_search_duration_seconds", "1回のスクレイピング全体の処理時間（秒）")
+PAGES_PER_SEARCH = Histogram(
+    "scraper_pages_per_search", "1回のスクレイピングで取得したページ数",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100)
+)
+ITEMS_PER_SEARCH = Histogram(
+    "scraper_items_per_search", "1回のスクレイピングで取得した商品数",
+    buckets=(10, 50, 100, 500, 1000, 5000, 10000, 50000)
+)
+PAGES_TOTAL = Counter("scraper_pages_total", "取得したページの累計", ["backend"])
+ITEMS_TOTAL = Counter("scraper_items_total", "取得した商品の累計")
+FAST_PATH_FALLBACKS = Counter("scraper_fast_path_fallbacks_total", "HTTPでの取得からブラウザに切り替えた回数")
+POOL_CONTEXTS_IN_USE = Gauge("browser_pool_contexts_in_use", "ブラウザプールで貸出中のコンテキスト数")
+POOL_CONTEXTS_CAPACITY = Gauge("browser_pool_contexts_capacity", "ブラウザプールで同時に貸し出せるコンテキストの上限")
+BLOCKED_REQUESTS = Counter("browser_blocked_requests_total", "リソースのブロック設定で止めたリクエストの累計")
+BLOCKED_BYTES_SAVED = Counter("browser_blocked_bytes_saved_total", "ブロックにより削減した推定バイト数の累計")
+HTTP_REQUESTS = Counter("http_requests_total", "APIへのリクエスト数", ["method", "route", "status"])
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "APIのレスポンスを返し終えるまでの時間（秒）", ["method", "route"]
+)
+
+def observe_stage(stage: str) -> _Timer:
+    """`with observe_stage("navigation"):`のように、段階の処理時間を記録する"""
+    return STAGE_DURATION.time(stage=stage)
+
+def render_metrics() -> str:
+    """アプリ全体のメトリクスをPrometheusのテキスト形式で返す関数"""
+    return _registry.render()
@@ -0,0 +1,112 @@
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+@dataclass
+class RawPage:
+    """ブラウザから取り出したままの1ページ分のテキスト"""
+    number: int
+    rows: List[Dict[str, Optional[str]]]
+    has_next: bool = False
+
+@dataclass
+class ScrapedPage:
+    """商品情報に変換した1ページ分の結果"""
+    number: int
+    items: List[Dict[str, str]] = field(default_factory=list)
+
+_END = object()
+
+async def buffered(source: AsyncIterator[T], maxsize: int) -> AsyncIterator[T]:
+    """非同期イテレーターを別タスクで先行して進め、上限付きのキューを通して返す関数
+
+    前段はキューが満杯になるまで後段を待たずに進むため、前段と後段の処理が重なる。
+    保持される要素はキューの上限までに限られる。前段の例外は後段で再送出し、
+    後段が途中で終了した場合は前段のタスクをキャンセルする。
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, maxsize))
+
+    async def pump():
+        try:
+            async for item in source:
+                await queue.put((item, None))
+        except Exception as e:
+            await queue.put((_END, e))
+        else:
+            await queue.put((_END, None))
+
+    task = asyncio.create_task(pump())
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is _END:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        if not task.done():
+            task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        # キューへの追加待ちで止まった前段の後始末（ページを閉じるなど）を実行する
+        aclose = getattr(source, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+class PageSink(ABC):
+    """変換済みのページを受け取る出力先の基底クラス"""
+
+    @abstractmethod
+    async def on_page(self, page: ScrapedPage):
+        """ページを受け取る"""
+
+class WriterSink(PageSink):
+    """結果ファイルの書き込みセッションにページの商品を追加する出力先"""
+
+    def __init__(self, writer):
+        self.writer = writer
+
+    async def on_page(self, page: ScrapedPage):
+        await self.writer.append_items(page.items)
+        await self.writer.end_page()
+
+class CallbackSink(PageSink):
+    """ページごとに進捗コールバックを呼び出す出力先"""
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    async def on_page(self, page: ScrapedPage):
+        self.callback(page.number, page.items)
+
+class CollectSink(PageSink):
+    """全ページの商品をリストに集める出力先"""
+
+    def __init__(self, items: Optional[List[Dict[str, str]]] = None):
+        self.items = items if items is not None else []
+
+    async def on_page(self, page: ScrapedPage):
+        self.items.extend(page.items)
+
+class CountingSink(PageSink):
+    """ページ数と商品数を数える出力先"""
+
+    def __init__(self):
+        self.pages = 0
+        self.items = 0
+
+    async def on_page(self, page: ScrapedPage):
+        self.pages += 1
+        self.items += len(page.items)
+
+async def drain_to_sinks(pages: AsyncIterator[ScrapedPage], sinks: List[PageSink]) -> int:
+    """ページを順に各出力先へ渡し、処理したページ数を返す関数"""
+    count = 0
+    async for page in pages:
+        for sink in sinks:
+            await sink.on_page(page)
+        count += 1
+    return count
@@ -1,9 +1,125 @@
-from typing import List, Dict, Any
-from app.models.price_stats import PriceAnalysis
+import dataclasses
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+import pandas as pd
+from app.models.price_stats import IncrementalPriceAnalyzer, PriceAnalysis, parse_price
+from app.config.settings import Settings, get_settings
+from .metrics import observe_stage
 
-def analyze_prices(items: List[Dict[str, Any]]) -> PriceAnalysis:
-    """商品リストから価格分析を行う関数"""
-    return PriceAnalysis.from_items(items)
+def analyze_prices(items: List[Dict[str, Any]], engine: Optional[str] = None, settings: Settings = None) -> PriceAnalysis:
+    """商品リストから価格分析を行う関数
+
+    Args:
+        items (List[Dict[str, Any]]): 商品情報のリスト
+        engine (str, optional): 分析エンジン（auto / python / vectorized）。Noneの場合は設定値を使用。
+        settings (Settings, optional): 設定オブジェクト。Noneの場合はデフォルト設定を使用。
+    """
+    if settings is None:
+        settings = get_settings()
+    with observe_stage("analysis"):
+        if select_engine(len(items), engine, settings) == "vectorized":
+            return analyze_prices_vectorized(items, settings)
+        return PriceAnalysis.from_items(items)
+
+def select_engine(count: int, engine: Optional[str], settings: Settings) -> str:
+    """件数と設定から分析エンジン（python / vectorized）を選ぶ関数"""
+    engine = engine or settings.analysis_engine
+    if engine == "auto":
+        return "vectorized" if count >= settings.vectorized_analysis_threshold else "python"
+    return engine
+
+def finalize_analysis(analyzer: IncrementalPriceAnalyzer, engine: Optional[str] = None,
+                      settings: Settings = None) -> Optional[PriceAnalysis]:
+    """ページごとに更新した価格分析を確定する関数
+
+    列指向のエンジンが選ばれる件数の場合は、保持している価格の配列から標準偏差・パーセンタイル・
+    ヒストグラムも算出する（共通の項目は更新済みの値をそのまま使う）。
+    """
+    if settings is None:
+        settings = get_settings()
+    analysis = analyzer.snapshot()
+    if analysis is None or select_engine(analyzer.count, engine, settings) != "vectorized":
+        return analysis
+    prices = np.fromiter(analyzer.prices(), dtype=np.int64, count=analyzer.count)
+    return dataclasses.replace(analysis, **price_distribution(prices, settings))
+
+def parse_prices_bulk(items: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """商品リストの価格をまとめて数値に変換する関数
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: 有効な価格の配列と、その商品の元のインデックス
+    """
+    prices = pd.Series([item.get('price') for item in items], dtype=object)
+    cleaned = prices.str.replace(',', '', regex=False).str.strip()
+    # 文字列以外はNaNになるため、Trueのものだけを有効とする
+    mask = cleaned.str.isdigit().eq(True).to_numpy()
+    indices = np.flatnonzero(mask)
+    try:
+        values = cleaned[mask].astype(np.int64).to_numpy()
+    except (ValueError, OverflowError):
+        # isdigitは通るが数値に変換できない文字（上付き数字など）を含む場合は1件ずつ変換する
+        parsed = [(index, parse_price(prices.iat[index])) for index in indices]
+        parsed = [(index, price) for index, price in parsed if price is not None]
+        indices = np.array([index for index, _ in parsed], dtype=np.int64)
+        values = np.array([price for _, price in parsed], dtype=np.int64)
+    return values, indices
+
+def analyze_prices_vectorized(items: List[Dict[str, Any]], settings: Settings = None) -> Optional[PriceAnalysis]:
+    """NumPyの配列演算で価格分析を行う関数
+
+    共通の項目は`PriceAnalysis.from_items`と同じ結果になり、加えて標準偏差・パーセンタイル・ヒストグラムを算出する。
+    """
+    if settings is None:
+        settings = get_settings()
+    if not items:
+        return None
+
+    prices, indices = parse_prices_bulk(items)
+    n = len(prices)
+    if n == 0:
+        return None
+
+    # 同じ価格の場合、最低価格は最初の商品、最高価格は最後の商品を採用する（安定ソートと同じ）
+    lowest_item = items[indices[int(np.argmin(prices))]]
+    highest_item = items[indices[n - 1 - int(np.argmax(prices[::-1]))]]
+
+    # 合計はPythonの整数で割り、純粋なPythonの計算と同じ値にする
+    average_price = int(prices.sum()) / n
+    if n % 2 == 0:
+        lower, upper = np.partition(prices, [n // 2 - 1, n // 2])[[n // 2 - 1, n // 2]]
+        median_price = (int(lower) + int(upper)) / 2
+    else:
+        median_price = int(np.partition(prices, n // 2)[n // 2])
+
+    return PriceAnalysis(
+        lowest={
+            'name': lowest_item['name'],
+            'price': f"¥{lowest_item['price']}"
+        },
+        highest={
+            'name': highest_item['name'],
+            'price': f"¥{highest_item['price']}"
+        },
+        average=average_price,
+        median=median_price,
+        total=n,
+        **price_distribution(prices, settings)
+    )
+
+def price_distribution(prices: np.ndarray, settings: Settings) -> Dict[str, Any]:
+    """価格の配列から標準偏差・パーセンタイル・ヒストグラムを算出する関数"""
+    percentile_values = np.percentile(prices, settings.analysis_percentiles)
+    counts, edges = np.histogram(prices, bins=settings.analysis_histogram_bins)
+    return {
+        'std': float(prices.std()),
+        'percentiles': {
+            f"p{p}": float(value) for p, value in zip(settings.analysis_percentiles, percentile_values)
+        },
+        'histogram': [
+            {'min': float(edges[i]), 'max': float(edges[i + 1]), 'count': int(counts[i])}
+            for i in range(len(counts))
+        ]
+    }
 
 def format_price_analysis(analysis: PriceAnalysis) -> List[List[str]]:
     """価格分析結果をCSV追記用にフォーマットする関数"""
@@ -26,7 +142,10 @@ def format_price_analysis(analysis: PriceAnalysis) -> List[List[str]]:
     return result
 
 def format_price_analysis_to_json(analysis: PriceAnalysis) -> dict:
-    """価格分析結果をJSON形式に変換する関数"""
+    """価格分析結果をJSON形式に変換する関数
+
+    分析エンジンによらず同じキーを返す。標準偏差・パーセンタイル・ヒストグラムを算出していない場合はNoneになる。
+    """
     if not analysis:
         return {
             "error": "分析対象の商品がありません"
@@ -43,5 +162,8 @@ def format_price_analysis_to_json(analysis: PriceAnalysis) -> dict:
         },
         "average_price": int(analysis.average),
         "median_price": int(analysis.median),
-        "total_items": analysis.total
+        "total_items": analysis.total,
+        "std_price": analysis.std,
+        "percentiles": analysis.percentiles,
+        "histogram": analysis.histogram
     }
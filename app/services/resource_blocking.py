@@ -0,0 +1,132 @@
+import fnmatch
+import weakref
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from app.config.settings import Settings
+from app.config.logger import setup_logger
+from .metrics import BLOCKED_BYTES_SAVED, BLOCKED_REQUESTS
+
+logger = setup_logger(__name__)
+
+class ResourcePolicy:
+    """リクエストを許可するかどうかを決めるポリシー
+
+    判定は次の順に行う。
+    1. `allowed_url_patterns`に一致するURLは常に許可
+    2. `blocked_url_patterns`に一致するURL（計測・広告など）はブロック
+    3. `allowed_resource_types`に含まれる種類は許可し、それ以外（画像・フォントなど）はブロック
+    """
+
+    def __init__(self, settings: Settings):
+        self.allowed_types = {t.lower() for t in settings.allowed_resource_types}
+        self.allowed_patterns = list(settings.allowed_url_patterns)
+        self.blocked_patterns = list(settings.blocked_url_patterns)
+
+    def should_block(self, resource_type: str, url: str) -> bool:
+        if any(fnmatch.fnmatchcase(url, pattern) for pattern in self.allowed_patterns):
+            return False
+        if any(fnmatch.fnmatchcase(url, pattern) for pattern in self.blocked_patterns):
+            return True
+        return resource_type.lower() not in self.allowed_types
+
+@dataclass
+class ResourceStats:
+    """ブロックしたリクエストと読み込んだリクエストの集計"""
+    allowed_requests: int = 0
+    allowed_bytes: int = 0  # Content-Lengthが分かるレスポンスの合計
+    blocked_requests: int = 0
+    estimated_bytes_saved: int = 0  # ブロックしたリクエストは読み込まないため、種類ごとの推定サイズで計算
+    blocked_by_type: Dict[str, int] = field(default_factory=dict)
+
+    def add(self, other: "ResourceStats"):
+        self.allowed_requests += other.allowed_requests
+        self.allowed_bytes += other.allowed_bytes
+        self.blocked_requests += other.blocked_requests
+        self.estimated_bytes_saved += other.estimated_bytes_saved
+        for resource_type, count in other.blocked_by_type.items():
+            self.blocked_by_type[resource_type] = self.blocked_by_type.get(resource_type, 0) + count
+
+    def summary(self) -> str:
+        return (
+            f"ブロック {self.blocked_requests}件（推定 {self.estimated_bytes_saved // 1024:,}KB削減）、"
+            f"読み込み {self.allowed_requests}件（{self.allowed_bytes // 1024:,}KB）"
+        )
+
+# アプリ全体でブロックしたリクエストの累計
+_total_stats = ResourceStats()
+
+def get_total_resource_stats() -> ResourceStats:
+    """アプリ全体の累計を返す関数"""
+    return _total_stats
+
+BLOCKED_REQUESTS.set_function(lambda: _total_stats.blocked_requests)
+BLOCKED_BYTES_SAVED.set_function(lambda: _total_stats.estimated_bytes_saved)
+
+class ResourceBlocker:
+    """コンテキストのすべてのリクエストを`context.route`で受け取り、ポリシーに従ってブロックする"""
+
+    def __init__(self, settings: Settings):
+        self.policy = ResourcePolicy(settings)
+        self.size_estimates = settings.blocked_resource_size_estimates
+        # 閉じたページの集計が残らないよう、ページへの弱参照をキーにする
+        self._pages = weakref.WeakKeyDictionary()
+        self._unknown = ResourceStats()  # ページを特定できないリクエスト（Service Workerなど）
+
+    def _stats_for(self, request) -> ResourceStats:
+        try:
+            page = request.frame.page
+        except Exception:
+            return self._unknown
+        stats = self._pages.get(page)
+        if stats is None:
+            stats = self._pages[page] = ResourceStats()
+        return stats
+
+    async def handle_route(self, route):
+        request = route.request
+        stats = self._stats_for(request)
+        resource_type = request.resource_type
+        if self.policy.should_block(resource_type, request.url):
+            stats.blocked_requests += 1
+            stats.blocked_by_type[resource_type] = stats.blocked_by_type.get(resource_type, 0) + 1
+            stats.estimated_bytes_saved += self.size_estimates.get(
+                resource_type, self.size_estimates.get("default", 0)
+            )
+            await route.abort("blockedbyclient")
+        else:
+            stats.allowed_requests += 1
+            await route.fallback()
+
+    def on_response(self, response):
+        try:
+            length = int(response.headers.get("content-length", 0))
+        except ValueError:
+            return
+        self._stats_for(response.request).allowed_bytes += length
+
+    def take_page_stats(self, page) -> ResourceStats:
+        """ページの集計を取り出してリセットする（ページを閉じる前やページ送りの後に呼び出す）"""
+        stats = self._pages.pop(page, None) or ResourceStats()
+        _total_stats.add(stats)
+        return stats
+
+_blockers = weakref.WeakKeyDictionary()
+
+async def install_resource_blocking(context, settings: Settings) -> Optional[ResourceBlocker]:
+    """コンテキストにリソースのブロックを設定する関数（設定で無効な場合は何もしない）"""
+    if not settings.block_resources:
+        return None
+    blocker = ResourceBlocker(settings)
+    await context.route("**/*", blocker.handle_route)
+    context.on("response", blocker.on_response)
+    _blockers[context] = blocker
+    return blocker
+
+def report_page_resources(context, page, page_number: int) -> Optional[ResourceStats]:
+    """ページのブロック結果をログに出力する関数"""
+    blocker = _blockers.get(context)
+    if blocker is None:
+        return None
+    stats = blocker.take_page_stats(page)
+    logger.info(f"ページ {page_number} のリソース: {stats.summary()}")
+    return stats
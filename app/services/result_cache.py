@@ -0,0 +1,243 @@
+import asyncio
+import copy
+import hashlib
+import json
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config.settings import Settings, get_settings
+from app.config.logger import setup_logger
+from app.models.price_stats import PriceAnalysis
+from app.services.scraper import ProgressCallback
+
+logger = setup_logger(__name__)
+
+# その時点までの集計を通知するコールバック（取得したページ数, 商品数, 価格分析）
+StatsCallback = Callable[[int, int, Optional[PriceAnalysis]], None]
+# 結果を作成する処理（ページごとの進捗と集計の通知先を受け取る）
+Factory = Callable[[ProgressCallback, StatsCallback], Awaitable[Dict[str, Any]]]
+
+def normalize_keyword(keyword: str) -> str:
+    """キャッシュキー用にキーワードを正規化する関数
+
+    全角・半角の違い、大文字・小文字の違い、連続する空白を同一視する。
+    """
+    return " ".join(unicodedata.normalize("NFKC", keyword).casefold().split())
+
+class _Inflight:
+    """実行中の処理と、その結果を待つ呼び出し元ごとの進捗の通知先
+
+    途中から待ち始めた呼び出し元に送り直すのは最新の集計だけとし、ページの商品は保持しない
+    （実行中の検索の全商品をメモリにためないため）。
+    """
+
+    def __init__(self):
+        self.task: Optional[asyncio.Task] = None
+        self.waiters = 0
+        self.progress_listeners: List[ProgressCallback] = []
+        self.stats_listeners: List[StatsCallback] = []
+        self.latest_stats: Optional[tuple] = None  # (ページ数, 商品数, 価格分析)
+
+    def add_listener(self, progress_callback: Optional[ProgressCallback], stats_callback: Optional[StatsCallback]):
+        """通知先を登録し、既にページを取得していれば最新の集計を1回だけ通知する"""
+        if stats_callback is not None:
+            if self.latest_stats is not None:
+                self._notify(stats_callback, *self.latest_stats)
+            self.stats_listeners.append(stats_callback)
+        if progress_callback is not None:
+            self.progress_listeners.append(progress_callback)
+
+    def remove_listener(self, progress_callback: Optional[ProgressCallback], stats_callback: Optional[StatsCallback]):
+        if stats_callback is not None:
+            self.stats_listeners.remove(stats_callback)
+        if progress_callback is not None:
+            self.progress_listeners.remove(progress_callback)
+
+    def progress(self, page_number: int, items: List[Dict[str, Any]]):
+        """ページの進捗を、待っているすべての呼び出し元に通知する"""
+        for callback in list(self.progress_listeners):
+            self._notify(callback, page_number, items)
+
+    def stats(self, pages_done: int, items_so_far: int, analysis: Optional[PriceAnalysis]):
+        """最新の集計を記録し、待っているすべての呼び出し元に通知する"""
+        self.latest_stats = (pages_done, items_so_far, analysis)
+        for callback in list(self.stats_listeners):
+            self._notify(callback, pages_done, items_so_far, analysis)
+
+    @staticmethod
+    def _notify(callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            # 1つの呼び出し元の失敗で共有中の処理を止めない
+            logger.warning(f"進捗の通知に失敗しました: {e}")
+
+class ResultCache:
+    """検索結果のキャッシュ
+
+    TTLとLRUでメモリ上の件数を制限し、設定されていればディスクにも保存して再起動後も使えるようにする。
+    同じキーの取得が同時に行われた場合は、実行中の1回の処理を共有する。
+    """
+
+    def __init__(self, settings: Settings = None):
+        self.settings = settings or get_settings()
+        self.ttl = self.settings.result_cache_ttl
+        self.max_entries = max(1, self.settings.result_cache_max_entries)
+        self.cache_dir = Path(self.settings.result_cache_dir) if self.settings.result_cache_dir else None
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._inflight: Dict[str, _Inflight] = {}
+
+    def make_key(self, keyword: str, **params: Any) -> str:
+        """正規化したキーワードとスクレイピング条件からキーを作成する"""
+        return json.dumps({"keyword": normalize_keyword(keyword), **params}, sort_keys=True, ensure_ascii=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+
+    def _read_disk(self, key: str) -> Optional[tuple]:
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"キャッシュファイルの読み込みに失敗しました: {path}: {e}")
+            return None
+        if entry.get("key") != key or entry.get("expires_at", 0) <= time.time():
+            self._delete_disk(key)
+            return None
+        return entry["expires_at"], entry["value"]
+
+    def _write_disk(self, key: str, expires_at: float, value: Dict[str, Any]):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._disk_path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"key": key, "expires_at": expires_at, "value": value}, f, ensure_ascii=False)
+        tmp_path.replace(path)
+
+    def _delete_disk(self, key: str):
+        try:
+            self._disk_path(key).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"キャッシュファイルの削除に失敗しました: {e}")
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """キャッシュされた結果を返す（無い場合や期限切れの場合はNone）"""
+        entry = self._entries.get(key)
+        if entry is None and self.cache_dir:
+            entry = await asyncio.to_thread(self._read_disk, key)
+            if entry is not None:
+                self._entries[key] = entry
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.time():
+            await self.delete(key)
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(value)
+
+    async def set(self, key: str, value: Dict[str, Any]):
+        """結果をキャッシュに保存する"""
+        expires_at = time.time() + self.ttl
+        self._entries[key] = (expires_at, copy.deepcopy(value))
+        self._entries.move_to_end(key)
+        evicted = []
+        while len(self._entries) > self.max_entries:
+            evicted.append(self._entries.popitem(last=False)[0])
+
+        if self.cache_dir:
+            try:
+                await asyncio.to_thread(self._write_disk, key, expires_at, value)
+                for old_key in evicted:
+                    await asyncio.to_thread(self._delete_disk, old_key)
+            except OSError as e:
+                logger.warning(f"キャッシュの保存に失敗しました: {e}")
+
+    async def delete(self, key: str):
+        """キャッシュから結果を削除する"""
+        self._entries.pop(key, None)
+        if self.cache_dir:
+            await asyncio.to_thread(self._delete_disk, key)
+
+    def clear(self):
+        """メモリ上のキャッシュを空にする"""
+        self._entries.clear()
+
+    async def get_or_create(self, key: str, factory: Factory,
+                            progress_callback: Optional[ProgressCallback] = None,
+                            stats_callback: Optional[StatsCallback] = None) -> Dict[str, Any]:
+        """キャッシュがあれば返し、無ければ結果を作成して保存する
+
+        同じキーの処理が実行中であれば新たに実行せず、その結果を待つ。
+        factoryにはページの進捗と集計の通知先を渡し、通知された内容は待っているすべての呼び出し元の
+        progress_callback・stats_callbackに送る。途中から待ち始めた場合、それまでのページは送らず、
+        最新の集計（ページ数・商品数・価格分析）をstats_callbackに1回だけ送ってから以降のページを送る。
+        例外が発生した場合はキャッシュしない。
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            logger.info("キャッシュされた検索結果を返します")
+            return cached
+        return await self.refresh(key, factory, progress_callback, stats_callback)
+
+    async def refresh(self, key: str, factory: Factory,
+                      progress_callback: Optional[ProgressCallback] = None,
+                      stats_callback: Optional[StatsCallback] = None) -> Dict[str, Any]:
+        """キャッシュを使わずに結果を作成し、キャッシュを上書きする
+
+        同じキーの処理が実行中であれば新たに実行せず、その結果（キャッシュも上書きされる）を待つ。
+        """
+        return await self._wait(key, self._start(key, factory), progress_callback, stats_callback)
+
+    def _start(self, key: str, factory) -> _Inflight:
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            logger.info("実行中の同じ検索の結果を待ちます")
+            return inflight
+        inflight = _Inflight()
+        inflight.task = asyncio.create_task(self._create(key, factory, inflight))
+        self._inflight[key] = inflight
+        return inflight
+
+    async def _wait(self, key: str, inflight: _Inflight, progress_callback: Optional[ProgressCallback],
+                    stats_callback: Optional[StatsCallback]) -> Dict[str, Any]:
+        inflight.add_listener(progress_callback, stats_callback)
+        inflight.waiters += 1
+        try:
+            # 一部の呼び出し元がキャンセルされても共有中の処理は継続させる
+            return copy.deepcopy(await asyncio.shield(inflight.task))
+        except asyncio.CancelledError:
+            # 待っている呼び出し元がいなくなった場合のみ処理を止める
+            if inflight.waiters == 1 and not inflight.task.done():
+                inflight.task.cancel()
+            raise
+        finally:
+            inflight.waiters -= 1
+            inflight.remove_listener(progress_callback, stats_callback)
+
+    async def _create(self, key: str, factory, inflight: _Inflight) -> Dict[str, Any]:
+        try:
+            value = await factory(inflight.progress, inflight.stats)
+            await self.set(key, value)
+            return value
+        finally:
+            inflight.latest_stats = None
+            if self._inflight.get(key) is inflight:
+                del self._inflight[key]
+
+_cache: Optional[ResultCache] = None
+
+def get_result_cache() -> ResultCache:
+    """アプリ全体で共有する結果キャッシュを返す"""
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
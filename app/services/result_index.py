@@ -0,0 +1,98 @@
+import heapq
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+@dataclass
+class ResultFileEntry:
+    name: str
+    size: int
+    mtime: float
+    keyword: Optional[str] = None
+
+class ResultFileIndex:
+    """結果ファイルのメモリ上の索引
+
+    ファイルの書き込み時に更新し、更新日時の古い順に並んだヒープから保持期限切れのファイルを取り出す。
+    ファイル操作用のスレッドとイベントループの両方から使うため、操作はロックで保護する。
+
+    索引はプロセスごとに持つため、1つのワーカーで動かす場合の最適化にすぎない。
+    複数のワーカーで動かすと、他のワーカーが書き込んだファイルはこの索引に載らないので、
+    索引に無いファイルは必ずディスクを確認してから存在しないと判断すること。
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, ResultFileEntry] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def record(self, name: str, size: int, mtime: float, keyword: Optional[str] = None):
+        """ファイルの情報を追加・更新する"""
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = ResultFileEntry(name=name, size=size, mtime=mtime, keyword=keyword)
+                self._entries[name] = entry
+            else:
+                self.total_bytes -= entry.size
+                entry.size = size
+                entry.mtime = mtime
+                entry.keyword = keyword or entry.keyword
+            self.total_bytes += size
+            # 古い位置の要素はヒープに残し、取り出すときに読み飛ばす
+            heapq.heappush(self._heap, (mtime, name))
+            if len(self._heap) > 2 * len(self._entries) + 64:
+                self._heap = [(e.mtime, e.name) for e in self._entries.values()]
+                heapq.heapify(self._heap)
+
+    def get(self, name: str) -> Optional[ResultFileEntry]:
+        """ファイルの情報を返す（索引に無い場合はNone）"""
+        with self._lock:
+            return self._entries.get(name)
+
+    def remove(self, name: str) -> Optional[ResultFileEntry]:
+        """ファイルを索引から削除する"""
+        with self._lock:
+            entry = self._entries.pop(name, None)
+            if entry is not None:
+                self.total_bytes -= entry.size
+            return entry
+
+    def pop_expired(self, max_age: float, max_total_bytes: int = 0, now: float = None) -> List[ResultFileEntry]:
+        """保持期限を過ぎたファイルと、合計サイズの上限を超えた分の古いファイルを索引から取り出す
+
+        Args:
+            max_age (float): 保持する秒数
+            max_total_bytes (int): 保持する合計バイト数の上限（0の場合は無制限）
+            now (float, optional): 現在時刻（UNIX時間）。Noneの場合は現在時刻を使用。
+        """
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self._heap:
+                mtime, name = self._heap[0]
+                entry = self._entries.get(name)
+                if entry is None or entry.mtime != mtime:
+                    # 削除済み、または更新されたファイルの古い要素
+                    heapq.heappop(self._heap)
+                    continue
+                over_size = max_total_bytes > 0 and self.total_bytes > max_total_bytes
+                if mtime >= now - max_age and not over_size:
+                    break
+                heapq.heappop(self._heap)
+                del self._entries[name]
+                self.total_bytes -= entry.size
+                expired.append(entry)
+        return expired
+
+_index = ResultFileIndex()
+
+def get_result_index() -> ResultFileIndex:
+    """アプリ全体で共有する結果ファイルの索引を返す"""
+    return _index
@@ -0,0 +1,238 @@
+import csv
+import gzip
+import importlib.util
+import json
+import os
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from app.models.price_stats import PriceAnalysis, parse_price
+from .price_analysis import format_price_analysis
+
+# 書き込み中の一時ファイルに付ける拡張子
+TEMP_SUFFIX = ".part"
+
+def header_rows(keyword):
+    """CSVファイル先頭のヘッダー情報の行を作成する関数"""
+    return [
+        ['検索キーワード', keyword],
+        ['取得開始日時', datetime.now().strftime('%Y-%m-%d %H:%M:%S')],
+        [],  # 空行
+        ['商品名', '価格']
+    ]
+
+def to_record(item: Dict[str, Any]) -> Dict[str, Any]:
+    """商品情報を出力用のレコードに変換する（価格は整数、変換できない場合はNone）"""
+    return {'name': item['name'], 'price': parse_price(item['price'])}
+
+class ResultWriter(ABC):
+    """結果ファイルの書き込み処理の基底クラス
+
+    一時ファイルに書き込み、`finish`で一時ファイルの内容を確定してから、`publish`で本来のファイル名へリネームする。
+    複数の形式を書き込む場合は、すべての形式の`finish`が成功してから`publish`する。
+    メソッドはすべて同期処理のため、ファイル操作用のスレッドプールから呼び出す。
+    """
+    format_name = ""
+    extension = ""
+    media_type = "application/octet-stream"
+    compressed = False  # 圧縮済みの形式（ダウンロード時に再圧縮しない）
+
+    def __init__(self, path: Path, keyword: str):
+        self.path = Path(path)
+        self.temp_path = self.path.with_name(self.path.name + TEMP_SUFFIX)
+        self.keyword = keyword
+
+    @classmethod
+    def is_available(cls) -> bool:
+        """必要なライブラリが使えるかどうか"""
+        return True
+
+    @abstractmethod
+    def open(self):
+        """一時ファイルを作成する"""
+
+    @abstractmethod
+    def write_items(self, items: List[Dict[str, Any]]):
+        """商品を書き込む"""
+
+    def write_analysis(self, analysis: Optional[PriceAnalysis]):
+        """価格分析を書き込む（形式によっては何もしない）"""
+
+    def flush(self, sync: bool = False):
+        """書き込み済みの内容をディスクに反映する"""
+
+    @abstractmethod
+    def _close(self):
+        """ファイルを閉じる"""
+
+    def finish(self):
+        """ファイルを閉じて一時ファイルの内容を確定する"""
+        self._close()
+
+    def publish(self):
+        """確定した一時ファイルを本来のファイル名で公開する"""
+        os.replace(self.temp_path, self.path)
+
+    def discard(self):
+        """ファイルを閉じて一時ファイルを削除する"""
+        try:
+            self._close()
+        finally:
+            try:
+                os.unlink(self.temp_path)
+            except FileNotFoundError:
+                pass
+
+class _TextFileWriter(ResultWriter):
+    """テキストのストリームに書き込む形式の共通処理"""
+
+    def __init__(self, path: Path, keyword: str):
+        super().__init__(path, keyword)
+        self._file = None
+
+    @abstractmethod
+    def _open_file(self):
+        """書き込み先のテキストストリームを開く"""
+
+    def open(self):
+        self._file = self._open_file()
+
+    def flush(self, sync: bool = False):
+        self._file.flush()
+        if sync:
+            os.fsync(self._file.fileno())
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class CsvResultWriter(_TextFileWriter):
+    """従来形式のCSV（ヘッダー情報・価格の文字列・末尾の価格分析を含む）"""
+    format_name = "csv"
+    extension = ".csv"
+    media_type = "text/csv"
+
+    def _open_file(self):
+        return open(self.temp_path, 'w', encoding='utf-8', newline='')
+
+    def open(self):
+        super().open()
+        self._writer = csv.writer(self._file)
+        self._writer.writerows(header_rows(self.keyword))
+
+    def write_items(self, items):
+        self._writer.writerows([item['name'], item['price']] for item in items)
+
+    def write_analysis(self, analysis):
+        self._writer.writerows(format_price_analysis(analysis))
+
+class GzipCsvResultWriter(_TextFileWriter):
+    """gzip圧縮したCSV（商品名と整数の価格の列のみ）"""
+    format_name = "csv.gz"
+    extension = ".csv.gz"
+    media_type = "application/gzip"
+    compressed = True
+
+    def _open_file(self):
+        self._raw = open(self.temp_path, 'wb')
+        return gzip.open(self._raw, 'wt', encoding='utf-8', newline='')
+
+    def open(self):
+        super().open()
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(['name', 'price'])
+
+    def write_items(self, items):
+        for item in items:
+            record = to_record(item)
+            self._writer.writerow([record['name'], record['price']])
+
+    def flush(self, sync: bool = False):
+        self._file.flush()
+        self._raw.flush()
+        if sync:
+            os.fsync(self._raw.fileno())
+
+    def _close(self):
+        super()._close()
+        if getattr(self, '_raw', None) is not None:
+            self._raw.close()
+            self._raw = None
+
+class NdjsonResultWriter(_TextFileWriter):
+    """1行に1商品のJSON（NDJSON）"""
+    format_name = "ndjson"
+    extension = ".ndjson"
+    media_type = "application/x-ndjson"
+
+    def _open_file(self):
+        return open(self.temp_path, 'w', encoding='utf-8')
+
+    def write_items(self, items):
+        self._file.writelines(
+            json.dumps(to_record(item), ensure_ascii=False) + "\n" for item in items
+        )
+
+class ParquetResultWriter(ResultWriter):
+    """Parquet形式（pyarrowが必要）
+
+    商品は`row_group_size`件ごとに1つの行グループとして書き込み、全商品をメモリにためない。
+    """
+    format_name = "parquet"
+    extension = ".parquet"
+    media_type = "application/vnd.apache.parquet"
+    compressed = True
+    row_group_size = 10000
+
+    def __init__(self, path: Path, keyword: str):
+        super().__init__(path, keyword)
+        self._writer = None
+        self._names = []
+        self._prices = []
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return importlib.util.find_spec("pyarrow") is not None
+
+    def open(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._schema = pa.schema([('name', pa.string()), ('price', pa.int64())])
+        self._writer = pq.ParquetWriter(self.temp_path, self._schema)
+
+    def write_items(self, items):
+        for item in items:
+            record = to_record(item)
+            self._names.append(record['name'])
+            self._prices.append(record['price'])
+        if len(self._names) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self):
+        if not self._names:
+            return
+        import pyarrow as pa
+        table = pa.Table.from_pydict({'name': self._names, 'price': self._prices}, schema=self._schema)
+        self._writer.write_table(table)
+        self._names, self._prices = [], []
+
+    def _close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def finish(self):
+        self._write_row_group()
+        self._close()
+
+RESULT_WRITERS = {
+    writer.format_name: writer
+    for writer in (CsvResultWriter, GzipCsvResultWriter, NdjsonResultWriter, ParquetResultWriter)
+}
+
+def result_filename(filename: str, format_name: str) -> str:
+    """CSVのファイル名から指定形式のファイル名を作成する関数"""
+    stem = filename[:-len(".csv")] if filename.endswith(".csv") else filename
+    return stem + RESULT_WRITERS[format_name].extension
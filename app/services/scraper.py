@@ -1,11 +1,29 @@
+import asyncio
 import random
+import re
+import time
+import weakref
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
 from playwright.async_api import async_playwright
-from .file_manager import save_to_file
+from .file_manager import CsvWriterSession
+from .browser_pool import get_browser_pool, launch_browser, new_context
+from .resource_blocking import report_page_resources
+from .http_fetcher import extract_rows_from_html, fetch_html, get_http_client, validate_rows
+from .pipeline import (
+    CallbackSink, CollectSink, CountingSink, PageSink, RawPage, ScrapedPage, WriterSink, buffered, drain_to_sinks
+)
+from .metrics import (
+    FAST_PATH_FALLBACKS, ITEMS_PER_SEARCH, ITEMS_TOTAL, PAGES_PER_SEARCH, PAGES_TOTAL, SEARCH_DURATION,
+    SEARCHES_IN_FLIGHT, SEARCHES_TOTAL, observe_stage
+)
 from app.config.settings import Settings, get_settings
 from app.config.logger import setup_logger
+from app.models.exceptions import FastPathError
 from dotenv import load_dotenv
-from typing import List, Dict
+from typing import AsyncIterator, Awaitable, Callable, List, Dict, Optional, Set
+from urllib.parse import urlparse
 
 # 環境変数の読み込み
 load_dotenv()
@@ -21,27 +39,82 @@ def setup_results_dir() -> Path:
 async def setup_browser():
     """ブラウザのセットアップを行う関数"""
     playwright = await async_playwright().start()
-    browser = await playwright.chromium.launch(headless=False)
-    
-    context = await browser.new_context(
-        user_agent=settings.user_agent,
-        viewport=settings.viewport,
-        locale=settings.locale,
-        timezone_id=settings.timezone_id
-    )
-    
-    cookies = [
-        {
-            'name': settings.cookie_name,
-            'value': settings.cookie_value,
-            'domain': settings.cookie_domain,
-            'path': settings.cookie_path
-        }
-    ]
-    await context.add_cookies(cookies)
-    
+    browser = await launch_browser(playwright, settings)
+    context = await new_context(browser, settings)
     return playwright, browser, context
 
+class SharedContext:
+    """複数の検索で続けて使うブラウザコンテキスト（最初に必要になった時点で借りる）"""
+
+    def __init__(self):
+        self._stack = AsyncExitStack()
+        self._context = None
+        self._lock = asyncio.Lock()
+        self.uses = 0
+
+    async def get(self):
+        async with self._lock:
+            if self._context is None:
+                self._context = await self._stack.enter_async_context(_borrow_new_context())
+            self.uses += 1
+            return self._context
+
+    async def close(self):
+        self._context = None
+        await self._stack.aclose()
+
+_shared_context: ContextVar[Optional[SharedContext]] = ContextVar("shared_browser_context", default=None)
+
+@asynccontextmanager
+async def share_context():
+    """`async with`の中で実行した検索に、同じブラウザコンテキストを順に使わせる
+
+    検索ごとにコンテキストを借りて初期化する代わりに、まとめて実行する検索の間で使い回す。
+    コンテキストは同時に1つの検索だけが使う前提のため、中の検索は順に実行すること。
+    """
+    shared = SharedContext()
+    token = _shared_context.set(shared)
+    try:
+        yield shared
+    finally:
+        _shared_context.reset(token)
+        await shared.close()
+
+@asynccontextmanager
+async def borrow_context():
+    """ブラウザコンテキストを借りる関数
+
+    share_contextの中であれば共有のコンテキストを使う。
+    ブラウザプールが起動していればプールから借り、
+    起動していなければその場でブラウザを立ち上げて終了時に閉じる。
+    """
+    shared = _shared_context.get()
+    if shared is not None:
+        yield await shared.get()
+        return
+    async with _borrow_new_context() as context:
+        yield context
+
+@asynccontextmanager
+async def _borrow_new_context():
+    pool = get_browser_pool()
+    if pool is not None:
+        async with pool.acquire() as context:
+            yield context
+        return
+
+    playwright = None
+    browser = None
+    try:
+        with observe_stage("context_acquire"):
+            playwright, browser, context = await setup_browser()
+        yield context
+    finally:
+        if browser:
+            await browser.close()
+        if playwright:
+            await playwright.stop()
+
 async def scroll_page(page):
     """ページをスクロールして商品を読み込む関数"""
     scroll_points = settings.scroll_points
@@ -49,14 +122,197 @@ async def scroll_page(page):
         await page.evaluate(f"window.scrollTo(0, document.body.scrollHeight*{point})")
         await page.wait_for_timeout(settings.wait_time_between_scrolls)
 
-async def scrape_items(keyword: str, filename: str, max_pages: int = None, settings: Settings = None) -> List[Dict[str, str]]:
+# 1画面ずつスクロールし、商品セルが増えなくなるまで待つスクリプト
+ADAPTIVE_SCROLL_SCRIPT = """
+async ({selector, stepWait, settleTime, maxTime}) => {
+    const count = () => document.querySelectorAll(selector).length;
+    const deadline = Date.now() + maxTime;
+    const waitForGrowth = (before, timeout) => new Promise(resolve => {
+        const observer = new MutationObserver(() => {
+            if (count() > before) {
+                clearTimeout(timer);
+                observer.disconnect();
+                resolve(true);
+            }
+        });
+        const timer = setTimeout(() => {
+            observer.disconnect();
+            resolve(count() > before);
+        }, Math.max(0, Math.min(timeout, deadline - Date.now())));
+        observer.observe(document.body, {childList: true, subtree: true});
+    });
+
+    while (Date.now() < deadline) {
+        const before = count();
+        window.scrollBy(0, window.innerHeight);
+        const atBottom = window.innerHeight + window.scrollY >= document.body.scrollHeight - 2;
+        const grew = await waitForGrowth(before, atBottom ? settleTime : stepWait);
+        if (atBottom && !grew) {
+            break;
+        }
+    }
+    return count();
+}
+"""
+
+async def scroll_page_adaptive(page, settings: Settings = None) -> int:
+    """商品セルが増えなくなるまでスクロールする関数
+
+    MutationObserverで商品セルの追加を監視し、最下部で一定時間増えなければ終了する。
+
+    Returns:
+        int: 読み込まれた商品セルの数
+    """
+    if settings is None:
+        settings = get_settings()
+    return await page.evaluate(
+        ADAPTIVE_SCROLL_SCRIPT,
+        {
+            'selector': settings.item_cell_selector,
+            'stepWait': settings.scroll_step_wait,
+            'settleTime': settings.scroll_settle_time,
+            'maxTime': settings.scroll_max_time
+        }
+    )
+
+async def load_all_items(page, settings: Settings):
+    """設定されたスクロール方法で商品を読み込む関数"""
+    if settings.scroll_mode == "fixed":
+        await scroll_page(page)
+    else:
+        await scroll_page_adaptive(page, settings)
+
+# 商品セルごとに各項目のテキストをまとめて取得するスクリプト
+EXTRACT_ITEMS_SCRIPT = """
+(cells, [fields, links]) => cells.map(cell => {
+    const row = {};
+    for (const [key, selector] of Object.entries(fields)) {
+        const element = cell.querySelector(selector);
+        row[key] = element ? element.innerText : null;
+    }
+    for (const [key, selector] of Object.entries(links)) {
+        const element = cell.querySelector(selector);
+        row[key] = element ? element.getAttribute('href') : null;
+    }
+    return row;
+})
+"""
+
+# 商品ページのURLから商品IDを取り出すパターン（個人の出品: /item/m123... / ショップの商品: /shops/product/...）
+ITEM_ID_PATTERN = re.compile(r"/(?:item|shops/product)/([A-Za-z0-9]+)")
+
+def item_field_selectors(settings: Settings) -> Dict[str, str]:
+    """取得する項目名とセレクタの対応を返す関数"""
+    return {
+        'name': settings.item_name_selector,
+        'price': settings.item_price_selector,
+        **settings.item_extra_selectors
+    }
+
+def item_link_selectors(settings: Settings) -> Dict[str, str]:
+    """リンク先（href属性）を取得する項目名とセレクタの対応を返す関数"""
+    return {'url': settings.item_link_selector} if settings.item_link_selector else {}
+
+def parse_item_id(url: Optional[str]) -> Optional[str]:
+    """商品ページのURLから商品IDを取り出す関数（取り出せない場合はNone）"""
+    if not url:
+        return None
+    match = ITEM_ID_PATTERN.search(url)
+    return match.group(1) if match else None
+
+async def extract_rows_bulk(page, settings: Settings) -> List[Dict[str, Optional[str]]]:
+    """1回のIPCでページ内の全商品のテキストを取得する関数"""
+    return await page.eval_on_selector_all(
+        settings.item_cell_selector,
+        EXTRACT_ITEMS_SCRIPT,
+        [item_field_selectors(settings), item_link_selectors(settings)]
+    )
+
+async def extract_rows_per_element(page, settings: Settings) -> List[Dict[str, Optional[str]]]:
+    """商品セルごとに要素を取得してテキストを読み出す関数"""
+    fields = item_field_selectors(settings)
+    links = item_link_selectors(settings)
+    cells = await page.query_selector_all(settings.item_cell_selector)
+    rows = []
+    for index, cell in enumerate(cells):
+        row = {}
+        try:
+            for key, selector in fields.items():
+                element = await cell.query_selector(selector)
+                row[key] = await element.inner_text() if element else None
+            for key, selector in links.items():
+                element = await cell.query_selector(selector)
+                row[key] = await element.get_attribute('href') if element else None
+        except Exception as e:
+            logger.error(f"商品{index + 1}: 処理中にエラーが発生: {e}")
+        rows.append(row)
+    return rows
+
+async def extract_rows(page, settings: Settings) -> List[Dict[str, Optional[str]]]:
+    """設定された方法で商品セルのテキストを取得する関数
+
+    evaluateモードで失敗した場合は要素ごとの取得にフォールバックする。
+    """
+    if settings.extraction_mode == "evaluate":
+        try:
+            return await extract_rows_bulk(page, settings)
+        except Exception as e:
+            logger.warning(f"一括取得に失敗したため要素ごとの取得に切り替えます: {e}")
+    return await extract_rows_per_element(page, settings)
+
+def rows_to_items(rows: List[Dict[str, Optional[str]]], settings: Settings) -> List[Dict[str, str]]:
+    """取得したテキストから商品情報を作成する関数"""
+    page_results = []
+    for index, row in enumerate(rows):
+        name = row.get('name')
+        price = row.get('price')
+        if not (name and price):
+            logger.warning(f"商品{index + 1}: 商品情報の取得に失敗")
+            continue
+
+        item_data = {
+            'name': name.strip(),
+            'price': price.strip()
+        }
+        item_id = parse_item_id(row.get('url'))
+        if item_id:
+            item_data['item_id'] = item_id
+        for key in settings.item_extra_selectors:
+            value = row.get(key)
+            item_data[key] = value.strip() if value else None
+        page_results.append(item_data)
+    return page_results
+
+# ページごとの進捗を通知するコールバック（ページ番号, そのページの商品情報）
+ProgressCallback = Callable[[int, List[Dict[str, str]]], None]
+# 商品IDのリストのうち、既に取得したことのあるものを返す関数
+KnownIdsLookup = Callable[[List[str]], Awaitable[Set[str]]]
+
+async def scrape_items(keyword: str, filename: str, max_pages: int = None, settings: Settings = None,
+                       progress_callback: Optional[ProgressCallback] = None,
+                       writer: Optional[CsvWriterSession] = None,
+                       sinks: Optional[List[PageSink]] = None,
+                       collect: bool = True,
+                       known_ids: Optional[KnownIdsLookup] = None,
+                       unfiltered_sinks: Optional[List[PageSink]] = None) -> List[Dict[str, str]]:
     """商品をスクレイピングする関数
+
+    ページの取得・テキストの取り出し → 商品情報への変換 → 出力先（結果ファイル・進捗コールバック・
+    追加の出力先）の各段階を上限付きのキューでつなぎ、前のページの変換や保存と次のページの読み込みを並行して行う。
     
     Args:
         keyword (str): 検索キーワード
         filename (str): 保存するファイル名
         max_pages (int, optional): 取得する最大ページ数。Noneの場合は全ページ取得。デフォルトはNone。
         settings (Settings, optional): 設定オブジェクト。Noneの場合はデフォルト設定を使用。デフォルトはNone。
+        progress_callback (ProgressCallback, optional): 各ページの保存後に呼び出す関数。デフォルトはNone。
+        writer (CsvWriterSession, optional): 書き込み先のセッション。Noneの場合はfilenameに書き込み、終了時に閉じる。
+        sinks (List[PageSink], optional): 結果ファイルと進捗コールバックの後に各ページを渡す出力先。デフォルトはNone。
+        collect (bool, optional): 全ページの商品を集めて返すかどうか。Falseの場合は空のリストを返す。デフォルトはTrue。
+        known_ids (KnownIdsLookup, optional): 指定した場合は既知の商品を除き、すべての商品が既知のページで
+            ページ送りを終了する（検索結果が新着順であることが前提）。デフォルトはNone。
+        unfiltered_sinks (List[PageSink], optional): known_idsで既知の商品を除く前のページを渡す出力先
+            （既知の商品の価格の変化も保存する場合に使う）。known_idsが無い場合はsinksと同じ扱い。デフォルトはNone。
     
     Returns:
         List[Dict[str, str]]: 取得した商品情報のリスト
@@ -65,15 +321,144 @@ async def scrape_items(keyword: str, filename: str, max_pages: int = None, setti
         settings = get_settings()
         
     all_results = []  # 全ページの商品情報用
-    playwright = None
-    browser = None
+    owns_writer = writer is None
+    if owns_writer:
+        writer = CsvWriterSession(filename, keyword, settings)
+
+    page_sinks: List[PageSink] = [WriterSink(writer)]
+    if progress_callback:
+        page_sinks.append(CallbackSink(progress_callback))
+    page_sinks.extend(sinks or [])
+    if known_ids is None:
+        page_sinks.extend(unfiltered_sinks or [])
+    if collect:
+        page_sinks.append(CollectSink(all_results))
+    counter = CountingSink()
+    page_sinks.append(counter)
     
+    outcome = "cancelled"
+    started = time.perf_counter()
+    SEARCHES_IN_FLIGHT.inc()
     try:
-        playwright, browser, context = await setup_browser()
-        page = await context.new_page()
+        queue_size = settings.pipeline_queue_size
+        raw_pages = buffered(fetch_pages_with_backend(keyword, max_pages, settings), queue_size)
+        pages = buffered(parse_pages(raw_pages, settings), queue_size)
+        if known_ids is not None:
+            pages = stop_at_known_pages(pages, known_ids, unfiltered_sinks)
+        await drain_to_sinks(pages, page_sinks)
+        outcome = "ok" if counter.items else "empty"
+                
+    except Exception as e:
+        logger.error(f"スクレイピング処理中にエラーが発生: {e}")
+        outcome = "error"
         
-        search_url = settings.search_url_template.format(keyword=keyword)
-        await page.goto(search_url)
+    finally:
+        if owns_writer:
+            try:
+                await writer.close()
+            except Exception as e:
+                logger.error(f"結果ファイルの保存中にエラーが発生: {e}")
+        SEARCHES_IN_FLIGHT.dec()
+        SEARCHES_TOTAL.inc(outcome=outcome)
+        SEARCH_DURATION.observe(time.perf_counter() - started)
+        PAGES_PER_SEARCH.observe(counter.pages)
+        ITEMS_PER_SEARCH.observe(counter.items)
+        ITEMS_TOTAL.inc(counter.items)
+        
+    return all_results
+
+async def fetch_pages_with_backend(keyword: str, max_pages, settings: Settings) -> AsyncIterator[RawPage]:
+    """設定された取得方法（fetch_backend）で検索結果のページを順に取得する関数
+
+    http・autoの場合はブラウザを使わずにHTMLを取得する。autoでHTMLから商品を読み取れなかった場合は、
+    まだ返していないページからブラウザでの取得に切り替える。
+    """
+    next_page = 1
+    if settings.fetch_backend in ("http", "auto"):
+        try:
+            async for raw_page in fetch_pages_http(get_http_client(settings), keyword, max_pages, settings):
+                next_page = raw_page.number + 1
+                PAGES_TOTAL.inc(backend="http")
+                yield raw_page
+            return
+        except FastPathError as e:
+            if settings.fetch_backend == "http":
+                raise
+            logger.info(f"HTTPでの取得に失敗したためブラウザに切り替えます（ページ {next_page}）: {e}")
+            FAST_PATH_FALLBACKS.inc()
+
+    async with borrow_context() as context:
+        if next_page == 1:
+            source = fetch_pages(context, keyword, max_pages, settings)
+        else:
+            # ボタンでのページ送りは1ページ目からになるため、途中からはURLを組み立てて取得する
+            source = fetch_pages_by_url(context, keyword, max_pages, settings, start_page=next_page)
+        try:
+            async for raw_page in source:
+                PAGES_TOTAL.inc(backend="browser")
+                yield raw_page
+        finally:
+            await source.aclose()
+
+def fetch_pages(context, keyword: str, max_pages, settings: Settings) -> AsyncIterator[RawPage]:
+    """設定されたページ送りの方法で検索結果のページを順に取得する関数"""
+    if settings.pagination_mode == "url":
+        return fetch_pages_by_url(context, keyword, max_pages, settings)
+    return fetch_pages_by_click(context, keyword, max_pages, settings)
+
+async def parse_pages(raw_pages: AsyncIterator[RawPage], settings: Settings) -> AsyncIterator[ScrapedPage]:
+    """取り出したテキストを商品情報に変換する段階
+
+    ページ送りの間に新しい出品が増えると、前のページの商品が次のページにずれて再び現れる。
+    同じ商品を二重に数えないよう、この検索で既に返した商品IDの商品は除く。
+    """
+    seen: Set[str] = set()
+    async for raw_page in raw_pages:
+        with observe_stage("parse_items"):
+            items = []
+            duplicates = 0
+            for item in rows_to_items(raw_page.rows, settings):
+                item_id = item.get('item_id')
+                if item_id:
+                    if item_id in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(item_id)
+                items.append(item)
+        if duplicates:
+            logger.info(f"ページ {raw_page.number}: 前のページと重複する商品を除きました（{duplicates}件）")
+        yield ScrapedPage(number=raw_page.number, items=items)
+
+async def stop_at_known_pages(pages: AsyncIterator[ScrapedPage], known_ids: KnownIdsLookup,
+                              sinks: Optional[List[PageSink]] = None) -> AsyncIterator[ScrapedPage]:
+    """既に取得したことのある商品を除き、すべての商品が既知のページに達したら終了する段階
+
+    新着順の検索結果では、既知の商品だけのページより後に新しい出品は無い。
+    終了すると前段（先読み中のページ取得を含む）を止める。
+    `sinks`には既知の判定の後、商品を除く前のページ（終了するページを含む）を渡す。
+    """
+    try:
+        async for page in pages:
+            item_ids = [item['item_id'] for item in page.items if item.get('item_id')]
+            known = await known_ids(item_ids) if item_ids else set()
+            for sink in sinks or []:
+                await sink.on_page(page)
+            new_items = [item for item in page.items if item.get('item_id') not in known]
+            if new_items:
+                yield ScrapedPage(number=page.number, items=new_items)
+            if page.items and not new_items:
+                logger.info(f"ページ {page.number} の商品はすべて取得済みのため終了します")
+                return
+    finally:
+        await pages.aclose()
+
+async def fetch_pages_by_click(context, keyword: str, max_pages, settings: Settings) -> AsyncIterator[RawPage]:
+    """借りたコンテキストで次ページボタンを押しながら検索結果のページを順に取得する関数"""
+    page = await context.new_page()
+    try:
+        search_url = build_page_url(keyword, 1, settings)
+        with observe_stage("navigation"):
+            await page.goto(search_url)
         page_number = 1
         
         while True:
@@ -82,65 +467,43 @@ async def scrape_items(keyword: str, filename: str, max_pages: int = None, setti
                 break
                 
             try:
-                await page.wait_for_timeout(random.randint(settings.min_wait_time, settings.max_wait_time))
+                if settings.scroll_mode == "fixed":
+                    await page.wait_for_timeout(random.randint(settings.min_wait_time, settings.max_wait_time))
                 try:
-                    await page.wait_for_selector(settings.item_cell_selector, timeout=settings.page_load_timeout)
+                    with observe_stage("wait_items"):
+                        await page.wait_for_selector(settings.item_cell_selector, timeout=settings.page_load_timeout)
                 except Exception as e:
                     if page_number != 1:
                         logger.warning(f"商品セルが見つかりません（ページ {page_number}）")
                         break
                     raise e
 
-                await scroll_page(page)
-                items = await page.query_selector_all(settings.item_cell_selector)
+                with observe_stage("scroll"):
+                    await load_all_items(page, settings)
+                with observe_stage("extraction"):
+                    rows = await extract_rows(page, settings)
 
-                if not items:
+                if not rows:
                     logger.warning("商品が見つかりませんでした")
                     break
-                                
-                # 商品情報を取得
-                page_results = []
-                for index, item in enumerate(items):
-                    try:
-                        name_element = await item.query_selector(settings.item_name_selector)
-                        name = await name_element.inner_text() if name_element else None
-                        
-                        price_element = await item.query_selector(settings.item_price_selector)
-                        price = await price_element.inner_text() if price_element else None
-                        
-                        if name and price:
-                            item_data = {
-                                'name': name.strip(),
-                                'price': price.strip()
-                            }
-                            page_results.append(item_data)
-                            all_results.append(item_data)
-                        else:
-                            logger.warning(f"商品{index + 1}: 商品情報の取得に失敗")
-                            
-                    except Exception as e:
-                        logger.error(f"商品{index + 1}: 処理中にエラーが発生: {e}")
                 
                 # 次ページボタンを探す
                 next_button = await page.query_selector(settings.next_button_selector)
+                report_page_resources(context, page, page_number)
                 
-                # ページごとの結果を保存
-                save_to_file(
-                    data=page_results,
-                    keyword=keyword,
-                    filename=filename,
-                    is_first_page=(page_number == 1),
-                    is_last_page=False,
-                    analysis=None
-                )
+                # 変換と保存は後段に任せ、すぐに次ページの読み込みに進む
+                yield RawPage(number=page_number, rows=rows, has_next=next_button is not None)
                 
                 if not next_button:
                     logger.info("これ以上ページがありません")
                     break
                     
                 logger.info("次ページに遷移します...")
+                if settings.scroll_mode != "fixed" and settings.politeness_delay > 0:
+                    await page.wait_for_timeout(settings.politeness_delay)
                 try:
-                    await next_button.click()
+                    with observe_stage("navigation"):
+                        await next_button.click()
                     page_number += 1
                 except Exception as e:
                     logger.error(f"ページ遷移中にエラーが発生: {e}")
@@ -149,15 +512,141 @@ async def scrape_items(keyword: str, filename: str, max_pages: int = None, setti
             except Exception as e:
                 logger.error(f"ページ {page_number} の処理中にエラーが発生: {e}")
                 break
-                
-    except Exception as e:
-        logger.error(f"スクレイピング処理中にエラーが発生: {e}")
-        return all_results
-        
     finally:
-        if browser:
-            await browser.close()
-        if playwright:
-            await playwright.stop()
-        
-    return all_results 
\ No newline at end of file
+        await page.close()
+
+# ホストごとの同時取得数を制限するセマフォ（イベントループごとに検索をまたいで共有）
+_host_semaphores = weakref.WeakKeyDictionary()
+
+def host_semaphore(url: str, settings: Settings) -> asyncio.Semaphore:
+    """URLのホストと同時取得数の上限に対応するセマフォを返す関数
+
+    上限の異なる設定で呼ばれた場合は、その上限のセマフォを別に作る。
+    """
+    semaphores = _host_semaphores.setdefault(asyncio.get_running_loop(), {})
+    limit = max(1, settings.max_concurrent_pages_per_host)
+    key = (urlparse(url).netloc, limit)
+    if key not in semaphores:
+        semaphores[key] = asyncio.Semaphore(limit)
+    return semaphores[key]
+
+def build_page_url(keyword: str, page_number: int, settings: Settings) -> str:
+    """ページ番号（1始まり）から検索結果ページのURLを作成する関数"""
+    if page_number == 1:
+        url = settings.search_url_template.format(keyword=keyword)
+    else:
+        url = settings.page_url_template.format(keyword=keyword, page_index=page_number - 1)
+    return url + settings.search_sort_params
+
+async def fetch_result_page(context, keyword: str, page_number: int, settings: Settings) -> RawPage:
+    """検索結果の1ページを新しいタブで取得する関数
+
+    Returns:
+        RawPage: 取り出した商品セルのテキストと次ページの有無（商品セルが無い場合は空）
+    """
+    url = build_page_url(keyword, page_number, settings)
+    async with host_semaphore(url, settings):
+        page = await context.new_page()
+        try:
+            with observe_stage("navigation"):
+                await page.goto(url)
+            try:
+                with observe_stage("wait_items"):
+                    await page.wait_for_selector(settings.item_cell_selector, timeout=settings.page_load_timeout)
+            except Exception:
+                logger.warning(f"商品セルが見つかりません（ページ {page_number}）")
+                report_page_resources(context, page, page_number)
+                return RawPage(number=page_number, rows=[])
+
+            with observe_stage("scroll"):
+                await load_all_items(page, settings)
+            with observe_stage("extraction"):
+                rows = await extract_rows(page, settings)
+            next_button = await page.query_selector(settings.next_button_selector)
+            report_page_resources(context, page, page_number)
+
+            # 同じホストへの連続アクセスを避けるため、枠を保持したまま待機する
+            if settings.politeness_delay > 0:
+                await page.wait_for_timeout(settings.politeness_delay)
+            return RawPage(number=page_number, rows=rows, has_next=next_button is not None)
+        finally:
+            await page.close()
+
+async def fetch_pages_by_url(context, keyword: str, max_pages, settings: Settings,
+                             start_page: int = 1) -> AsyncIterator[RawPage]:
+    """ページURLを組み立てて複数ページを並列に取得する関数
+
+    同時取得数の分だけ先のページを取得しておき、結果はページ順に返す。
+    """
+    window = max(1, settings.max_concurrent_pages_per_host)
+    pending: Dict[int, asyncio.Task] = {}
+    next_to_fetch = start_page
+    page_number = start_page
+
+    try:
+        while True:
+            while len(pending) < window and (max_pages is None or next_to_fetch <= max_pages):
+                pending[next_to_fetch] = asyncio.create_task(
+                    fetch_result_page(context, keyword, next_to_fetch, settings)
+                )
+                next_to_fetch += 1
+
+            if page_number not in pending:
+                logger.info(f"指定されたページ数（{max_pages}ページ）に達したため終了します")
+                break
+
+            try:
+                raw_page = await pending.pop(page_number)
+            except Exception as e:
+                logger.error(f"ページ {page_number} の処理中にエラーが発生: {e}")
+                break
+
+            if not raw_page.rows:
+                logger.warning(f"商品が見つかりませんでした（ページ {page_number}）")
+                break
+
+            yield raw_page
+
+            if not raw_page.has_next:
+                logger.info("これ以上ページがありません")
+                break
+            page_number += 1
+    finally:
+        # 最終ページより先を先読みしていたタスクを破棄する
+        for task in pending.values():
+            task.cancel()
+        await asyncio.gather(*pending.values(), return_exceptions=True)
+
+async def fetch_result_page_http(client, keyword: str, page_number: int, settings: Settings) -> RawPage:
+    """検索結果の1ページをブラウザを使わずに取得する関数
+
+    Raises:
+        FastPathError: HTMLを取得できない、またはHTMLから商品を読み取れない場合
+    """
+    url = build_page_url(keyword, page_number, settings)
+    async with host_semaphore(url, settings):
+        with observe_stage("http_fetch"):
+            html = await fetch_html(client, url)
+        # HTMLの解析はイベントループを止めないよう別スレッドで行う
+        with observe_stage("html_parse"):
+            rows, has_next = await asyncio.to_thread(
+                extract_rows_from_html, html, item_field_selectors(settings),
+                settings.item_cell_selector, settings.next_button_selector, item_link_selectors(settings)
+            )
+        validate_rows(rows, settings)
+        # 同じホストへの連続アクセスを避けるため、枠を保持したまま待機する
+        if settings.politeness_delay > 0:
+            await asyncio.sleep(settings.politeness_delay / 1000)
+    return RawPage(number=page_number, rows=rows, has_next=has_next)
+
+async def fetch_pages_http(client, keyword: str, max_pages, settings: Settings) -> AsyncIterator[RawPage]:
+    """ブラウザを使わずに検索結果のページを順に取得する関数"""
+    page_number = 1
+    while max_pages is None or page_number <= max_pages:
+        raw_page = await fetch_result_page_http(client, keyword, page_number, settings)
+        yield raw_page
+        if not raw_page.has_next:
+            logger.info("これ以上ページがありません")
+            return
+        page_number += 1
+    logger.info(f"指定されたページ数（{max_pages}ページ）に達したため終了します")
@@ -1,15 +1,37 @@
-from typing import Dict, List, Optional
-from app.services.scraper import scrape_items
-from app.services.price_analysis import analyze_prices, format_price_analysis_to_json
-from app.services.file_manager import save_to_file, cleanup_files
-from app.models.exceptions import ScraperError, DataValidationError
-from datetime import datetime
-
-async def scrape_and_analyze(keyword: str) -> Dict:
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+from app.services.scraper import scrape_items, ProgressCallback
+from app.services.price_analysis import analyze_prices, finalize_analysis, format_price_analysis_to_json
+from app.models.price_stats import IncrementalPriceAnalyzer
+from app.services.file_manager import CsvWriterSession, cleanup_files_async, generate_result_filename, is_sweeper_running
+from app.services.result_cache import StatsCallback, get_result_cache
+from app.services.item_store import ItemStoreSink, format_timestamp, get_item_store
+from app.services.metrics import observe_stage
+from app.config.settings import get_settings
+from app.config.logger import setup_logger
+from app.models.exceptions import ScraperError, DataValidationError, StoredResultNotFoundError
+
+logger = setup_logger(__name__)
+
+async def scrape_and_analyze(keyword: str, progress_callback: Optional[ProgressCallback] = None,
+                             max_pages: Optional[int] = None, incremental: bool = False,
+                             refresh: bool = False, stats_callback: Optional[StatsCallback] = None) -> Dict:
     """スクレイピングと分析を実行するサービス関数
+
+    同じキーワードの結果がキャッシュにあればそれを返し、
+    同じキーワードの検索が実行中であればその結果を共有する（途中から共有した場合、それまでのページは通知せず、
+    最新の集計をstats_callbackに1回通知してから以降のページを通知する）。
     
     Args:
         keyword (str): 検索キーワード
+        progress_callback (ProgressCallback, optional): 各ページの保存後に呼び出す関数
+        stats_callback (StatsCallback, optional): 各ページの後に、その時点までのページ数・商品数・価格分析を受け取る関数
+        max_pages (int, optional): 取得する最大ページ数。Noneの場合は全ページ取得。
+        incremental (bool, optional): 前回の検索結果からの差分だけを取得するかどうか。
+            新着順に取得し、すべての商品が取得済みのページで終了して前回の結果と統合する。
+        refresh (bool, optional): キャッシュを使わずにスクレイピングし、結果でキャッシュを更新するかどうか。
+            同じキーワードの検索が実行中であれば、新たに実行せずにその結果を共有する。
         
     Returns:
         Dict: 分析結果を含む辞書
@@ -18,45 +40,248 @@ async def scrape_and_analyze(keyword: str) -> Dict:
         ScraperError: スクレイピング処理中のエラー
         DataValidationError: データ検証エラー
     """
-    try:
-        # タイムスタンプ付きのファイル名を生成
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{timestamp}.csv"
-        
-        # 既存のファイルをクリーンアップ（古いファイルの削除）
-        cleanup_files()
+    if not get_settings().result_cache_enabled:
+        return await _scrape_and_analyze(keyword, progress_callback, max_pages, incremental, stats_callback)
+
+    cache = get_result_cache()
+    key = cache.make_key(keyword, max_pages=max_pages, incremental=incremental)
+    create = cache.refresh if refresh else cache.get_or_create
+    return await create(
+        key, lambda progress, stats: _scrape_and_analyze(keyword, progress, max_pages, incremental, stats),
+        progress_callback, stats_callback
+    )
+
+async def _scrape_and_analyze(keyword: str, progress_callback: Optional[ProgressCallback] = None,
+                              max_pages: Optional[int] = None, incremental: bool = False,
+                              stats_callback: Optional[StatsCallback] = None) -> Dict:
+    """キャッシュを使わずにスクレイピングと分析を実行する関数
+    
+    Returns:
+        Dict: 分析結果を含む辞書
         
-        # スクレイピングを実行
-        all_items = await scrape_items(keyword, filename)
+    Raises:
+        ScraperError: スクレイピング処理中のエラー
+        DataValidationError: データ検証エラー
+    """
+    try:
+        # 同時に実行された検索とも重複しないファイル名を生成
+        filename = generate_result_filename(keyword)
         
-        if not all_items:
-            raise DataValidationError("商品が見つかりませんでした")
+        # 既存のファイルをクリーンアップ（バックグラウンドで削除していない場合のみ）
+        if not is_sweeper_running():
+            await cleanup_files_async()
         
-        # 価格分析を実行
-        analysis = analyze_prices(all_items)
-        if not analysis:
-            raise DataValidationError("価格分析に失敗しました")
+        # ページごとに価格分析を更新しながらスクレイピングを実行
+        analyzer = IncrementalPriceAnalyzer()
+        new_item_ids = set()
+        pages_scraped = 0
+        items_scraped = 0
+
+        def on_page(page_number, page_results):
+            nonlocal pages_scraped, items_scraped
+            pages_scraped += 1
+            items_scraped += len(page_results)
+            with observe_stage("analysis"):
+                analyzer.add_items(page_results)
+            new_item_ids.update(item['item_id'] for item in page_results if item.get('item_id'))
+            if progress_callback:
+                progress_callback(page_number, page_results)
+            if stats_callback:
+                stats_callback(pages_scraped, items_scraped, analyzer.snapshot())
+
+        # 商品データベースが有効であれば、ページごとの商品を商品IDごとに保存する
+        settings = get_settings()
+        store = get_item_store()
+        sinks = []
+        store_sink = None
+        if store is not None:
+            scrape_id = await store.run(store.start_scrape, keyword, filename)
+            store_sink = ItemStoreSink(store, scrape_id, keyword)
+            sinks.append(store_sink)
+
+        # 差分取得: 新着順に並べ、取得済みの商品だけのページに達したら終了する
+        known_ids = None
+        previous = None
+        unfiltered_sinks = []
+        if incremental:
+            if store is None:
+                logger.warning("商品データベースが無効なため、差分ではなく全ページを取得します")
+            else:
+                previous = await store.run(store.latest_scrape, keyword)
+                settings = settings.model_copy(update={"search_sort_params": settings.incremental_sort_params})
+                # 既知の商品の価格の変化も記録するよう、データベースには商品を除く前のページを保存する
+                sinks, unfiltered_sinks = [], sinks
+                known_ids = lambda item_ids: store.run(store.known_item_ids, keyword, item_ids)
+
+        async with CsvWriterSession(filename, keyword) as writer:
+            # 商品はページごとに書き込みと分析に渡すため、全件をメモリに集めない
+            await scrape_items(keyword, filename, max_pages, settings, progress_callback=on_page, writer=writer,
+                               sinks=sinks, collect=False, known_ids=known_ids, unfiltered_sinks=unfiltered_sinks)
+            new_items = writer.rows_buffered
+
+            # 今回のページで見つかった既知の商品と、前回の結果のうち期限内に見つかっている商品を、
+            # データベースの最新の価格で新しい商品の後ろに統合する
+            if known_ids is not None:
+                if store_sink.failed:
+                    logger.warning(f"{keyword}: 商品データベースへの保存に失敗したため、前回の結果を統合しません")
+                else:
+                    if previous is not None:
+                        max_age = settings.incremental_merge_max_age
+                        min_last_seen_at = time.time() - max_age if max_age > 0 else None
+                        await store.run(store.extend_scrape, scrape_id, previous["scrape_id"], min_last_seen_at)
+                    merged = await store.run(store.scrape_items, scrape_id)
+                    rest = [item for item in merged if item['item_id'] not in new_item_ids]
+                    await writer.append_items(rest)
+                    with observe_stage("analysis"):
+                        analyzer.add_items(rest)
+                    logger.info(f"{keyword}: 新しい商品 {new_items}件に前回までの商品 {len(rest)}件を統合しました")
             
+            if not writer.rows_buffered:
+                raise DataValidationError("商品が見つかりませんでした")
+            
+            # 価格分析の結果を取得
+            with observe_stage("analysis"):
+                analysis = finalize_analysis(analyzer)
+            if not analysis:
+                raise DataValidationError("価格分析に失敗しました")
+                
+            # 分析結果をCSVに追記（商品行は各ページで書き込み済み）
+            await writer.write_analysis(analysis)
+            
+        if store_sink is not None and not store_sink.failed:
+            await store.run(store.finish_scrape, scrape_id)
+
         # 分析結果をJSON形式に変換
         analysis_json = format_price_analysis_to_json(analysis)
-        
-        # 分析結果をCSVに追記
-        save_to_file(
-            data=all_items,
-            keyword=keyword,
-            filename=filename,
-            is_first_page=False,
-            is_last_page=True,
-            analysis=analysis
-        )
             
-        return {
+        result = {
             "analysis": analysis_json,
             "error": None,
-            "filename": filename
+            "filename": filename,
+            "pages": pages_scraped
         }
+        if incremental:
+            result["new_items"] = new_items
+        return result
         
     except Exception as e:
         if isinstance(e, (ScraperError, DataValidationError)):
             raise
         raise ScraperError(f"スクレイピング処理中にエラーが発生しました: {str(e)}")
+
+async def stream_search_events(keyword: str, max_pages: Optional[int] = None,
+                               keepalive_seconds: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+    """スクレイピングの途中経過をイベントとして順に返す非同期ジェネレーター
+
+    イベントは`{"event": 種類, "data": 内容}`の辞書で、次の順に返す。
+    - page: 各ページの商品（`page`、`items`、`items_so_far`）
+    - stats: その時点までの価格分析（`format_price_analysis_to_json`と同じ形式）
+    - summary: 全商品の価格分析（`format_price_analysis_to_json`と同じ形式）
+    - done: 結果ファイル名（`filename`）
+    `keepalive_seconds`の間イベントが無い場合は、接続維持用に`keepalive`イベントを返す。
+    実行中の同じ検索を途中から共有する場合、それまでのページのpageイベントは返さず、
+    その時点までの価格分析のstatsイベントを1回返してから以降のページを返す（`items_so_far`は共有前のページを含む）。
+    キャッシュされた結果を返す場合、page・statsイベントは返さない。
+
+    Raises:
+        ScraperError: スクレイピング処理中のエラー
+        DataValidationError: データ検証エラー
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    items_so_far = 0
+
+    def on_page(page_number, page_results):
+        nonlocal items_so_far
+        items_so_far += len(page_results)
+        queue.put_nowait({
+            "event": "page",
+            "data": {"page": page_number, "items": page_results, "items_so_far": items_so_far}
+        })
+
+    def on_stats(pages_done, total_items, analysis):
+        # 途中から共有した場合は、最初の通知でそれまでの商品数に合わせる
+        nonlocal items_so_far
+        items_so_far = total_items
+        queue.put_nowait({"event": "stats", "data": format_price_analysis_to_json(analysis)})
+
+    task = asyncio.create_task(scrape_and_analyze(
+        keyword, progress_callback=on_page, max_pages=max_pages, stats_callback=on_stats
+    ))
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield {"event": "keepalive", "data": None}
+                continue
+            if event is None:
+                break
+            yield event
+
+        result = task.result()
+        yield {"event": "summary", "data": result["analysis"]}
+        yield {"event": "done", "data": {"filename": result["filename"]}}
+    finally:
+        # クライアントが切断した場合はスクレイピングを中止する
+        if not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+async def get_stored_result(keyword: str) -> Dict:
+    """商品データベースからキーワードの前回の検索結果と価格分析を返す関数（スクレイピングしない）
+
+    商品の価格はデータベースにある最新の価格を使う。
+
+    Raises:
+        StoredResultNotFoundError: 商品データベースが無効、または保存された検索結果が無い場合
+    """
+    store = get_item_store()
+    scrape = await store.run(store.latest_scrape, keyword) if store is not None else None
+    if scrape is None:
+        raise StoredResultNotFoundError(f"保存された検索結果がありません: {keyword}")
+    items = await store.run(store.scrape_items, scrape["scrape_id"])
+    return {
+        "keyword": keyword,
+        "scraped_at": format_timestamp(scrape["finished_at"]),
+        "filename": scrape["filename"],
+        "analysis": format_price_analysis_to_json(analyze_prices(items)) if items else None,
+        "items": items
+    }
+
+async def get_stored_item(item_id: str) -> Dict:
+    """商品データベースから商品の現在の情報と価格履歴を返す関数
+
+    Raises:
+        StoredResultNotFoundError: 商品データベースが無効、または商品が無い場合
+    """
+    store = get_item_store()
+    item = await store.run(store.get_item, item_id) if store is not None else None
+    if item is None:
+        raise StoredResultNotFoundError(f"商品が見つかりません: {item_id}")
+    item["price_history"] = await store.run(store.price_history, item_id)
+    return item
+
+async def restore_result_file(filename: str) -> bool:
+    """削除された結果ファイルを商品データベースから作り直す関数
+
+    商品は検索時の順に書き込み、価格は価格履歴から検索が終了した時点の価格を使う。
+    ヘッダーの取得開始日時は作り直した日時になる。
+
+    Returns:
+        bool: 作り直した場合はTrue（データベースが無効、または該当する検索が無い場合はFalse）
+    """
+    store = get_item_store()
+    if store is None:
+        return False
+    scrape = await store.run(store.find_scrape_by_filename, filename)
+    if scrape is None:
+        return False
+    items = await store.run(store.scrape_items, scrape["scrape_id"], as_of=scrape["finished_at"])
+    if not items:
+        return False
+
+    async with CsvWriterSession(filename, scrape["keyword"]) as writer:
+        await writer.append_items(items)
+        await writer.write_analysis(analyze_prices(items))
+    return True
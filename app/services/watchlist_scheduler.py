@@ -0,0 +1,298 @@
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+from app.config.settings import Settings, get_settings
+from app.config.logger import setup_logger
+from app.models.exceptions import DataValidationError, WatchlistNotFoundError
+from app.models.watchlist import WatchlistEntry
+from app.services.file_manager import run_file_io
+from app.services.scraper import share_context
+from app.services.scraper_service import scrape_and_analyze
+
+logger = setup_logger(__name__)
+
+# 次の実行予定が無くても、この秒数ごとに実行予定を確認する
+MAX_SLEEP_SECONDS = 60.0
+
+class WatchlistScheduler:
+    """ウォッチリストのキーワードを、キーワードごとの間隔で定期的に検索する
+
+    同じ時刻に実行予定になったキーワードはバッチにまとめ、1つのブラウザコンテキストで続けて検索する。
+    同時に実行するバッチの数は設定の上限までとし、前回の検索が終わっていないキーワードはその回を飛ばす。
+    """
+
+    def __init__(self, settings: Settings = None, runner=None):
+        self.settings = settings or get_settings()
+        self.runner = runner or scrape_and_analyze
+        self.path = Path(self.settings.watchlist_path)
+        self._entries: Dict[str, WatchlistEntry] = {}
+        self._budget = asyncio.Semaphore(max(1, self.settings.watchlist_max_concurrency))
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop_task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._save_lock = asyncio.Lock()
+
+    async def start(self):
+        """保存されたウォッチリストを読み込み、定期実行を開始する"""
+        if self._loop_task is not None:
+            return
+        await self.load()
+        self._wakeup = asyncio.Event()
+        self._loop_task = asyncio.create_task(self._loop())
+        logger.info(f"定期検索を開始しました（{len(self._entries)}件）")
+
+    async def stop(self):
+        """定期実行と実行中の検索を停止する"""
+        tasks = list(self._tasks)
+        if self._loop_task is not None:
+            tasks.append(self._loop_task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+        self._tasks = set()
+
+    async def load(self):
+        """保存されたウォッチリストを読み込む（実行時刻はジッターの範囲でずらす）
+
+        不正な設定のキーワードは読み飛ばし、残りのキーワードだけで開始する。
+        """
+        try:
+            configs = await run_file_io(self._read_configs)
+        except (OSError, ValueError) as e:
+            logger.error(f"ウォッチリストの読み込みに失敗しました: {e}")
+            return
+        if not isinstance(configs, list):
+            logger.error(f"ウォッチリストの形式が不正なため読み込みません: {self.path}")
+            return
+        now = datetime.now()
+        for config in configs:
+            try:
+                entry = WatchlistEntry(**config)
+                self._validate(entry.keyword, entry.interval_seconds, entry.jitter_seconds, entry.max_pages)
+            except (TypeError, DataValidationError) as e:
+                logger.error(f"ウォッチリストの不正な設定を読み飛ばします: {config}: {e}")
+                continue
+            entry.next_run_at = now + timedelta(seconds=random.uniform(0, entry.jitter_seconds))
+            self._entries[entry.keyword] = entry
+
+    def _read_configs(self):
+        if not self.path.exists():
+            return []
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    async def save(self):
+        """ウォッチリストの設定をファイルに保存する"""
+        configs = [entry.to_config() for entry in self._entries.values()]
+        # 同時に保存すると一時ファイルへの書き込みが混ざるため、1つずつ保存する
+        async with self._save_lock:
+            await run_file_io(self._write_configs, configs)
+
+    def _write_configs(self, configs):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(configs, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def list(self) -> List[WatchlistEntry]:
+        return list(self._entries.values())
+
+    def get(self, keyword: str) -> WatchlistEntry:
+        """キーワードの登録内容と実行状況を取得する
+
+        Raises:
+            WatchlistNotFoundError: 登録されていない場合
+        """
+        entry = self._entries.get(keyword)
+        if entry is None:
+            raise WatchlistNotFoundError(f"ウォッチリストに登録されていません: {keyword}")
+        return entry
+
+    async def upsert(self, keyword: str, interval_seconds: Optional[int] = None, jitter_seconds: Optional[int] = None,
+               max_pages: Optional[int] = None, incremental: bool = True, enabled: bool = True) -> WatchlistEntry:
+        """キーワードを登録する（登録済みの場合は設定を更新する）
+
+        Raises:
+            DataValidationError: キーワード・実行間隔が不正な場合
+        """
+        keyword = keyword.strip()
+        if interval_seconds is None:
+            interval_seconds = self.settings.watchlist_default_interval
+        if jitter_seconds is None:
+            jitter_seconds = self.settings.watchlist_default_jitter
+        self._validate(keyword, interval_seconds, jitter_seconds, max_pages)
+
+        entry = self._entries.get(keyword)
+        if entry is None:
+            entry = WatchlistEntry(keyword=keyword, interval_seconds=interval_seconds)
+            entry.next_run_at = datetime.now() + timedelta(seconds=random.uniform(0, jitter_seconds))
+            self._entries[keyword] = entry
+        entry.interval_seconds = interval_seconds
+        entry.jitter_seconds = jitter_seconds
+        entry.max_pages = max_pages
+        entry.incremental = incremental
+        entry.enabled = enabled
+        if entry.last_started_at is not None:
+            # 実行間隔を変更した場合は前回の実行時刻から数え直す
+            entry.next_run_at = self._next_run_at(entry, entry.last_started_at)
+        await self.save()
+        self._wake()
+        return entry
+
+    def _validate(self, keyword, interval_seconds, jitter_seconds, max_pages):
+        """キーワードと実行間隔の設定を検証する
+
+        Raises:
+            DataValidationError: 設定が不正な場合
+        """
+        if not isinstance(keyword, str) or not keyword.strip():
+            raise DataValidationError("キーワードがありません")
+        if not isinstance(interval_seconds, int) or interval_seconds < self.settings.watchlist_min_interval:
+            raise DataValidationError(f"実行間隔は{self.settings.watchlist_min_interval}秒以上にしてください")
+        if not isinstance(jitter_seconds, int) or jitter_seconds < 0:
+            raise DataValidationError("ジッターは0秒以上にしてください")
+        if max_pages is not None and (not isinstance(max_pages, int) or max_pages < 1):
+            raise DataValidationError("最大ページ数は1以上にしてください")
+
+    async def remove(self, keyword: str) -> WatchlistEntry:
+        """キーワードの登録を解除する（実行中の検索は最後まで実行する）
+
+        Raises:
+            WatchlistNotFoundError: 登録されていない場合
+        """
+        entry = self.get(keyword)
+        del self._entries[keyword]
+        await self.save()
+        return entry
+
+    def trigger(self, keyword: str) -> WatchlistEntry:
+        """次の実行予定を待たずに検索する
+
+        Raises:
+            WatchlistNotFoundError: 登録されていない場合
+        """
+        entry = self.get(keyword)
+        entry.next_run_at = datetime.now()
+        self._wake()
+        return entry
+
+    def run_due(self, now: Optional[datetime] = None) -> List[asyncio.Task]:
+        """実行予定の時刻になったキーワードをバッチにまとめて実行を開始する
+
+        Returns:
+            List[asyncio.Task]: 開始したバッチのタスク
+        """
+        now = now or datetime.now()
+        due = sorted(
+            (entry for entry in self._entries.values()
+             if entry.enabled and entry.next_run_at is not None and entry.next_run_at <= now),
+            key=lambda entry: entry.next_run_at
+        )
+        ready = []
+        for entry in due:
+            entry.next_run_at = self._next_run_at(entry, now)
+            if entry.running:
+                entry.skipped_runs += 1
+                logger.info(f"前回の検索が終わっていないため実行を飛ばします: {entry.keyword}")
+                continue
+            entry.running = True
+            ready.append(entry)
+
+        batch_size = max(1, self.settings.watchlist_batch_size)
+        tasks = []
+        for start in range(0, len(ready), batch_size):
+            task = asyncio.create_task(self._run_batch(ready[start:start + batch_size]))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            tasks.append(task)
+        return tasks
+
+    def _next_run_at(self, entry: WatchlistEntry, base: datetime) -> datetime:
+        return base + timedelta(seconds=entry.interval_seconds + random.uniform(0, entry.jitter_seconds))
+
+    def _seconds_until_next_run(self) -> float:
+        now = datetime.now()
+        waits = [
+            (entry.next_run_at - now).total_seconds()
+            for entry in self._entries.values() if entry.enabled and entry.next_run_at is not None
+        ]
+        return min([MAX_SLEEP_SECONDS] + [max(0.0, wait) for wait in waits])
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _loop(self):
+        while True:
+            self._wakeup.clear()
+            self.run_due()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._seconds_until_next_run())
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_batch(self, batch: List[WatchlistEntry]):
+        try:
+            async with self._budget:
+                remaining = list(batch)
+                while remaining:
+                    async with share_context() as shared:
+                        while remaining:
+                            if not await self._run_entry(remaining.pop(0)):
+                                # 失敗した検索がコンテキストを壊している可能性があるため、残りは新しいコンテキストで実行する
+                                break
+                        if shared.uses > 1:
+                            logger.info(f"{shared.uses}件の定期検索で同じブラウザコンテキストを使いました")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"定期検索のバッチでエラーが発生しました: {e}")
+        finally:
+            for entry in batch:
+                entry.running = False
+
+    async def _run_entry(self, entry: WatchlistEntry) -> bool:
+        """登録された検索を1回実行する（検索が失敗した場合はFalseを返す）"""
+        if self._entries.get(entry.keyword) is not entry:
+            # 実行を待つ間に登録が解除された場合
+            return True
+        entry.last_started_at = datetime.now()
+        try:
+            entry.last_result = await self.runner(
+                entry.keyword, max_pages=entry.max_pages, incremental=entry.incremental, refresh=True
+            )
+            entry.last_status = "succeeded"
+            entry.last_error = None
+            return True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"定期検索でエラーが発生しました: {entry.keyword}: {e}")
+            entry.last_status = "failed"
+            entry.last_error = str(e)
+            return False
+        finally:
+            entry.running = False
+            entry.runs += 1
+            entry.last_finished_at = datetime.now()
+
+_scheduler: Optional[WatchlistScheduler] = None
+
+def get_watchlist_scheduler() -> WatchlistScheduler:
+    """アプリ全体で共有するスケジューラーを返す"""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = WatchlistScheduler()
+    return _scheduler
+
+async def start_watchlist_scheduler():
+    """共有スケジューラーの定期実行を開始する"""
+    await get_watchlist_scheduler().start()
+
+async def stop_watchlist_scheduler():
+    """共有スケジューラーを停止する"""
+    if _scheduler is not None:
+        await _scheduler.stop()
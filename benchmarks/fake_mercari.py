@@ -0,0 +1,224 @@
+"""ベンチマークとテスト用のメルカリ検索結果ページを返すローカルサーバー
+
+実際のjp.mercari.comにアクセスせずに`scrape_items`を実行できるよう、設定のセレクタと同じ
+`data-testid`の構造を持つ検索結果ページを合成して返す。
+商品数・ページ数・応答の遅延・スクロールによる追加読み込み（遅延読み込み）を設定できる。
+
+使い方（リポジトリのルートで実行）:
+    python -m benchmarks.fake_mercari --port 8081 --items 120 --pages 5 --latency-ms 200 --lazy-initial 30
+
+コードから使う場合:
+    with FakeMercariServer(FakeMercariConfig(pages=3)) as server:
+        server.configure(settings)  # 検索URLをこのサーバーに向ける
+        items = await scrape_items("iPhone", filename, None, settings)
+"""
+import argparse
+import html
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+from urllib.parse import parse_qs, quote, urlparse
+from app.config.settings import Settings
+
+@dataclass
+class FakeMercariConfig:
+    """合成する検索結果ページの設定"""
+    items_per_page: int = 120
+    pages: int = 5
+    latency_ms: float = 0  # 応答までの遅延
+    latency_jitter_ms: float = 0  # 遅延に加えるばらつきの最大値
+    lazy_initial_items: Optional[int] = None  # 最初のHTMLに含める商品数（Noneの場合は全商品）
+    lazy_batch_size: int = 30  # 最下部までスクロールしたときに追加する商品数
+    lazy_delay_ms: int = 100  # スクロールしてから商品を追加するまでの時間
+    seed: int = 0  # 価格を決める乱数のシード
+
+def page_number_from_token(token: Optional[str]) -> int:
+    """`page_token`（v1:<0始まりのページ番号>）からページ番号（1始まり）を返す関数"""
+    if not token:
+        return 1
+    try:
+        return int(token.rsplit(":", 1)[1]) + 1
+    except (IndexError, ValueError):
+        return 1
+
+def build_item_cells(keyword: str, page_number: int, config: FakeMercariConfig) -> List[str]:
+    """1ページ分の商品セルのHTMLを作成する関数（同じページには毎回同じ商品を返す）"""
+    rng = random.Random(f"{config.seed}:{page_number}")
+    name = html.escape(keyword)
+    cells = []
+    for index in range(config.items_per_page):
+        item_id = f"m{page_number:04d}{index:05d}"
+        price = rng.randrange(300, 300000, 10)
+        cells.append(
+            f'<li data-testid="item-cell" style="height:160px">'
+            f'<a href="/item/{item_id}" data-testid="thumbnail-link">'
+            f'<span data-testid="thumbnail-item-name">{name} 商品 {page_number}-{index + 1}</span>'
+            f'<span class="merPrice"><span class="currency__6b270ca7">¥</span>'
+            f'<span class="number__6b270ca7">{price:,}</span></span>'
+            f'</a></li>'
+        )
+    return cells
+
+LAZY_LOAD_SCRIPT = """
+<script>
+const pending = %(pending)s;
+let loading = false;
+window.addEventListener('scroll', () => {
+    if (loading || !pending.length) return;
+    if (window.innerHeight + window.scrollY < document.body.scrollHeight - 200) return;
+    loading = true;
+    setTimeout(() => {
+        document.getElementById('item-grid').insertAdjacentHTML('beforeend', pending.splice(0, %(batch)d).join(''));
+        loading = false;
+    }, %(delay)d);
+});
+</script>
+"""
+
+def build_search_page(keyword: str, page_number: int, config: FakeMercariConfig) -> str:
+    """検索結果ページのHTMLを作成する関数（範囲外のページは商品の無いページ）"""
+    cells = build_item_cells(keyword, page_number, config) if page_number <= config.pages else []
+    initial = len(cells) if config.lazy_initial_items is None else config.lazy_initial_items
+    visible, pending = cells[:initial], cells[initial:]
+
+    next_button = ""
+    if page_number < config.pages:
+        next_url = f"/search?keyword={quote(keyword)}&page_token=v1%3A{page_number}"
+        next_button = (
+            f'<div data-testid="pagination-next-button" onclick="location.href=\'{next_url}\'">'
+            f'<a href="{next_url}">次へ</a></div>'
+        )
+    script = ""
+    if pending:
+        script = LAZY_LOAD_SCRIPT % {
+            "pending": json.dumps(pending, ensure_ascii=False),
+            "batch": max(1, config.lazy_batch_size),
+            "delay": config.lazy_delay_ms
+        }
+    return (
+        '<!DOCTYPE html><html lang="ja"><head><meta charset="utf-8">'
+        f'<title>{html.escape(keyword)}の検索結果</title></head><body>'
+        f'<ul id="item-grid">{"".join(visible)}</ul>{next_button}{script}</body></html>'
+    )
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = "FakeMercari/1.0"
+
+    def do_GET(self):
+        fake: FakeMercariServer = self.server.fake
+        url = urlparse(self.path)
+        if url.path != "/search":
+            self.send_error(404)
+            return
+
+        query = parse_qs(url.query)
+        keyword = query.get("keyword", [""])[0]
+        page_number = page_number_from_token(query.get("page_token", [None])[0])
+        config = fake.config
+        delay = config.latency_ms + random.uniform(0, config.latency_jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+        body = build_search_page(keyword, page_number, config).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        fake.record_request(page_number)
+
+    def log_message(self, format, *args):
+        # ベンチマークの出力を乱さないようアクセスログは出さない
+        pass
+
+class FakeMercariServer:
+    """合成した検索結果ページを返すHTTPサーバー（別スレッドで動作する）"""
+
+    def __init__(self, config: FakeMercariConfig = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or FakeMercariConfig()
+        self.host = host
+        self.port = port
+        self.requests_by_page = {}  # ページ番号ごとの応答回数
+        self._lock = threading.Lock()
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def record_request(self, page_number: int):
+        with self._lock:
+            self.requests_by_page[page_number] = self.requests_by_page.get(page_number, 0) + 1
+
+    def start(self) -> "FakeMercariServer":
+        self._httpd = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self.port = self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-mercari", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    def configure(self, settings: Settings) -> Settings:
+        """検索URLのテンプレートをこのサーバーに向ける"""
+        settings.search_url_template = f"{self.base_url}/search?keyword={{keyword}}"
+        settings.page_url_template = f"{self.base_url}/search?keyword={{keyword}}&page_token=v1%3A{{page_index}}"
+        return settings
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """合成するページの設定をコマンドライン引数に追加する"""
+    parser.add_argument("--items", type=int, default=120, help="1ページの商品数")
+    parser.add_argument("--pages", type=int, default=5, help="ページ数")
+    parser.add_argument("--latency-ms", type=float, default=0, help="応答までの遅延（ミリ秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="遅延に加えるばらつきの最大値（ミリ秒）")
+    parser.add_argument("--lazy-initial", type=int, default=None, help="最初のHTMLに含める商品数（省略時は全商品）")
+    parser.add_argument("--lazy-batch", type=int, default=30, help="スクロールごとに追加する商品数")
+    parser.add_argument("--lazy-delay-ms", type=int, default=100, help="スクロールしてから商品を追加するまでの時間")
+
+def config_from_args(args) -> FakeMercariConfig:
+    return FakeMercariConfig(
+        items_per_page=args.items,
+        pages=args.pages,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.jitter_ms,
+        lazy_initial_items=args.lazy_initial,
+        lazy_batch_size=args.lazy_batch,
+        lazy_delay_ms=args.lazy_delay_ms
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="合成したメルカリの検索結果ページを返すローカルサーバー")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    server = FakeMercariServer(config_from_args(args), args.host, args.port).start()
+    print(f"起動しました: {server.base_url}/search?keyword=iPhone （Ctrl+Cで終了）")
+    try:
+        server._thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""起動プロファイルごとのメモリ使用量と取得速度を比較するベンチマーク
+
+使い方（リポジトリのルートで実行）:
+    python -m benchmarks.launch_profiles --keyword iPhone --pages 3
+    python -m benchmarks.launch_profiles --profiles headless minimal --runs 3 --output results/bench_profiles.json
+
+ブラウザのプロセス（子プロセスを含む）の常駐メモリ（RSS）を一定間隔で計測し、最大値を記録する。
+メモリの計測は/procを参照するため、Linux以外では記録されない。
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from playwright.async_api import async_playwright
+from app.config.settings import get_settings
+from app.services.browser_pool import LAUNCH_PROFILES, launch_browser, new_context
+from app.services.scraper import fetch_pages, rows_to_items
+
+def process_tree_rss(root_pid: int) -> Optional[int]:
+    """指定したプロセスとその子孫のRSSの合計（バイト）を返す関数（/procが無い場合はNone）"""
+    proc = Path("/proc")
+    if not proc.exists():
+        return None
+    children: Dict[int, List[int]] = {}
+    for entry in proc.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # 2番目の項目（実行ファイル名）に空白が含まれる場合があるため、括弧の後ろから分割する
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry.name))
+
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        try:
+            resident = int((proc / str(pid) / "statm").read_text().split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        total += resident * page_size
+        stack.extend(children.get(pid, []))
+    return total
+
+async def sample_memory(peak: Dict[str, int], interval: float = 0.2):
+    """このプロセスとブラウザ（子プロセス）のメモリ使用量を一定間隔で計測し、最大値を記録する"""
+    while True:
+        rss = process_tree_rss(os.getpid())
+        if rss is not None:
+            peak["rss"] = max(peak.get("rss", 0), rss)
+        await asyncio.sleep(interval)
+
+async def run_profile(profile: str, keyword: str, pages: int) -> Dict:
+    """1つの起動プロファイルで検索結果のページを取得し、計測結果を返す"""
+    settings = get_settings()
+    settings.browser_profile = profile
+    peak: Dict[str, int] = {}
+    sampler = asyncio.create_task(sample_memory(peak))
+
+    playwright = await async_playwright().start()
+    browser = None
+    try:
+        started = time.perf_counter()
+        browser = await launch_browser(playwright, settings)
+        context = await new_context(browser, settings)
+        launched = time.perf_counter()
+
+        page_count = 0
+        item_count = 0
+        async for raw_page in fetch_pages(context, keyword, pages, settings):
+            page_count += 1
+            item_count += len(rows_to_items(raw_page.rows, settings))
+        elapsed = time.perf_counter() - launched
+    finally:
+        sampler.cancel()
+        await asyncio.gather(sampler, return_exceptions=True)
+        if browser:
+            await browser.close()
+        await playwright.stop()
+
+    return {
+        "profile": profile,
+        "launch_seconds": round(launched - started, 3),
+        "scrape_seconds": round(elapsed, 3),
+        "pages": page_count,
+        "items": item_count,
+        "pages_per_minute": round(page_count / elapsed * 60, 2) if elapsed > 0 else None,
+        "peak_rss_mb": round(peak["rss"] / 1024 / 1024, 1) if "rss" in peak else None,
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="起動プロファイルごとのメモリ使用量と取得速度を比較する")
+    parser.add_argument("--keyword", default="iPhone", help="検索キーワード")
+    parser.add_argument("--pages", type=int, default=3, help="プロファイルごとに取得するページ数")
+    parser.add_argument("--profiles", nargs="+", default=list(LAUNCH_PROFILES), choices=list(LAUNCH_PROFILES))
+    parser.add_argument("--runs", type=int, default=1, help="プロファイルごとの実行回数")
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    args = parser.parse_args()
+
+    results = []
+    for profile in args.profiles:
+        for run in range(args.runs):
+            result = await run_profile(profile, args.keyword, args.pages)
+            result["run"] = run + 1
+            results.append(result)
+            print(
+                f"{profile:<13} run {run + 1}: {result['pages']}ページ {result['items']}件 "
+                f"{result['pages_per_minute']} ページ/分 起動 {result['launch_seconds']}秒 "
+                f"最大メモリ {result['peak_rss_mb']} MB"
+            )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {args.output}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
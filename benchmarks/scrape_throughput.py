@@ -0,0 +1,160 @@
+"""ローカルの疑似メルカリサーバーに対して`scrape_items`の処理速度を計測するベンチマーク
+
+使い方（リポジトリのルートで実行）:
+    python -m benchmarks.scrape_throughput --backend http --pages 10 --items 120 --runs 3
+    python -m benchmarks.scrape_throughput --backend browser --latency-ms 200 --lazy-initial 30 \\
+        --output results/bench_scrape.json
+
+実際のサイトにはアクセスしないため、同じ設定であれば実行ごとの結果を比較できる。
+1ページあたりの時間は、前のページ（1ページ目は開始時刻）から各ページの商品が出力先に届くまでの時間。
+ブラウザの起動時間を含めないよう、browser・autoの場合は計測前にブラウザプールを起動しておく。
+結果はJSON（設定・実行ごとの結果・実行の中央値）で保存する。
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import subprocess
+import time
+from dataclasses import asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from app.config.settings import Settings
+from app.services.browser_pool import start_browser_pool, stop_browser_pool
+from app.services.file_manager import CsvWriterSession, generate_result_filename
+from app.services.scraper import scrape_items
+from benchmarks.fake_mercari import FakeMercariConfig, FakeMercariServer, add_config_arguments, config_from_args
+from benchmarks.launch_profiles import sample_memory
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """最近接順位法でパーセンタイルを返す関数（値が無い場合はNone）"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))  # 切り上げ
+    return ordered[int(rank) - 1]
+
+async def run_once(settings: Settings, keyword: str, max_pages: Optional[int]) -> Dict:
+    """1回スクレイピングを実行して計測結果を返す"""
+    page_seconds: List[float] = []
+    counts = {"items": 0}
+    peak: Dict[str, int] = {}
+
+    def on_page(page_number, items):
+        now = time.perf_counter()
+        page_seconds.append(now - counts.get("last", started))
+        counts["last"] = now
+        counts["items"] += len(items)
+
+    # 結果ファイルは書き込みまで行い、公開せずに削除する
+    writer = CsvWriterSession(generate_result_filename(keyword), keyword, settings)
+    sampler = asyncio.create_task(sample_memory(peak))
+    started = time.perf_counter()
+    try:
+        await scrape_items(keyword, writer.filename, max_pages, settings,
+                           progress_callback=on_page, writer=writer, collect=False)
+        await writer.flush(sync=True)
+        elapsed = time.perf_counter() - started
+    finally:
+        sampler.cancel()
+        await asyncio.gather(sampler, return_exceptions=True)
+        await writer.abort()
+
+    pages = len(page_seconds)
+    return {
+        "seconds": round(elapsed, 3),
+        "pages": pages,
+        "items": counts["items"],
+        "pages_per_second": round(pages / elapsed, 3) if elapsed > 0 else None,
+        "items_per_second": round(counts["items"] / elapsed, 1) if elapsed > 0 else None,
+        "page_p50_ms": round(percentile(page_seconds, 50) * 1000, 1) if page_seconds else None,
+        "page_p95_ms": round(percentile(page_seconds, 95) * 1000, 1) if page_seconds else None,
+        "peak_rss_mb": round(peak["rss"] / 1024 / 1024, 1) if "rss" in peak else None,
+    }
+
+def summarize(runs: List[Dict]) -> Dict:
+    """実行ごとの結果の中央値を返す"""
+    summary = {}
+    for key in ("seconds", "pages_per_second", "items_per_second", "page_p50_ms", "page_p95_ms", "peak_rss_mb"):
+        values = [run[key] for run in runs if run.get(key) is not None]
+        summary[key] = round(statistics.median(values), 3) if values else None
+    return summary
+
+def git_revision() -> Optional[str]:
+    """計測したコードのコミット（取得できない場合はNone）"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def run_benchmark(config: FakeMercariConfig, backend: str = "browser", runs: int = 1,
+                        keyword: str = "iPhone", max_pages: Optional[int] = None,
+                        settings: Settings = None) -> Dict:
+    """疑似サーバーを起動し、指定した回数だけスクレイピングを計測する"""
+    settings = settings or Settings()
+    settings.fetch_backend = backend
+    uses_browser = backend != "http"
+
+    with FakeMercariServer(config) as server:
+        server.configure(settings)
+        if uses_browser:
+            await start_browser_pool(settings)
+        try:
+            results = []
+            for run in range(runs):
+                result = await run_once(settings, keyword, max_pages)
+                result["run"] = run + 1
+                results.append(result)
+        finally:
+            if uses_browser:
+                await stop_browser_pool()
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "revision": git_revision(),
+        "backend": backend,
+        "pagination_mode": settings.pagination_mode,
+        "scroll_mode": settings.scroll_mode,
+        "politeness_delay": settings.politeness_delay,
+        "server": asdict(config),
+        "runs": results,
+        "summary": summarize(results),
+    }
+
+async def main():
+    parser = argparse.ArgumentParser(description="疑似メルカリサーバーに対してスクレイピングの処理速度を計測する")
+    parser.add_argument("--backend", default="browser", choices=["browser", "http", "auto"], help="ページの取得方法")
+    parser.add_argument("--pagination", default="click", choices=["click", "url"], help="ページ送りの方法")
+    parser.add_argument("--scroll-mode", default="adaptive", choices=["adaptive", "fixed"], help="スクロール方法")
+    parser.add_argument("--politeness-delay", type=int, default=0, help="次ページへ進む前の待機時間（ミリ秒）")
+    parser.add_argument("--max-pages", type=int, default=None, help="取得する最大ページ数（省略時は全ページ）")
+    parser.add_argument("--runs", type=int, default=1, help="実行回数")
+    parser.add_argument("--output", help="結果を保存するJSONファイル")
+    add_config_arguments(parser)
+    args = parser.parse_args()
+
+    settings = Settings()
+    settings.pagination_mode = args.pagination
+    settings.scroll_mode = args.scroll_mode
+    settings.politeness_delay = args.politeness_delay
+
+    report = await run_benchmark(
+        config_from_args(args), args.backend, args.runs, max_pages=args.max_pages, settings=settings
+    )
+    for run in report["runs"]:
+        print(
+            f"run {run['run']}: {run['pages']}ページ {run['items']}件 {run['seconds']}秒 "
+            f"{run['pages_per_second']} ページ/秒 {run['items_per_second']} 件/秒 "
+            f"p50 {run['page_p50_ms']}ms p95 {run['page_p95_ms']}ms 最大メモリ {run['peak_rss_mb']} MB"
+        )
+    print(f"中央値: {json.dumps(report['summary'], ensure_ascii=False)}")
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"結果を保存しました: {args.output}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
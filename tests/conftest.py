@@ -5,6 +5,11 @@ import sys
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_root)
 
+# テストで保存した商品が実際の商品データベースに混ざらないよう、一時ディレクトリに保存する
+import tempfile
+os.environ["ITEM_STORE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="item-store-"), "items.db")
+os.environ["WATCHLIST_PATH"] = os.path.join(tempfile.mkdtemp(prefix="watchlist-"), "watchlist.json")
+
 import pytest
 from app.services.file_manager import cleanup_files
 
@@ -0,0 +1,207 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.browser_pool import BrowserPool
+from app.config.settings import Settings
+from app.models.exceptions import ScraperError
+
+def create_mock_browser():
+    """モックのブラウザを作成する"""
+    browser = MagicMock()
+    browser.is_connected.return_value = True
+    browser.close = AsyncMock()
+
+    async def new_context(**kwargs):
+        context = MagicMock()
+        context.pages = []
+        context.add_cookies = AsyncMock()
+        context.route = AsyncMock()
+        context.clear_cookies = AsyncMock()
+        context.close = AsyncMock()
+        return context
+
+    browser.new_context = AsyncMock(side_effect=new_context)
+    return browser
+
+@pytest.fixture
+def mock_playwright():
+    """Playwrightの起動をモックするフィクスチャ"""
+    playwright = MagicMock()
+    playwright.chromium.launch = AsyncMock(side_effect=lambda **kwargs: create_mock_browser())
+    playwright.stop = AsyncMock()
+    starter = MagicMock()
+    starter.start = AsyncMock(return_value=playwright)
+    with patch('app.services.browser_pool.async_playwright', return_value=starter):
+        yield playwright
+
+@pytest.fixture
+def pool_settings():
+    settings = Settings()
+    settings.browser_pool_size = 1
+    settings.browser_pool_max_contexts = 2
+    settings.browser_pool_max_uses = 3
+    settings.browser_pool_acquire_timeout = 0.1
+    return settings
+
+@pytest.mark.asyncio
+async def test_pool_reuses_context(mock_playwright, pool_settings):
+    """返却されたコンテキストが再利用されるテスト"""
+    print("test_pool_reuses_context")
+    pool = BrowserPool(pool_settings)
+    await pool.start()
+
+    async with pool.acquire() as first:
+        pass
+    async with pool.acquire() as second:
+        assert second is first
+        second.clear_cookies.assert_awaited()
+    assert mock_playwright.chromium.launch.call_count == 1
+
+    await pool.stop()
+    print("test_pool_reuses_context_success")
+
+@pytest.mark.asyncio
+async def test_pool_restarts_after_max_uses(mock_playwright, pool_settings):
+    """規定回数使われたブラウザが再起動されるテスト"""
+    print("test_pool_restarts_after_max_uses")
+    pool = BrowserPool(pool_settings)
+    await pool.start()
+    first_browser = pool._browsers[0].browser
+
+    for _ in range(pool_settings.browser_pool_max_uses):
+        async with pool.acquire():
+            pass
+
+    assert pool._browsers[0].browser is not first_browser
+    assert pool._browsers[0].uses == 0
+    first_browser.close.assert_awaited()
+
+    await pool.stop()
+    print("test_pool_restarts_after_max_uses_success")
+
+@pytest.mark.asyncio
+async def test_pool_restart_does_not_block_checkout(mock_playwright, pool_settings):
+    """ブラウザの再起動中も、他のブラウザからコンテキストを借りられるテスト"""
+    print("test_pool_restart_does_not_block_checkout")
+    pool_settings.browser_pool_size = 2
+    pool_settings.browser_pool_max_contexts = 1
+    pool_settings.browser_pool_max_uses = 1
+    pool = BrowserPool(pool_settings)
+    await pool.start()
+
+    release = asyncio.Event()
+
+    async def slow_launch(**kwargs):
+        await release.wait()
+        return create_mock_browser()
+
+    mock_playwright.chromium.launch = AsyncMock(side_effect=slow_launch)
+
+    async def use_once():
+        async with pool.acquire():
+            pass
+
+    # 返却時に1台目が再起動を始め、起動が終わらないまま止まる
+    first = asyncio.create_task(use_once())
+    await asyncio.sleep(0.01)
+    assert [slot.restarting for slot in pool._browsers].count(True) == 1
+
+    # 再起動の終了を待たずに2台目から借りられる
+    async with pool.acquire():
+        assert not first.done()
+        release.set()
+    await first
+    assert not any(slot.restarting for slot in pool._browsers)
+    await pool.stop()
+    print("test_pool_restart_does_not_block_checkout_success")
+
+@pytest.mark.asyncio
+async def test_pool_replaces_disconnected_browser(mock_playwright, pool_settings):
+    """切断されたブラウザが貸出前に再起動されるテスト"""
+    print("test_pool_replaces_disconnected_browser")
+    pool = BrowserPool(pool_settings)
+    await pool.start()
+    broken = pool._browsers[0].browser
+    broken.is_connected.return_value = False
+
+    async with pool.acquire():
+        assert pool._browsers[0].browser is not broken
+
+    await pool.stop()
+    print("test_pool_replaces_disconnected_browser_success")
+
+@pytest.mark.asyncio
+async def test_pool_limits_concurrent_contexts(mock_playwright, pool_settings):
+    """同時貸出数が上限を超えないテスト"""
+    print("test_pool_limits_concurrent_contexts")
+    pool = BrowserPool(pool_settings)
+    await pool.start()
+
+    async with pool.acquire():
+        async with pool.acquire():
+            assert pool.in_use == pool.capacity
+            with pytest.raises(ScraperError):
+                async with pool.acquire():
+                    pass
+
+    assert pool.in_use == 0
+    await pool.stop()
+    print("test_pool_limits_concurrent_contexts_success")
+
+@pytest.mark.asyncio
+async def test_pool_discards_context_on_error(mock_playwright, pool_settings):
+    """処理中に例外が出たコンテキストが破棄されるテスト"""
+    print("test_pool_discards_context_on_error")
+    pool = BrowserPool(pool_settings)
+    await pool.start()
+
+    with pytest.raises(RuntimeError):
+        async with pool.acquire() as context:
+            raise RuntimeError("boom")
+    context.close.assert_awaited()
+    assert pool._browsers[0].idle_contexts == []
+
+    await pool.stop()
+    print("test_pool_discards_context_on_error_success")
+
+@pytest.mark.asyncio
+async def test_pool_acquire_before_start():
+    """起動前に借りようとした場合のテスト"""
+    pool = BrowserPool(Settings())
+    with pytest.raises(ScraperError):
+        async with pool.acquire():
+            pass
+
+@pytest.mark.asyncio
+async def test_launch_profiles(mock_playwright, pool_settings):
+    """起動プロファイルに従ってブラウザとコンテキストが作成されるテスト"""
+    print("test_launch_profiles")
+    from app.services.browser_pool import MINIMAL_CHROMIUM_ARGS, get_launch_profile
+
+    pool_settings.browser_profile = "minimal"
+    pool_settings.browser_extra_args = ["--lang=ja"]
+    pool = BrowserPool(pool_settings)
+    await pool.start()
+    async with pool.acquire():
+        pass
+    launch_kwargs = mock_playwright.chromium.launch.call_args.kwargs
+    assert launch_kwargs["headless"] is True
+    assert launch_kwargs["args"] == MINIMAL_CHROMIUM_ARGS + ["--lang=ja"]
+    browser = pool._browsers[0].browser
+    assert browser.new_context.call_args.kwargs["viewport"] == {'width': 1280, 'height': 800}
+    await pool.stop()
+
+    # autoの場合は画面を表示できる環境でもheadless
+    pool_settings.browser_profile = "auto"
+    with patch.dict('os.environ', {"DISPLAY": ":0"}):
+        profile = get_launch_profile(pool_settings)
+    assert profile.name == "headless"
+    assert profile.headless is True
+    assert profile.slow_mo == 0
+    pool_settings.browser_profile = "headed-debug"
+    assert get_launch_profile(pool_settings).slow_mo > 0
+
+    pool_settings.browser_profile = "unknown"
+    with pytest.raises(ScraperError):
+        get_launch_profile(pool_settings)
+    print("test_launch_profiles_success")
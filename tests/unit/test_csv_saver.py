@@ -2,8 +2,11 @@ from datetime import datetime
 import pytest
 import os
 import csv
+import re
 from pathlib import Path
-from app.services.file_manager import save_to_file, setup_results_dir
+from unittest.mock import patch
+from app.services.file_manager import save_to_file, setup_results_dir, CsvWriterSession
+from app.config.settings import Settings
 from app.services.price_analysis import PriceAnalysis
 
 @pytest.fixture
@@ -155,4 +158,152 @@ def test_save_to_file_with_analysis(test_data, test_keyword, create_file_name):
         assert rows[-2] == ['中央値', '¥70,000']
         assert rows[-1] == ['取得商品数', '4件']
     
-    print("test_save_to_file_with_analysis_success") 
\ No newline at end of file
+    print("test_save_to_file_with_analysis_success")
+
+@pytest.mark.asyncio
+async def test_writer_session_buffers_and_flushes(test_data, test_keyword, create_file_name):
+    """セッションが行をためて、しきい値に達したときだけ書き込むテスト"""
+    print("test_writer_session_buffers_and_flushes")
+    settings = Settings()
+    settings.csv_flush_rows = 3
+    settings.csv_flush_on_page = False
+    filename = f"session_{create_file_name}"
+    test_file = setup_results_dir() / filename
+
+    session = CsvWriterSession(filename, test_keyword, settings)
+    with patch('app.services.file_manager.os.fsync') as mock_fsync:
+        await session.append_items(test_data)
+        await session.end_page()
+        # しきい値未満のためファイルはまだ作成されない
+        assert not test_file.exists()
+
+        await session.append_items(test_data)
+        # 書き込み中は一時ファイルにのみ書き込まれる
+        assert session.temp_path.exists()
+        assert not test_file.exists()
+
+        analysis = PriceAnalysis(
+            lowest={"name": "iPhone 12", "price": "80,000"},
+            highest={"name": "iPhone 13", "price": "100,000"},
+            average=90000.0,
+            median=90000.0,
+            total=4
+        )
+        await session.write_analysis(analysis)
+        await session.close()
+        assert mock_fsync.call_count == 1
+        assert test_file.exists()
+        assert not session.temp_path.exists()
+
+    with open(test_file, 'r', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ['検索キーワード', test_keyword]
+    assert rows[3] == ['商品名', '価格']
+    assert rows[4:8] == [['iPhone 13', '100,000'], ['iPhone 12', '80,000']] * 2
+    assert rows[8] == ['=== 価格分析 ===']
+    assert rows[-1] == ['取得商品数', '4件']
+
+    test_file.unlink()
+    print("test_writer_session_buffers_and_flushes_success")
+
+@pytest.mark.asyncio
+async def test_writer_session_flush_on_page(test_data, test_keyword, create_file_name):
+    """ページの区切りごとに書き込む設定のテスト"""
+    settings = Settings()
+    settings.csv_flush_rows = 1000
+    settings.csv_flush_on_page = True
+    filename = f"page_{create_file_name}"
+
+    async with CsvWriterSession(filename, test_keyword, settings) as session:
+        await session.append_items(test_data)
+        await session.end_page()
+        with open(session.temp_path, 'r', encoding='utf-8') as f:
+            assert len(list(csv.reader(f))) == 6
+
+    session.filepath.unlink()
+
+@pytest.mark.asyncio
+async def test_writer_session_without_items(test_keyword, create_file_name):
+    """商品が無い場合はファイルを作成しないテスト"""
+    filename = f"empty_{create_file_name}"
+    async with CsvWriterSession(filename, test_keyword) as session:
+        await session.append_items([])
+    assert not (setup_results_dir() / filename).exists()
+
+@pytest.mark.asyncio
+async def test_writer_session_discards_on_error(test_data, test_keyword, create_file_name):
+    """例外で終了した場合にファイルが公開されないテスト"""
+    filename = f"error_{create_file_name}"
+    with pytest.raises(RuntimeError):
+        async with CsvWriterSession(filename, test_keyword) as session:
+            await session.append_items(test_data)
+            await session.flush()
+            raise RuntimeError("scrape failed")
+
+    assert not session.temp_path.exists()
+    assert not (setup_results_dir() / filename).exists()
+
+@pytest.mark.asyncio
+async def test_writer_session_extra_formats(test_data, test_keyword, create_file_name):
+    """CSVに加えてgzip圧縮CSVとNDJSONを整数の価格で書き込むテスト"""
+    print("test_writer_session_extra_formats")
+    import gzip
+    import json
+    settings = Settings()
+    settings.result_formats = ["csv.gz", "ndjson", "unknown"]
+    filename = f"formats_{create_file_name}"
+
+    async with CsvWriterSession(filename, test_keyword, settings) as session:
+        await session.append_items(test_data + [{"name": "ジャンク", "price": "不明"}])
+    paths = session.filepaths
+    assert set(paths) == {"csv", "csv.gz", "ndjson"}
+    assert paths["csv.gz"].name == filename[:-len(".csv")] + ".csv.gz"
+
+    with gzip.open(paths["csv.gz"], 'rt', encoding='utf-8', newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows == [['name', 'price'], ['iPhone 13', '100000'], ['iPhone 12', '80000'], ['ジャンク', '']]
+
+    with open(paths["ndjson"], 'r', encoding='utf-8') as f:
+        records = [json.loads(line) for line in f]
+    assert records[0] == {"name": "iPhone 13", "price": 100000}
+    assert records[2] == {"name": "ジャンク", "price": None}
+
+    for path in paths.values():
+        assert not Path(f"{path}.part").exists()
+        path.unlink()
+    print("test_writer_session_extra_formats_success")
+
+@pytest.mark.asyncio
+async def test_writer_session_publishes_all_formats_or_none(test_data, test_keyword, create_file_name):
+    """1つの形式の確定に失敗した場合に、どの形式のファイルも公開されないテスト"""
+    print("test_writer_session_publishes_all_formats_or_none")
+    from app.services.result_writers import NdjsonResultWriter
+    settings = Settings()
+    settings.result_formats = ["ndjson"]
+    filename = f"partial_{create_file_name}"
+
+    with patch.object(NdjsonResultWriter, "finish", side_effect=OSError("disk full")):
+        with pytest.raises(OSError):
+            async with CsvWriterSession(filename, test_keyword, settings) as session:
+                await session.append_items(test_data)
+
+    for path in session.filepaths.values():
+        assert not path.exists()
+        assert not Path(f"{path}.part").exists()
+    print("test_writer_session_publishes_all_formats_or_none_success")
+
+def test_generate_result_filename():
+    """結果ファイル名が重複せず、作成順に並ぶテスト"""
+    import time
+    from app.services.file_manager import generate_result_filename
+
+    names = [generate_result_filename("iPhone 13 Pro") for _ in range(1000)]
+    assert len(set(names)) == len(names)
+    assert all(name.endswith("_iphone-13-pro.csv") for name in names)
+
+    earlier = generate_result_filename("財布")
+    time.sleep(0.002)
+    later = generate_result_filename("財布")
+    assert earlier < later
+    assert re.match(r'^[\w\-\.]+\.csv$', later)
+
@@ -0,0 +1,55 @@
+import httpx
+import pytest
+from unittest.mock import AsyncMock
+from app.config.settings import Settings
+from app.services.scraper import scrape_items
+from benchmarks.fake_mercari import FakeMercariConfig, FakeMercariServer
+from benchmarks.scrape_throughput import percentile, run_benchmark
+
+@pytest.mark.asyncio
+async def test_scrape_items_against_fake_server():
+    """疑似サーバーの全ページをHTTPでスクレイピングできるテスト"""
+    print("test_scrape_items_against_fake_server")
+    settings = Settings()
+    settings.fetch_backend = "http"
+    settings.politeness_delay = 0
+
+    with FakeMercariServer(FakeMercariConfig(items_per_page=20, pages=3)) as server:
+        server.configure(settings)
+        items = await scrape_items("iPhone", "fake.csv", None, settings, writer=AsyncMock())
+        requests_by_page = dict(server.requests_by_page)
+
+    assert len(items) == 60
+    assert items[0]["name"] == "iPhone 商品 1-1"
+    assert items[-1]["name"] == "iPhone 商品 3-20"
+    assert requests_by_page == {1: 1, 2: 1, 3: 1}
+    print("test_scrape_items_against_fake_server_success")
+
+def test_fake_server_lazy_loading_and_pages():
+    """遅延読み込みの商品がHTMLに含まれず、最終ページに次ページボタンが無いテスト"""
+    config = FakeMercariConfig(items_per_page=10, pages=2, lazy_initial_items=4)
+    with FakeMercariServer(config) as server:
+        first = httpx.get(f"{server.base_url}/search?keyword=iPhone").text
+        last = httpx.get(f"{server.base_url}/search?keyword=iPhone&page_token=v1%3A1").text
+        missing = httpx.get(f"{server.base_url}/favicon.ico")
+
+    assert first.count('<li data-testid="item-cell"') == 4
+    assert 'pagination-next-button' in first
+    assert 'pagination-next-button' not in last
+    assert missing.status_code == 404
+
+@pytest.mark.asyncio
+async def test_run_benchmark_report():
+    """ベンチマークの結果に実行ごとの計測値と中央値が含まれるテスト"""
+    print("test_run_benchmark_report")
+    settings = Settings()
+    settings.politeness_delay = 0
+    report = await run_benchmark(FakeMercariConfig(items_per_page=10, pages=2), "http", runs=2, settings=settings)
+
+    assert [run["pages"] for run in report["runs"]] == [2, 2]
+    assert [run["items"] for run in report["runs"]] == [20, 20]
+    assert report["summary"]["pages_per_second"] > 0
+    assert report["server"]["pages"] == 2
+    assert percentile([5, 1, 4, 2, 3], 50) == 3
+    assert percentile([5, 1, 4, 2, 3], 95) == 5
+    print("test_run_benchmark_report_success")
@@ -0,0 +1,82 @@
+import asyncio
+import time
+import pytest
+from datetime import datetime
+from unittest.mock import patch
+from app.services.file_manager import (
+    CsvWriterSession, cleanup_files_async, save_to_file_async, setup_results_dir, stat_file_async
+)
+from app.config.settings import Settings
+
+class LoopBlockingMonitor:
+    """イベントループが止まっていた最大時間を計測する"""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, loop.time() - start - self.interval)
+
+    async def __aenter__(self):
+        self._task = asyncio.create_task(self._run())
+        await asyncio.sleep(0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+def slow_fsync(fd):
+    """遅いディスクを模したfsync"""
+    time.sleep(0.2)
+
+@pytest.mark.asyncio
+async def test_multi_page_scrape_does_not_block_event_loop():
+    """複数ページの保存中にイベントループが止まらないテスト"""
+    print("test_multi_page_scrape_does_not_block_event_loop")
+    settings = Settings()
+    settings.csv_flush_on_page = True
+    filename = f"loop_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv"
+    pages = [
+        [{"name": f"商品{page}-{i}", "price": f"{i * 100:,}"} for i in range(2000)]
+        for page in range(5)
+    ]
+
+    with patch('app.services.file_manager.os.fsync', side_effect=slow_fsync):
+        async with LoopBlockingMonitor() as monitor:
+            await cleanup_files_async()
+            async with CsvWriterSession(filename, "iphone", settings) as session:
+                for page in pages:
+                    # ページの読み込みを模した待機
+                    await asyncio.sleep(0.01)
+                    await session.append_items(page)
+                    await session.end_page()
+
+    print(f"イベントループの最大停止時間: {monitor.max_lag * 1000:.1f}ms")
+    # fsyncの0.2秒を含め、ファイル操作でループが止まっていない
+    assert monitor.max_lag < 0.1
+
+    file_stat = await stat_file_async(setup_results_dir() / filename)
+    assert file_stat is not None and file_stat.st_size > 0
+    (setup_results_dir() / filename).unlink()
+
+    print("test_multi_page_scrape_does_not_block_event_loop_success")
+
+@pytest.mark.asyncio
+async def test_async_file_api_semantics():
+    """非同期版のAPIが同期版と同じ結果になるテスト"""
+    filename = f"async_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv"
+    data = [{"name": "iPhone 13", "price": "100,000"}]
+    await save_to_file_async(data, "iphone", filename, is_first_page=True)
+
+    path = setup_results_dir() / filename
+    with open(path, 'r', encoding='utf-8') as f:
+        assert "iPhone 13,\"100,000\"" in f.read()
+    assert await stat_file_async(setup_results_dir() / "missing.csv") is None
+    path.unlink()
@@ -0,0 +1,120 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import items
+from app.services.file_transfer import (
+    RangeNotSatisfiableError, accepts_gzip, http_date, is_not_modified, make_etag, parse_range
+)
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """一時ディレクトリを結果ディレクトリとするテスト用クライアント"""
+    monkeypatch.setattr(items.settings, "results_dir", str(tmp_path))
+    monkeypatch.setattr(items.settings, "download_chunk_size", 1000)
+    monkeypatch.setattr(items.get_result_index(), "loaded", False)
+    app = FastAPI()
+    app.include_router(items.router, prefix="/api/v1")
+    content = "".join(f"商品{i},{i * 100}\n" for i in range(2000)).encode("utf-8")
+    (tmp_path / "large.csv").write_bytes(content)
+    return TestClient(app), content
+
+def test_parse_range():
+    """Rangeヘッダーの解析テスト"""
+    print("test_parse_range")
+    assert parse_range("bytes=0-99", 1000) == (0, 99)
+    assert parse_range("bytes=900-", 1000) == (900, 999)
+    assert parse_range("bytes=-100", 1000) == (900, 999)
+    assert parse_range("bytes=500-5000", 1000) == (500, 999)
+    # 複数範囲や解釈できない指定はファイル全体
+    assert parse_range("bytes=0-1,5-6", 1000) is None
+    assert parse_range("items=0-1", 1000) is None
+    assert parse_range(None, 1000) is None
+    with pytest.raises(RangeNotSatisfiableError):
+        parse_range("bytes=1000-", 1000)
+    print("test_parse_range_success")
+
+def test_conditional_helpers():
+    """ETag・If-Modified-Since・Accept-Encodingの判定テスト"""
+    etag = make_etag(100, 1700000000.5)
+    assert is_not_modified(etag, 1700000000.5, etag, None)
+    assert is_not_modified(etag, 1700000000.5, f'"other", W/{etag}', None)
+    assert not is_not_modified(etag, 1700000000.5, '"other"', http_date(1700000000.5))
+    assert is_not_modified(etag, 1700000000.5, None, http_date(1700000000))
+    assert not is_not_modified(etag, 1700000000.5, None, http_date(1699999999))
+    assert accepts_gzip("br, gzip;q=0.8")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip(None)
+
+def test_download_range_and_resume(client):
+    """Rangeリクエストで途中から再開してダウンロードできるテスト"""
+    print("test_download_range_and_resume")
+    client, content = client
+    response = client.get("/api/v1/download/large.csv", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.content == content
+    assert response.headers["accept-ranges"] == "bytes"
+    etag = response.headers["etag"]
+
+    first = client.get("/api/v1/download/large.csv", headers={"Range": "bytes=0-4999"})
+    assert first.status_code == 206
+    assert first.headers["content-range"] == f"bytes 0-4999/{len(content)}"
+    rest = client.get("/api/v1/download/large.csv", headers={"Range": "bytes=5000-", "If-Range": etag})
+    assert rest.status_code == 206
+    assert first.content + rest.content == content
+
+    # 範囲外の指定
+    response = client.get("/api/v1/download/large.csv", headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == 416
+    print("test_download_range_and_resume_success")
+
+def test_download_not_modified_and_gzip(client):
+    """304応答とgzip圧縮のテスト"""
+    print("test_download_not_modified_and_gzip")
+    client, content = client
+    response = client.get("/api/v1/download/large.csv", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == content
+    assert response.headers["etag"].endswith('-gzip"')
+
+    cached = client.get(
+        "/api/v1/download/large.csv",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]}
+    )
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    response = client.get(
+        "/api/v1/download/large.csv",
+        headers={"Accept-Encoding": "identity", "If-Modified-Since": response.headers["last-modified"]}
+    )
+    assert response.status_code == 304
+
+    assert client.get("/api/v1/download/missing.csv").status_code == 404
+    print("test_download_not_modified_and_gzip_success")
+
+def test_download_falls_back_to_disk_on_index_miss(client, monkeypatch):
+    """索引に無いファイル（他のワーカーが書き込んだファイル）もディスクを確認して返すテスト"""
+    print("test_download_falls_back_to_disk_on_index_miss")
+    client, content = client
+    monkeypatch.setattr(items.get_result_index(), "loaded", True)
+    assert items.get_result_index().get("large.csv") is None
+
+    response = client.get("/api/v1/download/large.csv", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200
+    assert response.content == content
+    assert client.get("/api/v1/download/missing.csv").status_code == 404
+    print("test_download_falls_back_to_disk_on_index_miss_success")
+
+def test_download_evicts_stale_index_entry(client, monkeypatch):
+    """索引に残っていても削除されたファイルは404を返し、索引から取り除くテスト"""
+    print("test_download_evicts_stale_index_entry")
+    client, _ = client
+    index = items.get_result_index()
+    monkeypatch.setattr(index, "loaded", True)
+    index.record("deleted.csv", 100, 1700000000.0)
+
+    response = client.get("/api/v1/download/deleted.csv")
+    assert response.status_code == 404
+    assert index.get("deleted.csv") is None
+    print("test_download_evicts_stale_index_entry_success")
@@ -0,0 +1,146 @@
+import httpx
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.config.settings import Settings
+from app.models.exceptions import FastPathError
+from app.services.http_fetcher import extract_rows_from_html, validate_rows
+from app.services.scraper import item_field_selectors, scrape_items
+
+def create_search_html(page_number, has_next, with_price=True):
+    """メルカリの検索結果と同じ構造のHTMLを作成する"""
+    cells = "".join(
+        f"""<li data-testid="item-cell"><a href="/item/m{page_number}{i}">
+        <span data-testid="thumbnail-item-name">商品{page_number}-{i}</span>
+        {'<span class="number__6b270ca7">1,000</span>' if with_price else ''}</a></li>"""
+        for i in range(2)
+    )
+    next_button = '<div data-testid="pagination-next-button"><a>次へ</a></div>' if has_next else ""
+    return f"<html><body><ul>{cells}</ul>{next_button}<script>var x = '<li>';</script></body></html>"
+
+def test_extract_rows_with_selectors():
+    """結合子・属性セレクタを含むセレクタで商品名・価格・リンク先を取り出すテスト"""
+    print("test_extract_rows_with_selectors")
+    html = create_search_html(1, True)
+    rows, has_next = extract_rows_from_html(
+        html,
+        {"name": "a > span[data-testid='thumbnail-item-name']", "price": "span[class*='number__']"},
+        "ul > li[data-testid='item-cell']",
+        "div[data-testid='pagination-next-button'] a",
+        links={"url": "a[href^='/item/m1']"}
+    )
+    assert rows == [
+        {"name": "商品1-0", "price": "1,000", "url": "/item/m10"},
+        {"name": "商品1-1", "price": "1,000", "url": "/item/m11"}
+    ]
+    assert has_next is True
+    # scriptの中の文字列は要素として扱わない
+    rows, _ = extract_rows_from_html(html, {"name": "span"}, "li", "div.none")
+    assert len(rows) == 2
+
+    with pytest.raises(FastPathError):
+        extract_rows_from_html(html, {}, "ul >>> li", "div")
+    print("test_extract_rows_with_selectors_success")
+
+def test_extract_and_validate_rows():
+    """HTMLから取り出した行の妥当性を確認するテスト"""
+    print("test_extract_and_validate_rows")
+    settings = Settings()
+    fields = item_field_selectors(settings)
+    rows, has_next = extract_rows_from_html(
+        create_search_html(2, False), fields, settings.item_cell_selector, settings.next_button_selector
+    )
+    assert rows == [{"name": "商品2-0", "price": "1,000"}, {"name": "商品2-1", "price": "1,000"}]
+    assert has_next is False
+    validate_rows(rows, settings)
+
+    # 価格がJavaScriptで描画されるページ（HTMLに価格が無い）は失敗とする
+    rows, _ = extract_rows_from_html(
+        create_search_html(1, True, with_price=False), fields, settings.item_cell_selector, settings.next_button_selector
+    )
+    with pytest.raises(FastPathError):
+        validate_rows(rows, settings)
+    with pytest.raises(FastPathError):
+        validate_rows([], settings)
+    print("test_extract_and_validate_rows_success")
+
+def create_browser_context(pages_loaded):
+    """URLごとに決まった商品を返すモックのコンテキストを作成する"""
+    def new_page():
+        page = AsyncMock()
+        info = {}
+
+        async def goto(url):
+            info["number"] = int(url.rsplit("%3A", 1)[1]) + 1 if "page_token" in url else 1
+            pages_loaded.append(info["number"])
+
+        async def eval_rows(*args):
+            return [{"name": f"商品{info['number']}-{i}", "price": "1,000"} for i in range(2)]
+
+        async def query_selector(selector):
+            return object() if info["number"] < 4 else None
+
+        page.goto.side_effect = goto
+        page.eval_on_selector_all.side_effect = eval_rows
+        page.query_selector.side_effect = query_selector
+        return page
+
+    context = MagicMock()
+    context.new_page = AsyncMock(side_effect=lambda: new_page())
+    return context
+
+@pytest.mark.asyncio
+async def test_auto_backend_falls_back_to_browser():
+    """HTMLから読み取れなくなったページからブラウザでの取得に切り替えるテスト"""
+    print("test_auto_backend_falls_back_to_browser")
+    settings = Settings()
+    settings.fetch_backend = "auto"
+    settings.politeness_delay = 0
+    settings.scroll_mode = "fixed"
+    settings.min_wait_time = settings.max_wait_time = 0
+    requested = []
+
+    def handler(request):
+        url = str(request.url)
+        number = int(url.rsplit("%3A", 1)[1]) + 1 if "page_token" in url else 1
+        requested.append(number)
+        # 3ページ目だけ価格が描画されていない
+        html = create_search_html(number, number < 4, with_price=number != 3)
+        return httpx.Response(200, html=html)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    pages_loaded = []
+    context = create_browser_context(pages_loaded)
+
+    @asynccontextmanager
+    async def mock_borrow_context():
+        yield context
+
+    with patch('app.services.scraper.get_http_client', return_value=client), \
+            patch('app.services.scraper.borrow_context', mock_borrow_context), \
+            patch('app.services.scraper.load_all_items', AsyncMock()):
+        items = await scrape_items("iPhone", "fallback.csv", None, settings, writer=AsyncMock())
+    await client.aclose()
+
+    assert [item["name"] for item in items] == [f"商品{n}-{i}" for n in range(1, 5) for i in range(2)]
+    assert requested == [1, 2, 3]
+    # ブラウザでは失敗したページから取得する（URLでのページ送りは先のページを先読みする）
+    assert min(pages_loaded) == 3
+    print("test_auto_backend_falls_back_to_browser_success")
+
+@pytest.mark.asyncio
+async def test_http_backend_does_not_fall_back():
+    """httpの場合はブラウザに切り替えずに失敗とするテスト"""
+    settings = Settings()
+    settings.fetch_backend = "http"
+    settings.politeness_delay = 0
+    client = httpx.AsyncClient(transport=httpx.MockTransport(lambda request: httpx.Response(503)))
+    borrow = MagicMock()
+
+    with patch('app.services.scraper.get_http_client', return_value=client), \
+            patch('app.services.scraper.borrow_context', borrow):
+        items = await scrape_items("iPhone", "http_only.csv", None, settings, writer=AsyncMock())
+    await client.aclose()
+
+    assert items == []
+    borrow.assert_not_called()
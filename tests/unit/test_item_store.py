@@ -0,0 +1,184 @@
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import items as items_api
+from app.api import store as store_api
+from app.config.settings import Settings
+from app.services import file_manager, scraper_service
+from app.services.item_store import ItemStore
+from app.services.pipeline import CollectSink, RawPage, ScrapedPage
+from app.services.scraper import parse_item_id, parse_pages, stop_at_known_pages
+from benchmarks.fake_mercari import FakeMercariConfig, FakeMercariServer
+
+def item(item_id, price, name=None):
+    return {"name": name or f"商品{item_id}", "price": price, "item_id": item_id}
+
+def test_upsert_dedupes_and_records_price_history(tmp_path):
+    """商品IDごとに保存し、重複を除いて価格が変わったときだけ価格履歴を記録するテスト"""
+    print("test_upsert_dedupes_and_records_price_history")
+    store = ItemStore(tmp_path / "items.db")
+    try:
+        first = store.start_scrape("iPhone", "first.csv")
+        result = store.upsert_items(first, "iPhone", [item("m1", "1,000"), item("m2", "2,000"), {"name": "ID無し", "price": "500"}])
+        assert (result.stored, result.new_items, result.price_changes) == (2, 2, 0)
+        # ページ送りの間にずれて再び現れた商品は追加しない
+        result = store.upsert_items(first, "iPhone", [item("m2", "2,000"), item("m3", "3,000")])
+        assert (result.stored, result.new_items, result.price_changes) == (2, 1, 0)
+        store.finish_scrape(first)
+
+        second = store.start_scrape("iPhone", "second.csv")
+        result = store.upsert_items(second, "iPhone", [item("m3", "3,000"), item("m1", "900")])
+        assert (result.new_items, result.price_changes) == (0, 1)
+        store.finish_scrape(second)
+
+        assert [i["item_id"] for i in store.scrape_items(first)] == ["m1", "m2", "m3"]
+        assert store.get_scrape(first)["item_count"] == 3
+        latest = store.latest_scrape("iPhone")
+        assert latest["scrape_id"] == second
+        assert store.scrape_items(second) == [item("m3", "3,000"), item("m1", "900")]
+        assert [h["price"] for h in store.price_history("m1")] == [1000, 900]
+        assert store.known_item_ids("iPhone", ["m1", "m9"]) == {"m1"}
+        assert store.known_item_ids("iPad", ["m1"]) == set()
+        assert store.find_scrape_by_filename("first.csv")["scrape_id"] == first
+        assert store._connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        store.close()
+    print("test_upsert_dedupes_and_records_price_history_success")
+
+@pytest.mark.asyncio
+async def test_parse_pages_dedupes_item_ids():
+    """商品リンクから商品IDを取り出し、前のページと重複する商品を除くテスト"""
+    print("test_parse_pages_dedupes_item_ids")
+    assert parse_item_id("/item/m12345678901") == "m12345678901"
+    assert parse_item_id("https://jp.mercari.com/shops/product/2Xa9bC") == "2Xa9bC"
+    assert parse_item_id("/search?keyword=iPhone") is None
+
+    async def raw_pages():
+        yield RawPage(1, [{"name": "A", "price": "1,000", "url": "/item/m1"}, {"name": "B", "price": "2,000", "url": "/item/m2"}])
+        yield RawPage(2, [{"name": "B", "price": "2,000", "url": "/item/m2"}, {"name": "C", "price": "3,000", "url": None}])
+
+    pages = [page async for page in parse_pages(raw_pages(), Settings())]
+    assert pages[0].items == [item("m1", "1,000", "A"), item("m2", "2,000", "B")]
+    assert pages[1].items == [{"name": "C", "price": "3,000"}]
+    print("test_parse_pages_dedupes_item_ids_success")
+
+@pytest.fixture
+def stored_client(tmp_path, monkeypatch):
+    """検索結果を1件保存したデータベースと一時ディレクトリの結果ディレクトリを使うテスト用クライアント"""
+    store = ItemStore(tmp_path / "items.db")
+    scrape_id = store.start_scrape("iPhone", "01TESTRESTORE_iphone.csv")
+    store.upsert_items(scrape_id, "iPhone", [item("m1", "1,000"), item("m2", "3,000")])
+    store.finish_scrape(scrape_id)
+    results_dir = tmp_path / "results"
+    results_dir.mkdir()
+    monkeypatch.setattr(scraper_service, "get_item_store", lambda: store)
+    monkeypatch.setattr(items_api.settings, "results_dir", str(results_dir))
+    monkeypatch.setattr(file_manager, "setup_results_dir", lambda: results_dir)
+    monkeypatch.setattr(items_api.get_result_index(), "loaded", False)
+    app = FastAPI()
+    app.include_router(items_api.router, prefix="/api/v1")
+    app.include_router(store_api.router, prefix="/api/v1")
+    yield TestClient(app), store, results_dir
+    items_api.get_result_index().remove("01TESTRESTORE_iphone.csv")
+    store.close()
+
+def test_stored_results_api(stored_client):
+    """スクレイピングせずに前回の検索結果・価格分析・価格履歴を返すテスト"""
+    print("test_stored_results_api")
+    stored_client, _, _ = stored_client
+    response = stored_client.get("/api/v1/items", params={"keyword": "iPhone"})
+    assert response.status_code == 200
+    body = response.json()
+    assert [i["item_id"] for i in body["items"]] == ["m1", "m2"]
+    assert body["analysis"]["total_items"] == 2
+    assert body["filename"] == "01TESTRESTORE_iphone.csv"
+
+    assert stored_client.get("/api/v1/items", params={"keyword": "iPad"}).status_code == 404
+    history = stored_client.get("/api/v1/items/m2").json()
+    assert history["price"] == "3,000"
+    assert [h["price"] for h in history["price_history"]] == [3000]
+    assert stored_client.get("/api/v1/items/unknown").status_code == 404
+    print("test_stored_results_api_success")
+
+def test_download_restores_deleted_file(stored_client):
+    """削除された結果ファイルを商品データベースから作り直してダウンロードできるテスト"""
+    print("test_download_restores_deleted_file")
+    stored_client, store, results_dir = stored_client
+    path = results_dir / "01TESTRESTORE_iphone.csv"
+    assert not path.exists()
+
+    # 後の検索で価格が変わっても、作り直すファイルは検索が終了した時点の価格になる
+    later = store.start_scrape("iPhone", "01TESTLATER_iphone.csv")
+    store.upsert_items(later, "iPhone", [item("m1", "800")])
+    store.finish_scrape(later)
+
+    response = stored_client.get("/api/v1/download/01TESTRESTORE_iphone.csv")
+    assert response.status_code == 200
+    assert path.exists()
+    text = response.content.decode("utf-8")
+    assert "商品m1,\"1,000\"" in text
+    assert "商品m2,\"3,000\"" in text
+    assert stored_client.get("/api/v1/download/01UNKNOWN_iphone.csv").status_code == 404
+    print("test_download_restores_deleted_file_success")
+
+@pytest.mark.asyncio
+async def test_stop_at_known_pages():
+    """既知の商品を除き、すべての商品が既知のページで終了するテスト"""
+    print("test_stop_at_known_pages")
+    fetched = []
+
+    async def pages():
+        for number, ids in enumerate([["m1", "m2"], ["m3", "m9"], ["m8", "m9"], ["m10"]], start=1):
+            fetched.append(number)
+            yield ScrapedPage(number, [item(item_id, "1,000") for item_id in ids])
+
+    async def known_ids(item_ids):
+        return {item_id for item_id in item_ids if item_id in {"m8", "m9"}}
+
+    # 出力先には既知の商品を除く前のページ（終了したページを含む）が渡される
+    unfiltered = CollectSink()
+    result = [page async for page in stop_at_known_pages(pages(), known_ids, [unfiltered])]
+    assert [[i["item_id"] for i in page.items] for page in result] == [["m1", "m2"], ["m3"]]
+    assert [i["item_id"] for i in unfiltered.items] == ["m1", "m2", "m3", "m9", "m8", "m9"]
+    assert fetched == [1, 2, 3]
+    print("test_stop_at_known_pages_success")
+
+@pytest.mark.asyncio
+async def test_incremental_scrape_merges_previous_result(tmp_path, monkeypatch):
+    """差分取得では既知の商品だけのページで終了し、前回の結果と統合するテスト"""
+    print("test_incremental_scrape_merges_previous_result")
+    store = ItemStore(tmp_path / "items.db")
+    settings = Settings()
+    settings.fetch_backend = "http"
+    settings.result_cache_enabled = False
+    monkeypatch.setattr(scraper_service, "get_item_store", lambda: store)
+    monkeypatch.setattr(scraper_service, "get_settings", lambda: settings)
+    config = FakeMercariConfig(items_per_page=5, pages=6)
+    try:
+        # 前回の検索では2ページ目以降の商品と、期限より前から見つかっていない（売れた）商品があった
+        previous = store.start_scrape("iPhone", "previous.csv")
+        older = [item(f"m{page:04d}{index:05d}", "1,000") for page in (2, 3) for index in range(5)]
+        store.upsert_items(previous, "iPhone", older)
+        store.upsert_items(previous, "iPhone", [item("m_sold", "500")],
+                           observed_at=time.time() - settings.incremental_merge_max_age - 60)
+        store.finish_scrape(previous)
+
+        with FakeMercariServer(config) as server:
+            server.configure(settings)
+            result = await scraper_service.scrape_and_analyze("iPhone", incremental=True)
+            assert max(server.requests_by_page) < config.pages
+
+        assert result["new_items"] == 5
+        assert result["analysis"]["total_items"] == 15
+        latest = store.latest_scrape("iPhone")
+        merged = store.scrape_items(latest["scrape_id"])
+        assert [i["item_id"] for i in merged[:5]] == [f"m0001{index:05d}" for index in range(5)]
+        assert [i["item_id"] for i in merged[5:]] == [i["item_id"] for i in older]
+        # 終了したページの既知の商品も保存され、最新の価格で統合される
+        assert merged[5]["price"] != "1,000"
+        assert len(store.price_history(merged[5]["item_id"])) == 2
+        assert merged[10]["price"] == "1,000"
+    finally:
+        store.close()
+    print("test_incremental_scrape_merges_previous_result_success")
@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+from app.services.job_manager import JobManager
+from app.config.settings import Settings
+from app.models.job import JobStatus
+from app.models.exceptions import JobManagerNotStartedError, JobNotFoundError, JobQueueFullError
+
+@pytest.fixture
+def job_settings():
+    settings = Settings()
+    settings.job_max_concurrency = 2
+    settings.job_queue_size = 10
+    return settings
+
+async def wait_until(predicate, timeout=2.0):
+    """条件を満たすまで待機する"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "タイムアウトしました"
+        await asyncio.sleep(0.01)
+
+@pytest.mark.asyncio
+async def test_job_succeeds_with_progress(job_settings):
+    """ジョブが進捗を報告しながら完了するテスト"""
+    print("test_job_succeeds_with_progress")
+
+    async def runner(keyword, progress_callback=None):
+        progress_callback(1, [{"name": "商品1", "price": "1,000"}])
+        progress_callback(2, [{"name": "商品2", "price": "2,000"}])
+        return {"analysis": {"total_items": 2}, "error": None, "filename": "result.csv"}
+
+    manager = JobManager(job_settings, runner=runner)
+    await manager.start()
+    job = manager.submit("iPhone")
+    assert job.status == JobStatus.QUEUED
+
+    await wait_until(lambda: job.status.is_finished)
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.pages_done == 2
+    assert job.items_so_far == 2
+    assert job.result["filename"] == "result.csv"
+
+    await manager.stop()
+    print("test_job_succeeds_with_progress_success")
+
+@pytest.mark.asyncio
+async def test_job_concurrency_limit(job_settings):
+    """同時に実行されるジョブ数が上限を超えないテスト"""
+    print("test_job_concurrency_limit")
+    state = {"active": 0, "max_active": 0}
+
+    async def runner(keyword, progress_callback=None):
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        await asyncio.sleep(0.02)
+        state["active"] -= 1
+        return {"analysis": {}, "error": None, "filename": None}
+
+    manager = JobManager(job_settings, runner=runner)
+    await manager.start()
+    jobs = [manager.submit(f"keyword{i}") for i in range(6)]
+
+    await wait_until(lambda: all(job.status.is_finished for job in jobs))
+    assert state["max_active"] == job_settings.job_max_concurrency
+
+    await manager.stop()
+    print("test_job_concurrency_limit_success")
+
+@pytest.mark.asyncio
+async def test_job_cancel_running(job_settings):
+    """実行中のジョブをキャンセルするテスト"""
+    print("test_job_cancel_running")
+    started = asyncio.Event()
+
+    async def runner(keyword, progress_callback=None):
+        started.set()
+        await asyncio.sleep(10)
+
+    manager = JobManager(job_settings, runner=runner)
+    await manager.start()
+    job = manager.submit("iPhone")
+    await started.wait()
+
+    manager.cancel(job.id)
+    await wait_until(lambda: job.id not in manager._tasks)
+    assert job.status == JobStatus.CANCELLED
+
+    await manager.stop()
+    print("test_job_cancel_running_success")
+
+@pytest.mark.asyncio
+async def test_job_failure_and_errors(job_settings):
+    """失敗したジョブと存在しないジョブ・起動前のテスト"""
+    async def runner(keyword, progress_callback=None):
+        raise ValueError("scrape failed")
+
+    manager = JobManager(job_settings, runner=runner)
+    with pytest.raises(JobManagerNotStartedError):
+        manager.submit("iPhone")
+
+    await manager.start()
+    job = manager.submit("iPhone")
+    await wait_until(lambda: job.status.is_finished)
+    assert job.status == JobStatus.FAILED
+    assert job.error == "scrape failed"
+
+    with pytest.raises(JobNotFoundError):
+        manager.get("unknown")
+
+    await manager.stop()
+
+@pytest.mark.asyncio
+async def test_job_queue_full(job_settings):
+    """ワーカーが実行中でキューも満杯の場合は受け付けないテスト"""
+    print("test_job_queue_full")
+    release = asyncio.Event()
+
+    async def runner(keyword, progress_callback=None):
+        await release.wait()
+        return {"analysis": None, "error": None, "filename": None}
+
+    job_settings.job_max_concurrency = 1
+    job_settings.job_queue_size = 1
+    manager = JobManager(job_settings, runner=runner)
+    await manager.start()
+    running = manager.submit("iPhone")
+    await wait_until(lambda: running.status == JobStatus.RUNNING)
+    queued = manager.submit("iPad")
+    with pytest.raises(JobQueueFullError):
+        manager.submit("Switch")
+    assert queued.status == JobStatus.QUEUED
+
+    release.set()
+    await wait_until(lambda: queued.status.is_finished)
+    await manager.stop()
+    print("test_job_queue_full_success")
+
+@pytest.mark.asyncio
+async def test_job_progress_from_cached_result(job_settings):
+    """進捗が通知されないキャッシュされた結果でも、ページ数と商品数を記録するテスト"""
+    print("test_job_progress_from_cached_result")
+
+    async def runner(keyword, progress_callback=None):
+        return {"analysis": {"total_items": 5}, "error": None, "filename": "result.csv", "pages": 3}
+
+    manager = JobManager(job_settings, runner=runner)
+    await manager.start()
+    job = manager.submit("iPhone")
+    await wait_until(lambda: job.status.is_finished)
+    assert (job.pages_done, job.items_so_far) == (3, 5)
+    await manager.stop()
+    print("test_job_progress_from_cached_result_success")
@@ -0,0 +1,76 @@
+import pytest
+from fastapi.testclient import TestClient
+from app.config.settings import Settings
+from app.main import app
+from app.services.metrics import Counter, Gauge, Histogram, MetricsRegistry, STAGE_DURATION, SEARCHES_TOTAL
+from app.services.scraper import scrape_items
+from benchmarks.fake_mercari import FakeMercariConfig, FakeMercariServer
+
+def test_registry_renders_prometheus_text():
+    """カウンター・ゲージ・ヒストグラムをPrometheusのテキスト形式で出力するテスト"""
+    print("test_registry_renders_prometheus_text")
+    registry = MetricsRegistry()
+    requests = Counter("requests_total", "リクエスト数", ["route"], registry=registry)
+    in_flight = Gauge("in_flight", "実行中の数", registry=registry)
+    duration = Histogram("duration_seconds", "処理時間", buckets=(0.1, 1.0), registry=registry)
+
+    requests.inc(route='/a"b')
+    requests.inc(2, route='/a"b')
+    with in_flight.track_inprogress():
+        assert in_flight.value() == 1
+    for value in (0.05, 0.1, 0.5, 3):
+        duration.observe(value)
+
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{route="/a\\"b"} 3' in text
+    assert 'in_flight 0' in text
+    # 区切りは累積で、境界の値はその区切りに含まれる
+    assert 'duration_seconds_bucket{le="0.1"} 2' in text
+    assert 'duration_seconds_bucket{le="1"} 3' in text
+    assert 'duration_seconds_bucket{le="+Inf"} 4' in text
+    assert 'duration_seconds_count 4' in text
+    assert 'duration_seconds_sum 3.65' in text
+
+    with pytest.raises(ValueError):
+        requests.inc()
+    with pytest.raises(ValueError):
+        Counter("requests_total", "重複", registry=registry)
+    print("test_registry_renders_prometheus_text_success")
+
+@pytest.mark.asyncio
+async def test_scrape_records_stage_metrics():
+    """スクレイピングで段階ごとの処理時間と検索の件数が記録されるテスト"""
+    print("test_scrape_records_stage_metrics")
+    settings = Settings()
+    settings.fetch_backend = "http"
+    settings.politeness_delay = 0
+    fetches = STAGE_DURATION.count(stage="http_fetch")
+    parses = STAGE_DURATION.count(stage="parse_items")
+    searches = SEARCHES_TOTAL.value(outcome="ok")
+
+    with FakeMercariServer(FakeMercariConfig(items_per_page=5, pages=2)) as server:
+        server.configure(settings)
+        await scrape_items("iPhone", "metrics.csv", None, settings, collect=False)
+
+    assert STAGE_DURATION.count(stage="http_fetch") == fetches + 2
+    assert STAGE_DURATION.count(stage="parse_items") == parses + 2
+    assert STAGE_DURATION.count(stage="csv_write") > 0
+    assert SEARCHES_TOTAL.value(outcome="ok") == searches + 1
+    print("test_scrape_records_stage_metrics_success")
+
+def test_metrics_endpoint():
+    """/metricsでAPIのリクエスト数とルートごとの処理時間を返すテスト"""
+    print("test_metrics_endpoint")
+    client = TestClient(app)
+    client.get("/")
+    client.get("/api/v1/jobs/unknown")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'http_requests_total{method="GET",route="/",status="200"}' in response.text
+    assert 'http_requests_total{method="GET",route="/api/v1/jobs/{job_id}",status="404"}' in response.text
+    assert "browser_pool_contexts_in_use 0" in response.text
+    assert "# TYPE scraper_stage_duration_seconds histogram" in response.text
+    print("test_metrics_endpoint_success")
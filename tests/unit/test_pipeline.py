@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+from app.services.pipeline import (
+    CallbackSink, CollectSink, PageSink, ScrapedPage, buffered, drain_to_sinks
+)
+
+@pytest.mark.asyncio
+async def test_buffered_runs_ahead_up_to_queue_size():
+    """前段が後段を待たずにキューの上限まで先行するテスト"""
+    print("test_buffered_runs_ahead_up_to_queue_size")
+    produced = []
+
+    async def source():
+        for i in range(10):
+            produced.append(i)
+            yield i
+
+    consumed = []
+    async for item in buffered(source(), 2):
+        # 後段が処理している間に前段が先へ進む
+        await asyncio.sleep(0.01)
+        consumed.append(item)
+        # 先行するのはキューの上限と受け渡し中の1件まで
+        assert len(produced) - len(consumed) <= 3
+
+    assert consumed == list(range(10))
+    print("test_buffered_runs_ahead_up_to_queue_size_success")
+
+@pytest.mark.asyncio
+async def test_buffered_propagates_errors_and_cancels():
+    """前段の例外が後段に伝わり、後段の終了時に前段が止まるテスト"""
+    async def failing():
+        yield 1
+        raise ValueError("page failed")
+
+    items = []
+    with pytest.raises(ValueError):
+        async for item in buffered(failing(), 1):
+            items.append(item)
+    assert items == [1]
+
+    closed = asyncio.Event()
+
+    async def endless():
+        try:
+            i = 0
+            while True:
+                yield i
+                i += 1
+        finally:
+            closed.set()
+
+    stream = buffered(endless(), 1)
+    async for item in stream:
+        if item == 3:
+            break
+    await stream.aclose()
+    assert closed.is_set()
+
+@pytest.mark.asyncio
+async def test_drain_to_sinks():
+    """各ページが全ての出力先に順に渡されるテスト"""
+    class RecordingSink(PageSink):
+        def __init__(self):
+            self.numbers = []
+
+        async def on_page(self, page):
+            self.numbers.append(page.number)
+
+    async def pages():
+        for number in range(1, 4):
+            yield ScrapedPage(number=number, items=[{"name": f"商品{number}", "price": "1,000"}])
+
+    progress = []
+    collect = CollectSink()
+    recorder = RecordingSink()
+    count = await drain_to_sinks(pages(), [CallbackSink(lambda n, items: progress.append(n)), collect, recorder])
+
+    assert count == 3
+    assert progress == recorder.numbers == [1, 2, 3]
+    assert [item["name"] for item in collect.items] == ["商品1", "商品2", "商品3"]
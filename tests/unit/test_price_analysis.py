@@ -1,5 +1,9 @@
+import random
 import pytest
-from app.services.price_analysis import analyze_prices, format_price_analysis, format_price_analysis_to_json
+from app.services.price_analysis import (
+    analyze_prices, analyze_prices_vectorized, finalize_analysis, format_price_analysis, format_price_analysis_to_json
+)
+from app.models.price_stats import IncrementalPriceAnalyzer, PriceAnalysis
 
 def test_analyze_prices():
     """価格分析の基本テスト"""
@@ -124,4 +128,114 @@ def test_format_price_analysis_to_json_complete():
     assert "average_price" in result
     assert "median_price" in result
     assert "total_items" in result
-    assert result["total_items"] == 3 
\ No newline at end of file
+    assert result["total_items"] == 3
+
+def test_incremental_analyzer_matches_from_items():
+    """ページごとに追加した分析結果が一括分析と一致するテスト"""
+    rng = random.Random(0)
+    items = []
+    for i in range(501):
+        price = rng.choice([300, 1000, 1000, 2500, 99999]) + rng.randint(0, 50) * 100
+        items.append({"name": f"商品{i}", "price": f"{price:,}"})
+    items.append({"name": "不正", "price": "1,000円"})
+
+    analyzer = IncrementalPriceAnalyzer()
+    for start in range(0, len(items), 120):
+        page = items[start:start + 120]
+        analyzer.add_items(page)
+        # 途中の時点でも一括分析と一致する
+        assert analyzer.snapshot() == PriceAnalysis.from_items(items[:start + len(page)])
+
+def test_incremental_analyzer_ties():
+    """同じ価格の商品がある場合に一括分析と同じ商品を選ぶテスト"""
+    items = [
+        {"name": "最初の最安", "price": "1,000"},
+        {"name": "最初の最高", "price": "5,000"},
+        {"name": "二番目の最安", "price": "1,000"},
+        {"name": "最後の最高", "price": "5,000"}
+    ]
+    analyzer = IncrementalPriceAnalyzer()
+    analyzer.add_items(items)
+    snapshot = analyzer.snapshot()
+    assert snapshot == PriceAnalysis.from_items(items)
+    assert snapshot.lowest["name"] == "最初の最安"
+    assert snapshot.highest["name"] == "最後の最高"
+    assert snapshot.median == 3000
+
+def test_incremental_analyzer_empty():
+    """商品が無い場合のテスト"""
+    analyzer = IncrementalPriceAnalyzer()
+    assert analyzer.add({"name": "不正", "price": "価格なし"}) is False
+    assert analyzer.snapshot() is None
+
+def shared_fields(analysis):
+    """エンジン間で共通の項目を取り出す"""
+    return (analysis.lowest, analysis.highest, analysis.average, analysis.median, analysis.total)
+
+@pytest.mark.parametrize("count", [1, 2, 999, 1000])
+def test_vectorized_analysis_matches_python(count):
+    """列指向のエンジンが共通の項目で従来の結果と一致するテスト"""
+    rng = random.Random(count)
+    items = [
+        {"name": f"商品{i}", "price": f"{rng.choice([500, 1200, 1200, 48000]) + rng.randint(0, 9) * 10:,}"}
+        for i in range(count)
+    ]
+    items += [{"name": "不正1", "price": "1,000円"}, {"name": "不正2", "price": "²"}, {"name": "不正3", "price": None}]
+
+    expected = analyze_prices(items, engine="python")
+    result = analyze_prices_vectorized(items)
+    assert shared_fields(result) == shared_fields(expected)
+    assert type(result.median) is type(expected.median)
+    assert sum(bin["count"] for bin in result.histogram) == result.total
+    assert result.percentiles["p10"] <= result.percentiles["p90"]
+
+def test_analyze_prices_engine_selection():
+    """件数に応じてエンジンが選ばれるテスト"""
+    from app.config.settings import Settings
+    settings = Settings()
+    settings.analysis_engine = "auto"
+    settings.vectorized_analysis_threshold = 3
+    items = [{"name": f"商品{i}", "price": "1,000"} for i in range(3)]
+
+    assert analyze_prices(items[:2], settings=settings).std is None
+    assert analyze_prices(items, settings=settings).std == 0.0
+    assert analyze_prices_vectorized([]) is None
+
+def test_finalize_analysis_adds_distribution_for_large_results():
+    """ページごとに更新した分析でも、件数に応じて列指向のエンジンで分布を算出するテスト"""
+    print("test_finalize_analysis_adds_distribution_for_large_results")
+    from app.config.settings import Settings
+    settings = Settings()
+    settings.analysis_engine = "auto"
+    settings.vectorized_analysis_threshold = 3
+    items = [{"name": f"商品{i}", "price": f"{price:,}"} for i, price in enumerate([1000, 3000, 2000])]
+
+    small = IncrementalPriceAnalyzer()
+    small.add_items(items[:2])
+    assert finalize_analysis(small, settings=settings).std is None
+    assert format_price_analysis_to_json(finalize_analysis(small, settings=settings))["percentiles"] is None
+
+    analyzer = IncrementalPriceAnalyzer()
+    analyzer.add_items(items)
+    result = finalize_analysis(analyzer, settings=settings)
+    expected = analyze_prices_vectorized(items, settings)
+    assert shared_fields(result) == shared_fields(expected)
+    assert (result.std, result.percentiles, result.histogram) == (expected.std, expected.percentiles, expected.histogram)
+    assert format_price_analysis_to_json(result)["histogram"] == expected.histogram
+    print("test_finalize_analysis_adds_distribution_for_large_results_success")
+
+def test_json_keys_do_not_depend_on_engine():
+    """分析エンジンによらずJSONのキーが同じになるテスト"""
+    print("test_json_keys_do_not_depend_on_engine")
+    items = [{"name": f"商品{i}", "price": f"{price:,}"} for i, price in enumerate([1000, 3000, 2000])]
+
+    python_json = format_price_analysis_to_json(analyze_prices(items, engine="python"))
+    vectorized_json = format_price_analysis_to_json(analyze_prices(items, engine="vectorized"))
+    analyzer = IncrementalPriceAnalyzer()
+    analyzer.add_items(items)
+    incremental_json = format_price_analysis_to_json(analyzer.snapshot())
+
+    assert python_json.keys() == vectorized_json.keys() == incremental_json.keys()
+    assert python_json["std_price"] is None
+    assert vectorized_json["std_price"] is not None
+    print("test_json_keys_do_not_depend_on_engine_success")
@@ -0,0 +1,65 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+from app.config.settings import Settings
+from app.services.resource_blocking import ResourcePolicy, install_resource_blocking, report_page_resources
+
+def create_route(page, resource_type, url):
+    """リクエストを持つモックのルートを作成する"""
+    route = MagicMock()
+    route.request.frame.page = page
+    route.request.resource_type = resource_type
+    route.request.url = url
+    route.abort = AsyncMock()
+    route.fallback = AsyncMock()
+    return route
+
+def test_default_policy_keeps_item_grid():
+    """デフォルトのポリシーが商品一覧の描画に必要なリクエストを許可するテスト"""
+    print("test_default_policy_keeps_item_grid")
+    policy = ResourcePolicy(Settings())
+    assert not policy.should_block("document", "https://jp.mercari.com/search?keyword=iPhone")
+    assert not policy.should_block("script", "https://web-jp-assets.mercdn.net/_next/static/chunks/main.js")
+    assert not policy.should_block("fetch", "https://api.mercari.jp/v2/entities:search")
+    assert not policy.should_block("stylesheet", "https://web-jp-assets.mercdn.net/_next/static/css/app.css")
+    assert policy.should_block("image", "https://static.mercdn.net/thumb/item/webp/m1.jpg")
+    assert policy.should_block("font", "https://web-jp-assets.mercdn.net/fonts/a.woff2")
+    assert policy.should_block("script", "https://www.googletagmanager.com/gtm.js?id=GTM-XXXX")
+    print("test_default_policy_keeps_item_grid_success")
+
+def test_allowed_url_patterns_override():
+    """許可するURLのパターンがブロックより優先されるテスト"""
+    settings = Settings()
+    settings.allowed_url_patterns = ["*static.mercdn.net/thumb/*"]
+    policy = ResourcePolicy(settings)
+    assert not policy.should_block("image", "https://static.mercdn.net/thumb/item/webp/m1.jpg")
+    assert policy.should_block("image", "https://static.mercdn.net/banner/top.png")
+
+@pytest.mark.asyncio
+async def test_blocker_counts_per_page():
+    """ページごとにブロック件数と推定削減量を集計するテスト"""
+    print("test_blocker_counts_per_page")
+    settings = Settings()
+    context = MagicMock()
+    context.route = AsyncMock()
+    blocker = await install_resource_blocking(context, settings)
+    context.route.assert_awaited_once_with("**/*", blocker.handle_route)
+
+    page = MagicMock()
+    image = create_route(page, "image", "https://static.mercdn.net/thumb/1.jpg")
+    script = create_route(page, "script", "https://jp.mercari.com/main.js")
+    await blocker.handle_route(image)
+    await blocker.handle_route(script)
+    image.abort.assert_awaited_once()
+    script.fallback.assert_awaited_once()
+
+    stats = report_page_resources(context, page, 1)
+    assert stats.blocked_requests == 1
+    assert stats.allowed_requests == 1
+    assert stats.blocked_by_type == {"image": 1}
+    assert stats.estimated_bytes_saved == settings.blocked_resource_size_estimates["image"]
+    # 取り出した後はリセットされる
+    assert report_page_resources(context, page, 2).blocked_requests == 0
+
+    settings.block_resources = False
+    assert await install_resource_blocking(MagicMock(), settings) is None
+    print("test_blocker_counts_per_page_success")
@@ -0,0 +1,148 @@
+import asyncio
+import pytest
+from app.services.result_cache import ResultCache, normalize_keyword
+from app.config.settings import Settings
+
+@pytest.fixture
+def cache_settings():
+    settings = Settings()
+    settings.result_cache_ttl = 60
+    settings.result_cache_max_entries = 2
+    settings.result_cache_dir = ""
+    return settings
+
+def test_normalize_keyword():
+    """キーワードの正規化テスト"""
+    assert normalize_keyword("  ＩＰｈｏｎｅ　１３  ") == "iphone 13"
+    assert normalize_keyword("iPhone   13") == normalize_keyword("iphone 13")
+
+@pytest.mark.asyncio
+async def test_cache_hit_and_lru_eviction(cache_settings):
+    """キャッシュのヒットとLRUによる削除のテスト"""
+    print("test_cache_hit_and_lru_eviction")
+    cache = ResultCache(cache_settings)
+    await cache.set("a", {"value": 1})
+    await cache.set("b", {"value": 2})
+    assert await cache.get("a") == {"value": 1}
+
+    # 最も使われていない"b"が削除される
+    await cache.set("c", {"value": 3})
+    assert await cache.get("b") is None
+    assert await cache.get("a") == {"value": 1}
+    assert await cache.get("c") == {"value": 3}
+
+    print("test_cache_hit_and_lru_eviction_success")
+
+@pytest.mark.asyncio
+async def test_cache_ttl_expiry(cache_settings):
+    """TTLを過ぎたエントリが返されないテスト"""
+    cache_settings.result_cache_ttl = 0
+    cache = ResultCache(cache_settings)
+    await cache.set("a", {"value": 1})
+    assert await cache.get("a") is None
+
+@pytest.mark.asyncio
+async def test_cache_coalesces_concurrent_requests(cache_settings):
+    """同時に来た同じキーの処理が1回にまとめられるテスト"""
+    print("test_cache_coalesces_concurrent_requests")
+    cache = ResultCache(cache_settings)
+    calls = 0
+
+    async def factory(progress, stats):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"filename": "result.csv"}
+
+    key = cache.make_key("iPhone", max_pages=None)
+    results = await asyncio.gather(*[cache.get_or_create(key, factory) for _ in range(5)])
+    assert calls == 1
+    assert all(result == {"filename": "result.csv"} for result in results)
+
+    # 2回目以降はキャッシュから返される
+    assert await cache.get_or_create(cache.make_key(" iphone ", max_pages=None), factory) == {"filename": "result.csv"}
+    assert calls == 1
+
+    print("test_cache_coalesces_concurrent_requests_success")
+
+@pytest.mark.asyncio
+async def test_cache_fans_out_progress_to_waiters(cache_settings):
+    """実行中の処理を共有するすべての呼び出し元に進捗を送り、途中から待ち始めた場合は最新の集計を1回だけ送るテスト"""
+    print("test_cache_fans_out_progress_to_waiters")
+    cache = ResultCache(cache_settings)
+    first_page_sent = asyncio.Event()
+    release = asyncio.Event()
+
+    async def factory(progress, stats):
+        progress(1, [{"name": "商品1"}])
+        stats(1, 1, "分析1")
+        first_page_sent.set()
+        await release.wait()
+        progress(2, [{"name": "商品2"}, {"name": "商品3"}])
+        stats(2, 3, "分析2")
+        return {"filename": "result.csv"}
+
+    first_pages, second_pages = [], []
+    first_stats, second_stats = [], []
+    first = asyncio.create_task(cache.get_or_create(
+        "a", factory, lambda n, items: first_pages.append((n, len(items))), lambda *args: first_stats.append(args)
+    ))
+    await first_page_sent.wait()
+    second = asyncio.create_task(cache.get_or_create(
+        "a", factory, lambda n, items: second_pages.append((n, len(items))), lambda *args: second_stats.append(args)
+    ))
+    await asyncio.sleep(0)
+    # 途中から待ち始めた呼び出し元には、それまでのページを送らずに最新の集計だけを送る
+    assert second_pages == []
+    assert second_stats == [(1, 1, "分析1")]
+    release.set()
+    await asyncio.gather(first, second)
+
+    assert first_pages == [(1, 1), (2, 2)]
+    assert second_pages == [(2, 2)]
+    assert first_stats == [(1, 1, "分析1"), (2, 3, "分析2")]
+    assert second_stats == [(1, 1, "分析1"), (2, 3, "分析2")]
+    assert not cache._inflight
+    print("test_cache_fans_out_progress_to_waiters_success")
+
+@pytest.mark.asyncio
+async def test_cache_refresh_joins_inflight_and_overwrites(cache_settings):
+    """refreshがキャッシュを読まずに作り直し、実行中の同じ処理には相乗りするテスト"""
+    print("test_cache_refresh_joins_inflight_and_overwrites")
+    cache = ResultCache(cache_settings)
+    key = cache.make_key("iPhone", max_pages=None)
+    await cache.set(key, {"filename": "old.csv"})
+    calls = 0
+
+    async def factory(progress, stats):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"filename": "new.csv"}
+
+    results = await asyncio.gather(cache.refresh(key, factory), cache.refresh(key, factory))
+    assert calls == 1
+    assert results == [{"filename": "new.csv"}, {"filename": "new.csv"}]
+    assert await cache.get(key) == {"filename": "new.csv"}
+    print("test_cache_refresh_joins_inflight_and_overwrites_success")
+
+@pytest.mark.asyncio
+async def test_cache_does_not_store_errors(cache_settings):
+    """例外が発生した結果はキャッシュされないテスト"""
+    cache = ResultCache(cache_settings)
+
+    async def failing(progress, stats):
+        raise ValueError("failed")
+
+    with pytest.raises(ValueError):
+        await cache.get_or_create("a", failing)
+    assert await cache.get("a") is None
+
+@pytest.mark.asyncio
+async def test_cache_disk_backend(cache_settings, tmp_path):
+    """ディスクに保存したキャッシュが別インスタンスから読めるテスト"""
+    cache_settings.result_cache_dir = str(tmp_path)
+    await ResultCache(cache_settings).set("a", {"value": "商品"})
+
+    restarted = ResultCache(cache_settings)
+    assert await restarted.get("a") == {"value": "商品"}
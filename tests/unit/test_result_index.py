@@ -0,0 +1,77 @@
+import time
+from datetime import datetime
+from unittest.mock import patch
+from app.services.result_index import ResultFileIndex
+from app.services.file_manager import save_to_file, setup_results_dir, sweep_results, load_result_index
+from app.config.settings import Settings
+
+def test_index_expires_by_age():
+    """保持期間を過ぎたファイルだけが取り出されるテスト"""
+    index = ResultFileIndex()
+    index.record("old.csv", 100, 1000.0, "iphone")
+    index.record("new.csv", 200, 5000.0, "ipad")
+
+    expired = index.pop_expired(max_age=3600, now=5000.0)
+    assert [entry.name for entry in expired] == ["old.csv"]
+    assert index.get("old.csv") is None
+    assert index.get("new.csv").keyword == "ipad"
+    assert index.total_bytes == 200
+
+def test_index_expires_by_total_bytes():
+    """合計サイズの上限を超えた分が古い順に取り出されるテスト"""
+    index = ResultFileIndex()
+    for i in range(4):
+        index.record(f"{i}.csv", 100, 1000.0 + i)
+
+    expired = index.pop_expired(max_age=3600, max_total_bytes=250, now=1000.0)
+    assert [entry.name for entry in expired] == ["0.csv", "1.csv"]
+    assert index.total_bytes == 200
+
+def test_index_update_moves_entry():
+    """更新されたファイルは新しい更新日時で判定されるテスト"""
+    index = ResultFileIndex()
+    index.record("a.csv", 100, 1000.0)
+    index.record("b.csv", 100, 2000.0)
+    index.record("a.csv", 300, 9000.0)
+
+    expired = index.pop_expired(max_age=3600, now=9000.0)
+    assert [entry.name for entry in expired] == ["b.csv"]
+    assert index.get("a.csv").size == 300
+    assert index.total_bytes == 300
+
+def test_sweep_results_deletes_expired_files():
+    """索引をもとに期限切れのファイルが削除されるテスト"""
+    print("test_sweep_results_deletes_expired_files")
+    filename = f"sweep_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv"
+    save_to_file([{"name": "iPhone 13", "price": "100,000"}], "iphone", filename, is_first_page=True)
+    path = setup_results_dir() / filename
+
+    from app.services.result_index import get_result_index
+    entry = get_result_index().get(filename)
+    assert entry is not None
+    assert entry.keyword == "iphone"
+    assert entry.size == path.stat().st_size
+
+    settings = Settings()
+    settings.result_retention_seconds = 0
+    settings.result_retention_max_bytes = 0
+    with patch('app.services.file_manager.get_settings', return_value=settings):
+        time.sleep(0.01)
+        sweep_results()
+
+    assert not path.exists()
+    assert get_result_index().get(filename) is None
+    print("test_sweep_results_deletes_expired_files_success")
+
+def test_load_result_index_reads_keyword():
+    """起動時の走査でキーワードが索引に登録されるテスト"""
+    filename = f"load_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.csv"
+    save_to_file([{"name": "iPad", "price": "50,000"}], "ipad", filename, is_first_page=True)
+
+    from app.services.result_index import get_result_index
+    get_result_index().remove(filename)
+    load_result_index()
+    assert get_result_index().loaded
+    assert get_result_index().get(filename).keyword == "ipad"
+    get_result_index().loaded = False
+    (setup_results_dir() / filename).unlink()
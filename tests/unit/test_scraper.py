@@ -1,7 +1,9 @@
+import asyncio
 import pytest
+from contextlib import asynccontextmanager
 from datetime import datetime
-from unittest.mock import AsyncMock, patch
-from app.services.scraper import scrape_items, setup_browser, scroll_page
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.services.scraper import scrape_items, host_semaphore, setup_browser, scroll_page, scroll_page_adaptive, load_all_items, extract_rows, rows_to_items
 from app.config.settings import Settings
 
 @pytest.fixture
@@ -41,6 +43,35 @@ async def test_scroll_page():
     
     print("test_scroll_page_success")
 
+@pytest.mark.asyncio
+async def test_scroll_page_adaptive():
+    """適応的スクロールが1回のevaluateで完了するテスト"""
+    print("test_scroll_page_adaptive")
+    settings = Settings()
+    mock_page = AsyncMock()
+    mock_page.evaluate.return_value = 120
+
+    count = await scroll_page_adaptive(mock_page, settings)
+    assert count == 120
+    assert mock_page.evaluate.call_count == 1
+    args = mock_page.evaluate.call_args.args[1]
+    assert args["selector"] == settings.item_cell_selector
+    assert args["maxTime"] == settings.scroll_max_time
+    # 固定時間の待機は行わない
+    assert mock_page.wait_for_timeout.call_count == 0
+
+    print("test_scroll_page_adaptive_success")
+
+@pytest.mark.asyncio
+async def test_load_all_items_fixed_mode():
+    """fixedモードでは従来のスクロールを行うテスト"""
+    settings = Settings()
+    settings.scroll_mode = "fixed"
+    mock_page = AsyncMock()
+
+    await load_all_items(mock_page, settings)
+    assert mock_page.evaluate.call_count == len(settings.scroll_points)
+
 @pytest.mark.asyncio
 async def test_scrape_items_error_handling(create_file_name):
     """エラーハンドリングのテスト"""
@@ -155,4 +186,177 @@ async def test_scrape_items_timeout(create_file_name):
     items = await scrape_items(keyword, filename, max_pages, settings)
     assert len(items) == 0, "タイムアウトが発生しませんでした"
     
-    print("test_scrape_items_timeout_success") 
\ No newline at end of file
+    print("test_scrape_items_timeout_success")
+
+@pytest.mark.asyncio
+async def test_extract_rows_bulk():
+    """一括取得モードで1回の呼び出しで全商品を取得するテスト"""
+    print("test_extract_rows_bulk")
+    settings = Settings()
+    settings.extraction_mode = "evaluate"
+    mock_page = AsyncMock()
+    mock_page.eval_on_selector_all.return_value = [
+        {"name": " iPhone 13 ", "price": "100,000"},
+        {"name": "iPhone 12", "price": None}
+    ]
+
+    rows = await extract_rows(mock_page, settings)
+    assert mock_page.eval_on_selector_all.call_count == 1
+    assert mock_page.query_selector_all.call_count == 0
+
+    items = rows_to_items(rows, settings)
+    assert items == [{"name": "iPhone 13", "price": "100,000"}]
+
+    print("test_extract_rows_bulk_success")
+
+@pytest.mark.asyncio
+async def test_extract_rows_fallback_to_element():
+    """一括取得に失敗した場合に要素ごとの取得へ切り替わるテスト"""
+    print("test_extract_rows_fallback_to_element")
+    settings = Settings()
+    settings.extraction_mode = "evaluate"
+
+    name_element = AsyncMock()
+    name_element.inner_text.return_value = "iPhone 13"
+    price_element = AsyncMock()
+    price_element.inner_text.return_value = "100,000"
+    cell = AsyncMock()
+    cell.query_selector.side_effect = [name_element, price_element]
+
+    mock_page = AsyncMock()
+    mock_page.eval_on_selector_all.side_effect = Exception("evaluate failed")
+    mock_page.query_selector_all.return_value = [cell]
+
+    rows = await extract_rows(mock_page, settings)
+    assert rows_to_items(rows, settings) == [{"name": "iPhone 13", "price": "100,000"}]
+
+    print("test_extract_rows_fallback_to_element_success")
+
+def test_rows_to_items_extra_fields():
+    """追加項目が商品情報に含まれるテスト"""
+    settings = Settings()
+    settings.item_extra_selectors = {"status": "span.status"}
+    rows = [{"name": "iPhone 13", "price": "100,000", "status": " SOLD "}]
+
+    items = rows_to_items(rows, settings)
+    assert items == [{"name": "iPhone 13", "price": "100,000", "status": "SOLD"}]
+
+def create_url_page_context(total_pages, state):
+    """URLごとに決まった商品を返すモックのコンテキストを作成する"""
+    def new_page():
+        page = AsyncMock()
+        page_info = {}
+
+        async def goto(url):
+            page_number = 1 if "page_token" not in url else int(url.rsplit("%3A", 1)[1]) + 1
+            page_info["number"] = page_number
+            state["active"] += 1
+            state["max_active"] = max(state["max_active"], state["active"])
+            # 後のページほど早く読み込みが終わるようにして順序の入れ替わりを起こす
+            await asyncio.sleep(0.01 * (total_pages - page_number))
+
+        async def eval_rows(*args):
+            number = page_info["number"]
+            return [{"name": f"商品{number}-{i}", "price": "1,000"} for i in range(2)]
+
+        async def query_selector(selector):
+            return object() if page_info["number"] < total_pages else None
+
+        async def close():
+            state["active"] -= 1
+
+        page.goto.side_effect = goto
+        page.eval_on_selector_all.side_effect = eval_rows
+        page.query_selector.side_effect = query_selector
+        page.close.side_effect = close
+        return page
+
+    context = MagicMock()
+    context.new_page = AsyncMock(side_effect=lambda: new_page())
+    return context
+
+@pytest.mark.asyncio
+async def test_scrape_items_url_pagination(create_file_name):
+    """URL指定で複数ページを並列取得し、ページ順に結合するテスト"""
+    print("test_scrape_items_url_pagination")
+    settings = Settings()
+    settings.pagination_mode = "url"
+    settings.max_concurrent_pages_per_host = 2
+    settings.politeness_delay = 0
+    state = {"active": 0, "max_active": 0}
+    context = create_url_page_context(5, state)
+
+    @asynccontextmanager
+    async def mock_borrow_context():
+        yield context
+
+    writer = AsyncMock()
+    with patch('app.services.scraper.borrow_context', mock_borrow_context):
+        items = await scrape_items("iPhone", create_file_name, None, settings, writer=writer)
+
+    assert [item["name"] for item in items] == [f"商品{n}-{i}" for n in range(1, 6) for i in range(2)]
+    assert 1 < state["max_active"] <= 2
+    # ページ順に書き込まれている
+    written = [call.args[0][0]["name"] for call in writer.append_items.call_args_list]
+    assert written == [f"商品{n}-0" for n in range(1, 6)]
+    # 呼び出し元から渡されたセッションは閉じない
+    assert writer.close.call_count == 0
+
+    print("test_scrape_items_url_pagination_success")
+
+@pytest.mark.asyncio
+async def test_host_semaphore_follows_limit():
+    """同時取得数の上限を変えた設定では、その上限のセマフォを使うテスト"""
+    print("test_host_semaphore_follows_limit")
+    settings = Settings()
+    settings.max_concurrent_pages_per_host = 2
+    first = host_semaphore("https://jp.mercari.com/search?keyword=a", settings)
+    assert host_semaphore("https://jp.mercari.com/search?keyword=b", settings) is first
+    settings.max_concurrent_pages_per_host = 5
+    wider = host_semaphore("https://jp.mercari.com/search?keyword=a", settings)
+    assert wider is not first
+    assert wider._value == 5
+    print("test_host_semaphore_follows_limit_success")
+
+@pytest.mark.asyncio
+async def test_scrape_items_url_pagination_max_pages(create_file_name):
+    """URL指定モードで最大ページ数を超えて取得しないテスト"""
+    settings = Settings()
+    settings.pagination_mode = "url"
+    settings.max_concurrent_pages_per_host = 3
+    settings.politeness_delay = 0
+    state = {"active": 0, "max_active": 0}
+    context = create_url_page_context(10, state)
+
+    @asynccontextmanager
+    async def mock_borrow_context():
+        yield context
+
+    with patch('app.services.scraper.borrow_context', mock_borrow_context):
+        items = await scrape_items("iPhone", create_file_name, 2, settings, writer=AsyncMock())
+
+    assert len(items) == 4
+    assert context.new_page.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_scrape_items_extra_sink_without_collect(create_file_name):
+    """追加の出力先にページ順に渡され、collect=Falseでは商品を集めないテスト"""
+    from app.services.pipeline import CollectSink
+    settings = Settings()
+    settings.pagination_mode = "url"
+    settings.politeness_delay = 0
+    settings.pipeline_queue_size = 1
+    context = create_url_page_context(4, {"active": 0, "max_active": 0})
+
+    @asynccontextmanager
+    async def mock_borrow_context():
+        yield context
+
+    sink = CollectSink()
+    with patch('app.services.scraper.borrow_context', mock_borrow_context):
+        items = await scrape_items("iPhone", create_file_name, None, settings, writer=AsyncMock(),
+                                   sinks=[sink], collect=False)
+
+    assert items == []
+    assert [item["name"] for item in sink.items] == [f"商品{n}-{i}" for n in range(1, 5) for i in range(2)]
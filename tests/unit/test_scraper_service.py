@@ -0,0 +1,67 @@
+import csv
+import pytest
+from unittest.mock import patch
+from app.services.scraper_service import _scrape_and_analyze
+from app.services.file_manager import setup_results_dir
+
+PAGES = [
+    [{"name": f"商品{page}-{i}", "price": f"{(page + 1) * 1000 + i:,}"} for i in range(3)]
+    for page in range(3)
+]
+
+async def fake_scrape_items(keyword, filename, max_pages=None, settings=None, progress_callback=None, writer=None,
+                            sinks=None, collect=True, known_ids=None, unfiltered_sinks=None):
+    """ページごとにCSVへ保存するスクレイピングの代わり"""
+    all_results = []
+    for page_number, page_results in enumerate(PAGES, start=1):
+        await writer.append_items(page_results)
+        await writer.end_page()
+        if collect:
+            all_results.extend(page_results)
+        progress_callback(page_number, page_results)
+    return all_results
+
+def read_item_rows(filename):
+    """CSVファイルから商品行だけを取り出す"""
+    with open(setup_results_dir() / filename, 'r', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    start = rows.index(['商品名', '価格']) + 1
+    end = rows.index(['=== 価格分析 ==='])
+    return rows[start:end]
+
+@pytest.mark.asyncio
+async def test_csv_item_count_matches_total_items():
+    """CSVの商品行数が分析結果の取得商品数と一致するテスト"""
+    print("test_csv_item_count_matches_total_items")
+    with patch('app.services.scraper_service.scrape_items', fake_scrape_items):
+        result = await _scrape_and_analyze("iphone")
+
+    item_rows = read_item_rows(result["filename"])
+    assert len(item_rows) == result["analysis"]["total_items"] == 9
+    # 商品は1回ずつだけ書き込まれている
+    assert len({tuple(row) for row in item_rows}) == len(item_rows)
+
+    (setup_results_dir() / result["filename"]).unlink()
+    print("test_csv_item_count_matches_total_items_success")
+
+@pytest.mark.asyncio
+async def test_stream_search_events():
+    """ページごとの商品と途中の価格分析が、最終結果より先に順に返されるテスト"""
+    print("test_stream_search_events")
+    from app.services.scraper_service import stream_search_events
+
+    with patch('app.services.scraper_service.scrape_items', fake_scrape_items), \
+         patch('app.services.scraper_service.get_settings') as mock_settings:
+        mock_settings.return_value.result_cache_enabled = False
+        events = [event async for event in stream_search_events("iphone")]
+
+    names = [event["event"] for event in events]
+    assert names == ["page", "stats"] * 3 + ["summary", "done"]
+    assert events[0]["data"]["items"] == PAGES[0]
+    assert events[2]["data"]["items_so_far"] == 6
+    assert events[1]["data"]["total_items"] == 3
+    assert events[5]["data"] == events[6]["data"]
+    assert events[6]["data"]["total_items"] == 9
+
+    (setup_results_dir() / events[-1]["data"]["filename"]).unlink()
+    print("test_stream_search_events_success")
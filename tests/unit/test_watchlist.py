@@ -0,0 +1,200 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.api import watchlist as watchlist_api
+from app.config.settings import Settings
+from app.models.exceptions import DataValidationError, WatchlistNotFoundError
+from app.services import scraper
+from app.services.watchlist_scheduler import WatchlistScheduler
+
+@pytest.fixture
+def watchlist_settings(tmp_path):
+    settings = Settings()
+    settings.watchlist_path = str(tmp_path / "watchlist.json")
+    settings.watchlist_max_concurrency = 1
+    settings.watchlist_batch_size = 2
+    settings.watchlist_min_interval = 60
+    return settings
+
+@pytest.mark.asyncio
+async def test_due_keywords_are_batched_on_shared_context(watchlist_settings):
+    """実行予定になったキーワードをバッチにまとめ、バッチ内で同じコンテキストを使い、同時実行数を守るテスト"""
+    print("test_due_keywords_are_batched_on_shared_context")
+    calls = []
+    state = {"active": 0, "max_active": 0}
+
+    async def runner(keyword, max_pages=None, incremental=False, refresh=False):
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        calls.append((keyword, scraper._shared_context.get(), incremental, refresh))
+        await asyncio.sleep(0.01)
+        state["active"] -= 1
+        return {"analysis": {"total_items": 1}, "error": None, "filename": f"{keyword}.csv"}
+
+    scheduler = WatchlistScheduler(watchlist_settings, runner=runner)
+    for keyword in ("iPhone", "iPad", "Switch"):
+        await scheduler.upsert(keyword, interval_seconds=600, jitter_seconds=0)
+    now = datetime.now()
+    tasks = scheduler.run_due(now)
+    assert len(tasks) == 2
+    await asyncio.gather(*tasks)
+
+    assert [call[0] for call in calls] == ["iPhone", "iPad", "Switch"]
+    assert calls[0][1] is calls[1][1] and calls[1][1] is not calls[2][1]
+    assert all(call[2] and call[3] for call in calls)
+    assert state["max_active"] == 1
+    entry = scheduler.get("iPhone")
+    assert entry.runs == 1 and entry.last_status == "succeeded"
+    assert entry.last_result["filename"] == "iPhone.csv"
+    assert entry.next_run_at == now + timedelta(seconds=600)
+    assert scheduler.run_due(now) == []
+    print("test_due_keywords_are_batched_on_shared_context_success")
+
+@pytest.mark.asyncio
+async def test_batch_uses_new_context_after_failure(watchlist_settings):
+    """バッチ内の検索が失敗した場合、残りの検索は新しいコンテキストで実行するテスト"""
+    print("test_batch_uses_new_context_after_failure")
+    watchlist_settings.watchlist_batch_size = 3
+    contexts = []
+
+    async def runner(keyword, max_pages=None, incremental=False, refresh=False):
+        contexts.append(scraper._shared_context.get())
+        if keyword == "iPad":
+            raise RuntimeError("ページの読み込みに失敗しました")
+        return {"analysis": {"total_items": 1}, "error": None, "filename": f"{keyword}.csv"}
+
+    scheduler = WatchlistScheduler(watchlist_settings, runner=runner)
+    for keyword in ("iPhone", "iPad", "Switch"):
+        await scheduler.upsert(keyword, interval_seconds=600, jitter_seconds=0)
+    await asyncio.gather(*scheduler.run_due(datetime.now()))
+
+    assert contexts[0] is contexts[1] and contexts[2] is not contexts[1]
+    assert scheduler.get("iPad").last_status == "failed"
+    assert scheduler.get("Switch").last_status == "succeeded"
+    print("test_batch_uses_new_context_after_failure_success")
+
+@pytest.mark.asyncio
+async def test_run_is_skipped_while_previous_is_running(watchlist_settings):
+    """前回の検索が終わっていない場合はその回を飛ばし、失敗を記録するテスト"""
+    print("test_run_is_skipped_while_previous_is_running")
+    release = asyncio.Event()
+
+    async def runner(keyword, max_pages=None, incremental=False, refresh=False):
+        await release.wait()
+        raise RuntimeError("ページを取得できませんでした")
+
+    scheduler = WatchlistScheduler(watchlist_settings, runner=runner)
+    entry = await scheduler.upsert("iPhone", interval_seconds=60, jitter_seconds=0)
+    now = datetime.now()
+    tasks = scheduler.run_due(now)
+    await asyncio.sleep(0)
+    assert entry.running
+    assert scheduler.run_due(now + timedelta(seconds=61)) == []
+    assert entry.skipped_runs == 1
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert not entry.running
+    assert entry.last_status == "failed"
+    assert "取得できません" in entry.last_error
+    assert len(scheduler.run_due(now + timedelta(seconds=200))) == 1
+    await scheduler.stop()
+    print("test_run_is_skipped_while_previous_is_running_success")
+
+@pytest.mark.asyncio
+async def test_watchlist_is_saved_and_validated(watchlist_settings):
+    """登録内容をファイルに保存して読み込み、不正な設定を拒否するテスト"""
+    print("test_watchlist_is_saved_and_validated")
+    scheduler = WatchlistScheduler(watchlist_settings)
+    await scheduler.upsert("iPhone", interval_seconds=300, jitter_seconds=10, max_pages=2, incremental=False)
+    await scheduler.upsert("iPad")
+    with pytest.raises(DataValidationError):
+        await scheduler.upsert("Switch", interval_seconds=5)
+    with pytest.raises(DataValidationError):
+        await scheduler.upsert("  ")
+    await scheduler.remove("iPad")
+    with pytest.raises(WatchlistNotFoundError):
+        await scheduler.remove("iPad")
+
+    loaded = WatchlistScheduler(watchlist_settings)
+    await loaded.load()
+    assert [entry.to_config() for entry in loaded.list()] == [{
+        "keyword": "iPhone", "interval_seconds": 300, "jitter_seconds": 10,
+        "max_pages": 2, "incremental": False, "enabled": True
+    }]
+    assert loaded.get("iPhone").next_run_at <= datetime.now() + timedelta(seconds=10)
+    print("test_watchlist_is_saved_and_validated_success")
+
+@pytest.mark.asyncio
+async def test_load_skips_invalid_entries(watchlist_settings):
+    """保存されたウォッチリストの不正な設定を読み飛ばし、残りのキーワードで開始できるテスト"""
+    print("test_load_skips_invalid_entries")
+    Path(watchlist_settings.watchlist_path).write_text(json.dumps([
+        {"keyword": "iPhone", "interval_seconds": 600},
+        {"keyword": "iPad", "interval_seconds": 5},
+        {"keyword": "Switch", "interval": 600},
+        {"keyword": "", "interval_seconds": 600},
+        "Kindle"
+    ]), encoding="utf-8")
+
+    scheduler = WatchlistScheduler(watchlist_settings)
+    await scheduler.load()
+    assert [entry.keyword for entry in scheduler.list()] == ["iPhone"]
+    print("test_load_skips_invalid_entries_success")
+
+def test_watchlist_api(watchlist_settings, monkeypatch):
+    """ウォッチリストの登録・確認・即時実行・結果取得・削除のAPIのテスト"""
+    print("test_watchlist_api")
+    scheduler = WatchlistScheduler(watchlist_settings)
+    monkeypatch.setattr(watchlist_api, "get_watchlist_scheduler", lambda: scheduler)
+    app = FastAPI()
+    app.include_router(watchlist_api.router, prefix="/api/v1")
+    client = TestClient(app)
+
+    response = client.post("/api/v1/watchlist", json={"keyword": "iPhone", "interval_seconds": 600})
+    assert response.status_code == 201
+    assert response.json()["jitter_seconds"] == watchlist_settings.watchlist_default_jitter
+    assert client.post("/api/v1/watchlist", json={"keyword": "iPad", "interval_seconds": 1}).status_code == 400
+    assert [entry["keyword"] for entry in client.get("/api/v1/watchlist").json()["watchlist"]] == ["iPhone"]
+    assert client.post("/api/v1/watchlist/iPhone/run").status_code == 202
+    assert client.get("/api/v1/watchlist/iPad").status_code == 404
+
+    entry = scheduler.get("iPhone")
+    entry.last_result = {"analysis": {"total_items": 3}, "error": None, "filename": "iPhone.csv", "new_items": 1}
+    entry.last_finished_at = datetime.now()
+    body = client.get("/api/v1/watchlist/iPhone/result").json()
+    assert body["keyword"] == "iPhone"
+    assert body["new_items"] == 1
+
+    assert client.delete("/api/v1/watchlist/iPhone").status_code == 200
+    assert client.get("/api/v1/watchlist/iPhone/result").status_code == 404
+    print("test_watchlist_api_success")
+
+@pytest.mark.asyncio
+async def test_share_context_borrows_once(monkeypatch):
+    """share_contextの中の検索は、ブラウザプールから1回だけ借りたコンテキストを使うテスト"""
+    print("test_share_context_borrows_once")
+    acquired = []
+
+    class FakePool:
+        @asynccontextmanager
+        async def acquire(self):
+            context = object()
+            acquired.append(context)
+            yield context
+
+    monkeypatch.setattr(scraper, "get_browser_pool", lambda: FakePool())
+    async with scraper.share_context() as shared:
+        for _ in range(3):
+            async with scraper.borrow_context() as context:
+                assert context is acquired[0]
+    assert len(acquired) == 1 and shared.uses == 3
+    async with scraper.borrow_context():
+        pass
+    assert len(acquired) == 2
+    print("test_share_context_borrows_once_success")